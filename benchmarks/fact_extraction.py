@@ -0,0 +1,169 @@
+"""
+Microbenchmark: legacy regex fact extraction vs. FactExtractor.
+
+Uses real transcripts from Nova's memory database when it has any, and a
+synthetic tool-augmented corpus otherwise.  Also times both extractors on
+replies of growing length to show how each scales.
+
+    python benchmarks/fact_extraction.py [--db ~/.nova/memory.db] [--limit 500]
+"""
+
+import argparse
+import random
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from epistemic_engine import FactExtractor  # noqa: E402
+
+
+# --- the extractor as it was before FactExtractor ----------------------
+
+def legacy_user_facts(message):
+    facts = []
+    message_lower = message.lower()
+    patterns = [
+        (r"i (?:like|love|prefer|enjoy) (.+?)(?:\.|,|!|\?|$)", "likes: {}"),
+        (r"i (?:hate|dislike|can't stand) (.+?)(?:\.|,|!|\?|$)", "dislikes: {}"),
+        (r"i'm (?:working on|building|creating) (.+?)(?:\.|,|!|\?|$)", "current_project: {}"),
+        (r"my (?:favorite|favourite) (.+?) is (.+?)(?:\.|,|!|\?|$)", "favorite_{}: {}"),
+        (r"i (?:usually|always|often) (.+?)(?:\.|,|!|\?|$)", "habit: {}"),
+    ]
+    for pattern, template in patterns:
+        for match in re.findall(pattern, message_lower, re.IGNORECASE):
+            fact = template.format(*match) if isinstance(match, tuple) else template.format(match)
+            facts.append(fact.strip())
+    return facts
+
+
+def legacy_technical_knowledge(user_msg, nova_msg):
+    facts = []
+    tech_keywords = ['python', 'javascript', 'api', 'database', 'server', 'function',
+                     'class', 'algorithm', 'framework', 'library']
+    combined = (user_msg + " " + nova_msg).lower()
+    definition_patterns = [
+        r"(.+?) is (?:a|an) (.+?)(?:\.|,|!|\?|$)",
+        r"(.+?) means (.+?)(?:\.|,|!|\?|$)",
+        r"(?:define|what is|what's) (.+?)\?",
+    ]
+    for pattern in definition_patterns:
+        for match in re.findall(pattern, combined, re.IGNORECASE)[:3]:
+            if any(keyword in str(match).lower() for keyword in tech_keywords):
+                fact = f"{match[0]}: {match[1]}" if isinstance(match, tuple) else str(match)
+                facts.append(fact.strip())
+    return facts
+
+
+def legacy_action_verbs(message):
+    return re.findall(
+        r'\b(create|make|build|search|find|move|copy|delete|run|execute|check|analyze|edit)\b',
+        message.lower()
+    )
+
+
+def legacy_extract(user_msg, nova_msg):
+    legacy_user_facts(user_msg)
+    legacy_technical_knowledge(user_msg, nova_msg)
+    legacy_action_verbs(user_msg)
+
+
+def make_extract(extractor):
+    def extract(user_msg, nova_msg):
+        extractor.user_facts(user_msg)
+        extractor.technical_knowledge(user_msg, nova_msg)
+        extractor.action_verbs(user_msg)
+    return extract
+
+
+# --- corpus ------------------------------------------------------------
+
+SYNTHETIC_USER = [
+    "I like working late, can you check the server logs?",
+    "what is a python decorator?",
+    "I'm building a scraper for job boards. search for remote python roles",
+    "my favorite editor is vim. create a config file for it",
+    "I usually deploy on fridays, run the test suite first",
+]
+
+SYNTHETIC_TOOL_OUTPUT = (
+    "total 48\ndrwxr-xr-x  5 stephen staff  160 Jan 3 10:02 src\n"
+    "-rw-r--r--  1 stephen staff 2210 Jan 3 10:02 README.md\n"
+    "Traceback (most recent call last): File \"server.py\", line 42, in handler "
+    "KeyError: 'session' "
+)
+
+
+def load_transcripts(db_path, limit):
+    path = Path(db_path).expanduser()
+    if not path.exists():
+        return []
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT user_message, nova_response FROM conversations ORDER BY id DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+    except sqlite3.Error:
+        rows = []
+    finally:
+        conn.close()
+    return [(u or "", n or "") for u, n in rows]
+
+
+def synthetic_transcripts(count, seed=0):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(count):
+        user = rng.choice(SYNTHETIC_USER)
+        reply = SYNTHETIC_TOOL_OUTPUT * rng.randint(1, 20)
+        reply += " A decorator is a function that wraps another function."
+        corpus.append((user, reply))
+    return corpus
+
+
+def time_corpus(extract, corpus, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for user_msg, nova_msg in corpus:
+            extract(user_msg, nova_msg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default="~/.nova/memory.db")
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_transcripts(args.db, args.limit)
+    source = f"{len(corpus)} transcripts from {args.db}"
+    if not corpus:
+        corpus = synthetic_transcripts(args.limit)
+        source = f"{len(corpus)} synthetic transcripts"
+
+    new_extract = make_extract(FactExtractor())
+    legacy = time_corpus(legacy_extract, corpus, args.repeat)
+    new = time_corpus(new_extract, corpus, args.repeat)
+    print(f"Corpus: {source}")
+    print(f"  legacy        {legacy * 1000:9.1f} ms  ({legacy / len(corpus) * 1e6:8.1f} µs/turn)")
+    print(f"  FactExtractor {new * 1000:9.1f} ms  ({new / len(corpus) * 1e6:8.1f} µs/turn)")
+
+    print("\nScaling with reply length (one turn):")
+    print(f"  {'chars':>8}  {'legacy ms':>10}  {'new ms':>10}")
+    for size in (1_000, 4_000, 16_000, 64_000):
+        reply = (SYNTHETIC_TOOL_OUTPUT * (size // len(SYNTHETIC_TOOL_OUTPUT) + 1))[:size]
+        turn = [(SYNTHETIC_USER[0], reply)]
+        legacy = time_corpus(legacy_extract, turn, args.repeat)
+        new = time_corpus(new_extract, turn, args.repeat)
+        print(f"  {size:>8}  {legacy * 1000:10.2f}  {new * 1000:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,116 @@ This system:
 4. Updates beliefs based on new evidence
 """
 
+import atexit
 import json
+import queue
 import re
-from typing import List, Dict, Any, Set, Tuple
+import threading
+import time
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
+
+import telemetry
+
+
+class FactExtractor:
+    """
+    Precompiled, single-pass fact extraction.
+    
+    A message is split into clauses once (every extracted value ends at
+    punctuation anyway), then one combined trigger regex finds all user
+    fact openers and plain ``str.find`` locates definition markers.  Nothing
+    backtracks across the whole text, and input/clause caps bound the work
+    on very long tool-augmented replies.
+    """
+    
+    MAX_INPUT_CHARS = 4000
+    MAX_CLAUSE_CHARS = 300
+    MAX_DEFINITIONS = 3
+    
+    TECH_KEYWORDS = ('python', 'javascript', 'api', 'database', 'server', 'function',
+                     'class', 'algorithm', 'framework', 'library')
+    
+    _CLAUSE = re.compile(r"[^.,!?\n]+[.,!?\n]?")
+    _SENTENCE = re.compile(r"[^.!?\n]+[.!?\n]?")
+    _USER_TRIGGERS = re.compile(
+        r"\bi (?P<likes>like|love|prefer|enjoy) "
+        r"|\bi (?P<dislikes>hate|dislike|can't stand) "
+        r"|\bi'm (?P<current_project>working on|building|creating) "
+        r"|\bmy (?P<favorite>favou?rite) "
+        r"|\bi (?P<habit>usually|always|often) "
+    )
+    _QUESTION = re.compile(r"\b(?:define|what is|what's) ")
+    _TECH = re.compile("|".join(TECH_KEYWORDS))
+    _ACTION_VERBS = re.compile(
+        r"\b(create|make|build|search|find|move|copy|delete|run|execute|check|analyze|edit)\b"
+    )
+    
+    def clauses(self, text: str, pattern=None) -> List[str]:
+        """Lowercased, capped clauses of ``text``."""
+        text = text[:self.MAX_INPUT_CHARS].lower()
+        return [
+            m.group(0)[:self.MAX_CLAUSE_CHARS]
+            for m in (pattern or self._CLAUSE).finditer(text)
+        ]
+    
+    def user_facts(self, message: str) -> List[str]:
+        facts = []
+        for clause in self.clauses(message):
+            body = clause.rstrip(".,!?\n")
+            for m in self._USER_TRIGGERS.finditer(body):
+                rest = body[m.end():].strip()
+                if not rest:
+                    continue
+                kind = m.lastgroup
+                if kind == "favorite":
+                    thing, sep, value = rest.partition(" is ")
+                    if sep and thing.strip() and value.strip():
+                        facts.append(f"favorite_{thing.strip()}: {value.strip()}")
+                else:
+                    facts.append(f"{kind}: {rest}")
+        return facts
+    
+    def technical_knowledge(self, user_msg: str, nova_msg: str) -> List[str]:
+        definitions, meanings, questions = [], [], []
+        # A newline keeps the two messages in separate clauses
+        combined = user_msg[:self.MAX_INPUT_CHARS] + "\n" + nova_msg[:self.MAX_INPUT_CHARS]
+        for clause in self.clauses(combined):
+            body = clause.rstrip(".,!?\n")
+            if len(definitions) < self.MAX_DEFINITIONS:
+                for marker in (" is a ", " is an "):
+                    at = body.find(marker)
+                    if at > 0:
+                        definitions.append((body[:at], body[at + len(marker):]))
+                        break
+            if len(meanings) < self.MAX_DEFINITIONS:
+                at = body.find(" means ")
+                if at > 0:
+                    meanings.append((body[:at], body[at + len(" means "):]))
+        
+        # Questions run to the question mark, so scan sentences instead
+        for sentence in self.clauses(combined, self._SENTENCE):
+            if len(questions) >= self.MAX_DEFINITIONS:
+                break
+            if not sentence.endswith("?"):
+                continue
+            m = self._QUESTION.search(sentence)
+            if m and len(sentence) - 1 > m.end():
+                questions.append(sentence[m.end():-1])
+        
+        facts = []
+        for subject, meaning in definitions + meanings:
+            subject, meaning = subject.strip(), meaning.strip()
+            if subject and meaning and self._TECH.search(subject + " " + meaning):
+                facts.append(f"{subject}: {meaning}")
+        for term in questions:
+            if self._TECH.search(term):
+                facts.append(term.strip())
+        return facts
+    
+    def action_verbs(self, message: str) -> List[str]:
+        return self._ACTION_VERBS.findall(message[:self.MAX_INPUT_CHARS].lower())
 
 
 class EpistemicEngine:
@@ -23,8 +128,23 @@ class EpistemicEngine:
     
     def __init__(self, memory_system):
         self.memory = memory_system
-        self.knowledge_graph = KnowledgeGraph()
+        self.knowledge_graph = KnowledgeGraph(memory_system)
+        self.extractor = FactExtractor()
+        self.task_patterns = TaskPatternIndex(memory_system)
+        self._worker: Optional[threading.Thread] = None
+        self._queue: "queue.Queue" = None
+        self._max_batch = 32
+        # Guards _metrics and _oldest_pending: the worker updates them while
+        # get_worker_metrics() reads them from request threads
+        self._metrics_lock = threading.Lock()
+        self._oldest_pending: Optional[float] = None
+        self._metrics: Dict[str, Any] = {
+            "processed": 0, "failed": 0, "batches": 0, "facts": 0,
+            "blocked_submits": 0, "last_batch_ms": 0.0, "max_lag_seconds": 0.0,
+            "last_error": None,
+        }
     
+    @telemetry.timed("epistemic.process")
     def process_conversation(
         self,
         user_message: str,
@@ -34,101 +154,175 @@ class EpistemicEngine:
         """
         Extract and store knowledge from a conversation.
         """
+        # One upsert for the whole turn
+        self.memory.learn_facts(self._collect_facts(user_message, nova_response, tools_used))
+    
+    def _collect_facts(
+        self,
+        user_message: str,
+        nova_response: str,
+        tools_used: List[str] = None
+    ) -> List[Tuple[str, str, str, float]]:
+        """Facts to store for one exchange (the knowledge graph is updated directly)."""
+        facts = []
+        
         # Extract facts about Stephen
         user_facts = self._extract_user_facts(user_message)
         for fact in user_facts:
-            self.memory.learn_fact(
-                fact_type="user_preference",
-                content=fact,
-                source="conversation",
-                confidence=0.8
-            )
+            facts.append(("user_preference", fact, "conversation", 0.8))
             self.knowledge_graph.add_fact("stephen", fact)
         
         # Extract technical knowledge
         tech_facts = self._extract_technical_knowledge(user_message, nova_response)
         for fact in tech_facts:
-            self.memory.learn_fact(
-                fact_type="technical",
-                content=fact,
-                source="conversation",
-                confidence=0.7
-            )
+            facts.append(("technical", fact, "conversation", 0.7))
         
-        # Extract task patterns
+        # Count task patterns
         if tools_used:
             pattern = self._extract_task_pattern(user_message, tools_used)
             if pattern:
-                self.memory.learn_fact(
-                    fact_type="task_pattern",
-                    content=json.dumps(pattern),
-                    source="tool_usage",
-                    confidence=0.9
+                self.task_patterns.record(pattern["intent_keywords"], pattern["tools_sequence"])
+        
+        return facts
+    
+    # --- background worker ---------------------------------------------
+    
+    def start_worker(self, max_batch: int = 32, max_pending: int = 1000):
+        """
+        Process exchanges on a background thread from now on.
+        
+        ``submit()`` then only enqueues; the worker drains the queue in
+        batches and writes each batch with one ``learn_facts`` call, so
+        facts repeated within a batch are coalesced.  Learning becomes
+        eventually consistent.
+        """
+        if self._worker is not None and self._worker.is_alive():
+            return
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._max_batch = max_batch
+        self._worker = threading.Thread(
+            target=self._run_worker, name="nova-epistemic", daemon=True
+        )
+        self._worker.start()
+        atexit.register(self.stop_worker)
+    
+    def submit(
+        self,
+        user_message: str,
+        nova_response: str,
+        tools_used: List[str] = None
+    ):
+        """Learn from an exchange, in the background when the worker runs."""
+        if self._worker is None or not self._worker.is_alive():
+            self.process_conversation(user_message, nova_response, tools_used)
+            return
+        if self._queue.full():
+            # Backpressure: the caller waits for the worker to catch up
+            with self._metrics_lock:
+                self._metrics["blocked_submits"] += 1
+        self._queue.put((time.monotonic(), user_message, nova_response, tools_used))
+    
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Block until every exchange submitted so far has been learned."""
+        if self._worker is None or not self._worker.is_alive():
+            return True
+        marker = threading.Event()
+        self._queue.put(marker)
+        return marker.wait(timeout)
+    
+    def stop_worker(self, timeout: Optional[float] = 10):
+        """Drain the queue and stop the worker thread."""
+        if self._worker is None:
+            return
+        self.drain(timeout)
+        self._queue.put(None)
+        self._worker.join(timeout)
+        self._worker = None
+        atexit.unregister(self.stop_worker)
+    
+    def get_worker_metrics(self) -> Dict[str, Any]:
+        """Queue depth, lag and throughput of the background worker."""
+        running = self._worker is not None and self._worker.is_alive()
+        depth = self._queue.qsize() if running else 0
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+            oldest = self._oldest_pending
+        if running and oldest is None:
+            with self._queue.mutex:
+                oldest = next(
+                    (i[0] for i in self._queue.queue if isinstance(i, tuple)), None
                 )
+        return dict(
+            metrics,
+            running=running,
+            queue_depth=depth,
+            lag_seconds=round(time.monotonic() - oldest, 3) if running and oldest else 0.0,
+        )
+    
+    def _run_worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self._max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            exchanges = [i for i in batch if isinstance(i, tuple)]
+            if exchanges:
+                with self._metrics_lock:
+                    self._oldest_pending = exchanges[0][0]
+                self._learn_batch(exchanges)
+                with self._metrics_lock:
+                    self._oldest_pending = None
+            for i in batch:
+                if isinstance(i, threading.Event):
+                    i.set()
+            if batch[-1] is None:
+                return
+    
+    @telemetry.timed("epistemic.learn_batch")
+    def _learn_batch(self, exchanges: List[tuple]):
+        start = time.monotonic()
+        facts = []
+        try:
+            for _, user_message, nova_response, tools_used in exchanges:
+                facts.extend(self._collect_facts(user_message, nova_response, tools_used))
+            self.memory.learn_facts(facts)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed_ms = round((time.monotonic() - start) * 1000, 2)
+        with self._metrics_lock:
+            if error is None:
+                self._metrics["processed"] += len(exchanges)
+            else:
+                self._metrics["failed"] += len(exchanges)
+                self._metrics["last_error"] = error
+            self._metrics["batches"] += 1
+            self._metrics["facts"] += len(facts)
+            self._metrics["last_batch_ms"] = elapsed_ms
+            self._metrics["max_lag_seconds"] = max(
+                self._metrics["max_lag_seconds"], round(start - exchanges[0][0], 3)
+            )
     
     def _extract_user_facts(self, message: str) -> List[str]:
         """Extract facts about Stephen from his message."""
-        facts = []
-        message_lower = message.lower()
-        
-        # "I like/love/prefer X"
-        patterns = [
-            (r"i (?:like|love|prefer|enjoy) (.+?)(?:\.|,|!|\?|$)", "likes: {}"),
-            (r"i (?:hate|dislike|can't stand) (.+?)(?:\.|,|!|\?|$)", "dislikes: {}"),
-            (r"i'm (?:working on|building|creating) (.+?)(?:\.|,|!|\?|$)", "current_project: {}"),
-            (r"my (?:favorite|favourite) (.+?) is (.+?)(?:\.|,|!|\?|$)", "favorite_{}: {}"),
-            (r"i (?:usually|always|often) (.+?)(?:\.|,|!|\?|$)", "habit: {}"),
-        ]
-        
-        for pattern, template in patterns:
-            matches = re.findall(pattern, message_lower, re.IGNORECASE)
-            for match in matches:
-                if isinstance(match, tuple):
-                    fact = template.format(*match)
-                else:
-                    fact = template.format(match)
-                facts.append(fact.strip())
-        
-        return facts
+        return self.extractor.user_facts(message)
     
     def _extract_technical_knowledge(self, user_msg: str, nova_msg: str) -> List[str]:
         """Extract technical facts/knowledge."""
-        facts = []
-        
-        # Code/tech terms
-        tech_keywords = ['python', 'javascript', 'api', 'database', 'server', 'function', 
-                        'class', 'algorithm', 'framework', 'library']
-        
-        combined = (user_msg + " " + nova_msg).lower()
-        
-        # Extract definitions/explanations
-        definition_patterns = [
-            r"(.+?) is (?:a|an) (.+?)(?:\.|,|!|\?|$)",
-            r"(.+?) means (.+?)(?:\.|,|!|\?|$)",
-            r"(?:define|what is|what's) (.+?)\?",
-        ]
-        
-        for pattern in definition_patterns:
-            matches = re.findall(pattern, combined, re.IGNORECASE)
-            for match in matches[:3]:  # Limit to avoid noise
-                if any(keyword in str(match).lower() for keyword in tech_keywords):
-                    if isinstance(match, tuple):
-                        fact = f"{match[0]}: {match[1]}"
-                    else:
-                        fact = str(match)
-                    facts.append(fact.strip())
-        
-        return facts
+        return self.extractor.technical_knowledge(user_msg, nova_msg)
     
     def _extract_task_pattern(self, user_message: str, tools_used: List[str]) -> Dict:
         """
         Learn task patterns: what user asks for → what tools to use
         """
         # Extract action verbs
-        action_verbs = re.findall(
-            r'\b(create|make|build|search|find|move|copy|delete|run|execute|check|analyze|edit)\b',
-            user_message.lower()
-        )
+        action_verbs = self.extractor.action_verbs(user_message)
         
         if not action_verbs:
             return None
@@ -143,48 +337,45 @@ class EpistemicEngine:
         """
         Based on past patterns, suggest better responses.
         """
-        # Search similar past conversations
-        similar = self.memory.search_memory(user_message, limit=3)
+        # Nearest past queries (MinHash/LSH, bounded latency)
+        similar = self.memory.find_similar_queries(user_message, k=3)
         
-        # Extract tools used in similar contexts
-        tools_used_before = set()
+        # Tools used in similar contexts, weighted by similarity
+        tool_weights: Dict[str, float] = defaultdict(float)
         for item in similar:
-            if item['type'] == 'conversation' and item.get('tools'):
-                tools_used_before.update(item['tools'])
+            for tool in item['tools']:
+                tool_weights[tool] += item['similarity']
+        tools_used_before = sorted(tool_weights, key=tool_weights.get, reverse=True)
+        
+        predicted = self.task_patterns.predict(self.extractor.action_verbs(user_message))
         
         suggestions = {
             "similar_past_queries": len(similar),
-            "tools_previously_used": list(tools_used_before),
-            "confidence": 0.7 if similar else 0.0
+            "tools_previously_used": tools_used_before,
+            "predicted_tools": [tool for tool, _ in predicted],
+            "confidence": predicted[0][1] if predicted else (similar[0]['similarity'] if similar else 0.0)
         }
         
         return suggestions
     
+    @telemetry.timed("epistemic.predict_tools")
+    def predict_tools(self, user_message: str, limit: int = 3) -> List[Tuple[str, float]]:
+        """Tools most often used for requests with the same intent keywords."""
+        return self.task_patterns.predict(self.extractor.action_verbs(user_message), limit)
+    
     def get_knowledge_summary(self) -> Dict[str, Any]:
         """Get summary of what Nova knows."""
         stats = self.memory.get_stats()
         
         # Get top facts by type
-        conn = self.memory.db_path
-        import sqlite3
-        db = sqlite3.connect(conn)
-        cursor = db.cursor()
-        
-        cursor.execute("""
-            SELECT fact_type, COUNT(*) as count
-            FROM knowledge
-            GROUP BY fact_type
-            ORDER BY count DESC
-        """)
-        
-        fact_types = dict(cursor.fetchall())
-        db.close()
+        fact_types = self.memory.get_fact_type_counts()
         
         return {
             "total_facts": stats['facts_learned'],
             "fact_types": fact_types,
             "conversations_analyzed": stats['conversations'],
-            "knowledge_graph_nodes": len(self.knowledge_graph.nodes)
+            "knowledge_graph_nodes": self.knowledge_graph.node_count(),
+            "task_pattern_keywords": len(self.task_patterns)
         }
     
     def improve_from_feedback(self, feedback_type: str, context: Dict):
@@ -193,58 +384,338 @@ class EpistemicEngine:
         
         feedback_type: 'correct', 'incorrect', 'helpful', 'unhelpful'
         """
-        if feedback_type in ['correct', 'helpful']:
-            # Reinforce this pattern
-            if 'tools_used' in context:
-                pattern = self._extract_task_pattern(
-                    context.get('user_message', ''),
-                    context['tools_used']
-                )
-                if pattern:
-                    self.memory.learn_fact(
-                        fact_type="task_pattern",
-                        content=json.dumps(pattern),
-                        source="positive_feedback",
-                        confidence=0.95
-                    )
+        positive = feedback_type in ['correct', 'helpful']
+        if not positive and feedback_type not in ['incorrect', 'unhelpful']:
+            return
         
-        elif feedback_type in ['incorrect', 'unhelpful']:
-            # Mark this pattern as less reliable
-            # In a full system, would adjust confidence scores
-            pass
+        # Beliefs drawn from this exchange gain or lose evidence
+        user_message = context.get('user_message', '')
+        nova_response = context.get('nova_response', '')
+        facts = self._extract_user_facts(user_message)
+        facts += self._extract_technical_knowledge(user_message, nova_response)
+        self.memory.reinforce_facts(facts, positive=positive)
+        
+        # So does the tool choice for this kind of request
+        if 'tools_used' in context:
+            pattern = self._extract_task_pattern(user_message, context['tools_used'])
+            if pattern:
+                self.task_patterns.record(
+                    pattern["intent_keywords"],
+                    pattern["tools_sequence"],
+                    count=1 if positive else -1
+                )
 
 
 class KnowledgeGraph:
     """
     Simple knowledge graph structure.
     Nodes = entities, Edges = relationships
+    
+    Edges are indexed both ways (outgoing and incoming adjacency sets of
+    (relation, entity) pairs), so neighbour lookups cost O(degree) and a
+    pair of entities can hold several relations.  With a memory system the
+    graph is persisted to SQLite and each entity is loaded on first touch.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS kg_nodes (
+            entity TEXT PRIMARY KEY
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS kg_facts (
+            entity TEXT NOT NULL,
+            fact TEXT NOT NULL,
+            PRIMARY KEY (entity, fact)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS kg_edges (
+            src TEXT NOT NULL,
+            relation TEXT NOT NULL,
+            dst TEXT NOT NULL,
+            PRIMARY KEY (src, relation, dst)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_kg_edges_dst ON kg_edges(dst, relation, src);
+    """
+    
+    # Entity count in memory_stats (see memory_system.STATS_SCHEMA), seeded
+    # once from the table; the triggers keep it current afterwards
+    COUNTER_SCHEMA = """
+        BEGIN;
+        INSERT OR IGNORE INTO memory_stats(key, value)
+            SELECT 'kg_nodes', COUNT(*) FROM kg_nodes;
+        CREATE TRIGGER IF NOT EXISTS kg_nodes_stats_ai AFTER INSERT ON kg_nodes BEGIN
+            INSERT INTO memory_stats(key, value) VALUES ('kg_nodes', 1)
+                ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        END;
+        CREATE TRIGGER IF NOT EXISTS kg_nodes_stats_ad AFTER DELETE ON kg_nodes BEGIN
+            UPDATE memory_stats SET value = value - 1 WHERE key = 'kg_nodes';
+        END;
+        COMMIT;
     """
     
-    def __init__(self):
+    def __init__(self, memory_system=None):
+        self.memory = memory_system
         self.nodes: Dict[str, Set[str]] = defaultdict(set)
-        self.edges: Dict[Tuple[str, str], str] = {}
+        self.outgoing: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        self.incoming: Dict[str, Set[Tuple[str, str]]] = defaultdict(set)
+        self._loaded: Set[str] = set()
+        self._lock = threading.RLock()
+        if self.memory is not None:
+            with self.memory.connection() as conn:
+                conn.executescript(self.SCHEMA)
+                if not conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'kg_nodes_stats_ai'"
+                ).fetchone():
+                    conn.executescript(self.COUNTER_SCHEMA)
+    
+    def _ensure_loaded(self, entity: str):
+        """Pull an entity's facts and edges from SQLite the first time it is used."""
+        if self.memory is None or entity in self._loaded:
+            return
+        with self.memory.connection() as conn:
+            facts = conn.execute(
+                "SELECT fact FROM kg_facts WHERE entity = ?", (entity,)
+            ).fetchall()
+            out_edges = conn.execute(
+                "SELECT relation, dst FROM kg_edges WHERE src = ?", (entity,)
+            ).fetchall()
+            in_edges = conn.execute(
+                "SELECT relation, src FROM kg_edges WHERE dst = ?", (entity,)
+            ).fetchall()
+        self.nodes[entity].update(row[0] for row in facts)
+        self.outgoing[entity].update(out_edges)
+        self.incoming[entity].update(in_edges)
+        self._loaded.add(entity)
     
     def add_fact(self, entity: str, fact: str):
         """Add a fact about an entity."""
-        self.nodes[entity].add(fact)
+        with self._lock:
+            self._ensure_loaded(entity)
+            if fact in self.nodes[entity]:
+                return
+            self.nodes[entity].add(fact)
+        if self.memory is not None:
+            with self.memory.connection() as conn:
+                conn.execute("INSERT OR IGNORE INTO kg_nodes (entity) VALUES (?)", (entity,))
+                conn.execute(
+                    "INSERT OR IGNORE INTO kg_facts (entity, fact) VALUES (?, ?)", (entity, fact)
+                )
     
     def add_relationship(self, entity1: str, relation: str, entity2: str):
         """Add relationship between entities."""
-        self.edges[(entity1, entity2)] = relation
+        with self._lock:
+            self._ensure_loaded(entity1)
+            if (relation, entity2) in self.outgoing[entity1]:
+                return
+            self.outgoing[entity1].add((relation, entity2))
+            self.incoming[entity2].add((relation, entity1))
+        if self.memory is not None:
+            with self.memory.connection() as conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO kg_nodes (entity) VALUES (?)",
+                    [(entity1,), (entity2,)]
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO kg_edges (src, relation, dst) VALUES (?, ?, ?)",
+                    (entity1, relation, entity2)
+                )
     
     def get_facts(self, entity: str) -> Set[str]:
         """Get all facts about an entity."""
-        return self.nodes.get(entity, set())
+        with self._lock:
+            self._ensure_loaded(entity)
+            return set(self.nodes.get(entity, set()))
     
     def get_related(self, entity: str) -> List[Tuple[str, str]]:
-        """Get entities related to this one."""
-        related = []
-        for (e1, e2), relation in self.edges.items():
-            if e1 == entity:
-                related.append((relation, e2))
-            elif e2 == entity:
-                related.append((relation, e1))
-        return related
+        """Get entities related to this one (both directions)."""
+        with self._lock:
+            self._ensure_loaded(entity)
+            return list(self.outgoing.get(entity, ())) + list(self.incoming.get(entity, ()))
+    
+    def neighborhood(
+        self,
+        entity: str,
+        max_hops: int = 2,
+        max_nodes: int = 100
+    ) -> Dict[str, int]:
+        """
+        Bounded breadth-first search around an entity.
+        
+        Returns entity -> hop distance for everything reachable within
+        ``max_hops`` (either edge direction), stopping at ``max_nodes``.
+        """
+        distances = {entity: 0}
+        frontier = deque([entity])
+        while frontier and len(distances) < max_nodes:
+            current = frontier.popleft()
+            hop = distances[current]
+            if hop >= max_hops:
+                continue
+            for _, neighbour in self.get_related(current):
+                if neighbour in distances:
+                    continue
+                distances[neighbour] = hop + 1
+                frontier.append(neighbour)
+                if len(distances) >= max_nodes:
+                    break
+        return distances
+    
+    def node_count(self) -> int:
+        """Number of known entities."""
+        if self.memory is None:
+            with self._lock:
+                return len(set(self.nodes) | set(self.outgoing) | set(self.incoming))
+        return self.memory.get_stats()["entities"]
+
+
+class TaskPatternIndex:
+    """
+    Intent keyword -> tool sequence counts.
+    
+    Counts live in the ``task_patterns`` table and are mirrored in memory,
+    where each keyword also keeps a per-tool counter, so ranking likely
+    tools costs O(keywords) regardless of history size.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS task_patterns (
+            keyword TEXT NOT NULL,
+            tools TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            last_seen TEXT NOT NULL,
+            PRIMARY KEY (keyword, tools)
+        ) WITHOUT ROWID;
+    """
+    
+    MAX_SEQUENCE = 8
+    
+    def __init__(self, memory_system=None):
+        self.memory = memory_system
+        self.sequences: Dict[str, Dict[Tuple[str, ...], int]] = defaultdict(dict)
+        self.tool_counts: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.totals: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        if self.memory is not None:
+            with self.memory.connection() as conn:
+                conn.executescript(self.SCHEMA)
+                rows = conn.execute("SELECT keyword, tools, count FROM task_patterns").fetchall()
+            for keyword, tools, count in rows:
+                self._add(keyword, tuple(json.loads(tools)), count)
+            self._backfill_from_knowledge()
+    
+    def _add(self, keyword: str, sequence: Tuple[str, ...], count: int):
+        seqs = self.sequences.get(keyword, {})
+        old = seqs.get(sequence, 0)
+        # Negative feedback can lower a count, never below zero; entries
+        # that reach zero are dropped so they don't dilute predict()
+        count = max(old + count, 0) - old
+        if old + count <= 0:
+            if sequence in seqs:
+                self._remove(keyword, sequence)
+            return
+        self.sequences[keyword][sequence] = old + count
+        tools = self.tool_counts[keyword]
+        for tool in set(sequence):
+            tools[tool] = tools.get(tool, 0) + count
+        self.totals[keyword] += count
+    
+    def _remove(self, keyword: str, sequence: Tuple[str, ...]):
+        count = self.sequences[keyword].pop(sequence)
+        tools = self.tool_counts[keyword]
+        for tool in set(sequence):
+            tools[tool] = tools.get(tool, 0) - count
+            if tools[tool] <= 0:
+                del tools[tool]
+        self.totals[keyword] -= count
+        if not self.sequences[keyword]:
+            del self.sequences[keyword], self.tool_counts[keyword], self.totals[keyword]
+    
+    def record(self, keywords: List[str], tools_used: List[str], count: int = 1):
+        """
+        Count one use of ``tools_used`` for each intent keyword.
+        
+        A negative ``count`` takes uses away; a sequence whose count
+        reaches zero is forgotten.
+        """
+        sequence = tuple(tools_used[:self.MAX_SEQUENCE])
+        keywords = list(dict.fromkeys(keywords))
+        if not sequence or not keywords:
+            return
+        with self._lock:
+            for keyword in keywords:
+                self._add(keyword, sequence, count)
+        if self.memory is not None:
+            now = datetime.utcnow().isoformat()
+            tools = json.dumps(list(sequence))
+            with self.memory.connection() as conn:
+                if count < 0:
+                    conn.executemany("""
+                        UPDATE task_patterns SET count = count + ?
+                        WHERE keyword = ? AND tools = ?
+                    """, [(count, keyword, tools) for keyword in keywords])
+                    conn.execute("DELETE FROM task_patterns WHERE count <= 0")
+                    return
+                conn.executemany("""
+                    INSERT INTO task_patterns (keyword, tools, count, last_seen)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(keyword, tools) DO UPDATE SET
+                        count = count + excluded.count,
+                        last_seen = excluded.last_seen
+                """, [(keyword, tools, count, now) for keyword in keywords])
+    
+    def predict(self, keywords: List[str], limit: int = 3) -> List[Tuple[str, float]]:
+        """
+        Rank tools for these keywords.
+        
+        A tool's score is the share of past uses of each keyword that
+        involved it, averaged over the keywords.
+        """
+        keywords = list(dict.fromkeys(keywords))
+        scores: Dict[str, float] = defaultdict(float)
+        with self._lock:
+            for keyword in keywords:
+                total = self.totals.get(keyword)
+                if not total:
+                    continue
+                for tool, count in self.tool_counts[keyword].items():
+                    if count:
+                        scores[tool] += count / total
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return [(tool, round(score / len(keywords), 3)) for tool, score in ranked[:limit]]
+    
+    def best_sequence(self, keywords: List[str]) -> Tuple[Tuple[str, ...], int]:
+        """Most frequent tool sequence for any of the keywords, with its count."""
+        best, best_count = (), 0
+        with self._lock:
+            for keyword in dict.fromkeys(keywords):
+                for sequence, count in self.sequences.get(keyword, {}).items():
+                    if count > best_count:
+                        best, best_count = sequence, count
+        return best, best_count
+    
+    def __len__(self) -> int:
+        return len(self.totals)
+    
+    def _backfill_from_knowledge(self):
+        """Fold legacy ``task_pattern`` JSON facts into the table, then drop them."""
+        with self.memory.connection() as conn:
+            pending = conn.execute(
+                "SELECT value FROM memory_stats WHERE key = 'fact_type:task_pattern'"
+            ).fetchone()
+            if not pending or not pending[0]:
+                return
+            rows = conn.execute(
+                "SELECT content, occurrences FROM knowledge WHERE fact_type = 'task_pattern'"
+            ).fetchall()
+            for content, occurrences in rows:
+                try:
+                    pattern = json.loads(content)
+                    self.record(
+                        pattern.get("intent_keywords", []),
+                        pattern.get("tools_sequence", []),
+                        occurrences or 1
+                    )
+                except (ValueError, AttributeError, TypeError):
+                    continue
+            conn.execute("DELETE FROM knowledge WHERE fact_type = 'task_pattern'")
 
 
 def create_epistemic_engine(memory_system):
@@ -0,0 +1,446 @@
+"""
+Shared HTTP client for Nova's chat-completions backend (Groq by default).
+
+One pooled ``requests.Session`` is reused for every agent-loop turn, so
+calls ride on kept-alive connections instead of paying a TCP/TLS
+handshake each time.  Calls get separate connect/read timeouts, and
+connection errors, timeouts, 429 and 5xx responses are retried with
+jittered exponential backoff that honours ``Retry-After``.
+
+``chat_stream`` consumes ``stream: true`` responses (Server-Sent Events)
+chunk by chunk; ``merge_delta`` folds those chunks back into a message.
+
+``AsyncLLMClient`` offers the same calls as coroutines for asyncio code,
+over httpx when it is installed and on worker threads otherwise.
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # AsyncLLMClient falls back to worker threads
+    httpx = None
+
+
+DEFAULT_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class LLMError(Exception):
+    """The backend could not produce a response (after any retries)."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+        self.attempts = 1
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class LLMClient:
+    """
+    Pooled, retrying chat-completions client.
+
+    Thread-safe: one instance is shared by every conversation.  ``stats()``
+    reports call counts and latency percentiles over recent calls.
+    """
+
+    def __init__(
+        self,
+        api_url: str = DEFAULT_API_URL,
+        api_key: Optional[str] = None,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        max_retry_after: float = 30.0,
+        pool_size: int = 10,
+        session: Optional[requests.Session] = None
+    ):
+        self.api_url = api_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+
+        self._lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=512)
+        self._ttft: deque = deque(maxlen=512)
+        self._stats = {"calls": 0, "attempts": 0, "retries": 0, "errors": 0, "last_ms": 0.0}
+
+    def chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        POST a chat-completions request and return the decoded JSON.
+
+        Non-retryable error responses (e.g. 400) are returned as-is so the
+        caller can read their ``error`` field; LLMError is raised once the
+        retries are exhausted or the response is not JSON.
+        """
+        start = time.monotonic()
+        attempts = 0
+        try:
+            response, attempts = self._post(payload, stream=False)
+            try:
+                return response.json()
+            except ValueError:
+                raise LLMError(
+                    f"Invalid JSON from backend (HTTP {response.status_code})",
+                    response.status_code
+                )
+        except LLMError as e:
+            attempts = attempts or e.attempts
+            self._count_error()
+            raise
+        finally:
+            self._record(start, attempts)
+
+    def chat_stream(self, payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        POST with ``stream: true`` and yield each decoded chunk.
+
+        Retries only happen before the first byte arrives.  An error
+        response is yielded once, whole, like ``chat`` returns it.  Latency
+        is recorded to the first chunk (time-to-first-token) and to the end.
+        """
+        start = time.monotonic()
+        attempts = 0
+        first_chunk_ms = None
+        try:
+            response, attempts = self._post(dict(payload, stream=True), stream=True)
+            with response:
+                if response.status_code >= 400:
+                    try:
+                        yield response.json()
+                    except ValueError:
+                        raise LLMError(f"HTTP {response.status_code}", response.status_code)
+                    return
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    if first_chunk_ms is None:
+                        first_chunk_ms = (time.monotonic() - start) * 1000
+                    try:
+                        yield json.loads(data)
+                    except ValueError:
+                        raise LLMError("Invalid JSON chunk in stream")
+        except requests.RequestException as e:
+            self._count_error()
+            raise LLMError(f"Stream interrupted: {type(e).__name__}: {e}")
+        except LLMError as e:
+            attempts = attempts or e.attempts
+            self._count_error()
+            raise
+        finally:
+            self._record(start, attempts, first_chunk_ms)
+
+    def _post(self, payload: Dict[str, Any], stream: bool):
+        """POST with retries; returns (response, attempts) or raises LLMError."""
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            try:
+                response = self.session.post(
+                    self.api_url, json=payload, timeout=self.timeout, stream=stream
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = LLMError(f"{type(e).__name__}: {e}")
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response, attempt
+                response.close()
+                error = LLMError(f"HTTP {response.status_code}", response.status_code)
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            if attempt > self.max_retries:
+                error.attempts = attempt
+                raise error
+            if retry_after is not None and retry_after > self.max_retry_after:
+                # The backend asked us to go away for too long
+                error.attempts = attempt
+                raise error
+            time.sleep(self._backoff(attempt, retry_after))
+
+    def _count_error(self):
+        with self._lock:
+            self._stats["errors"] += 1
+
+    def _record(self, start: float, attempts: int, first_chunk_ms: Optional[float] = None):
+        elapsed = (time.monotonic() - start) * 1000
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["attempts"] += attempts
+            self._stats["retries"] += max(attempts - 1, 0)
+            self._stats["last_ms"] = round(elapsed, 1)
+            self._latencies.append(elapsed)
+            if first_chunk_ms is not None:
+                self._stats["last_ttft_ms"] = round(first_chunk_ms, 1)
+                self._ttft.append(first_chunk_ms)
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Full-jitter exponential backoff, never shorter than Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            ttft = sorted(self._ttft)
+            stats = dict(self._stats)
+
+        def pct(values, p):
+            return round(values[min(len(values) - 1, int(p * len(values)))], 1)
+
+        if latencies:
+            stats.update(
+                p50_ms=pct(latencies, 0.50), p95_ms=pct(latencies, 0.95),
+                max_ms=round(latencies[-1], 1)
+            )
+        if ttft:
+            stats.update(ttft_p50_ms=pct(ttft, 0.50), ttft_p95_ms=pct(ttft, 0.95))
+        return stats
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncLLMClient:
+    """
+    asyncio front end for an ``LLMClient``.
+
+    Uses the wrapped client's URL, headers, timeouts and retry policy, and
+    records into its ``stats()``.  With httpx installed each event loop
+    gets its own pooled ``httpx.AsyncClient``, so many conversations can
+    wait on the backend without holding a thread each; without httpx the
+    calls run on worker threads.
+    """
+
+    def __init__(self, client: LLMClient, pool_size: int = 100):
+        self.client = client
+        self.pool_size = pool_size
+        self._clients = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient
+
+    async def chat(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Async ``LLMClient.chat``."""
+        if httpx is None:
+            return await asyncio.to_thread(self.client.chat, payload)
+
+        start = time.monotonic()
+        attempts = 0
+        try:
+            response, attempts = await self._post(payload)
+            try:
+                return response.json()
+            except ValueError:
+                raise LLMError(
+                    f"Invalid JSON from backend (HTTP {response.status_code})",
+                    response.status_code
+                )
+        except LLMError as e:
+            attempts = attempts or e.attempts
+            self.client._count_error()
+            raise
+        finally:
+            self.client._record(start, attempts)
+
+    async def chat_stream(self, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Async ``LLMClient.chat_stream``."""
+        if httpx is None:
+            async for chunk in self._thread_stream(payload):
+                yield chunk
+            return
+
+        start = time.monotonic()
+        attempts = 0
+        first_chunk_ms = None
+        try:
+            response, attempts = await self._post(dict(payload, stream=True), stream=True)
+            try:
+                if response.status_code >= 400:
+                    await response.aread()
+                    try:
+                        yield response.json()
+                    except ValueError:
+                        raise LLMError(f"HTTP {response.status_code}", response.status_code)
+                    return
+                async for line in response.aiter_lines():
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        return
+                    if first_chunk_ms is None:
+                        first_chunk_ms = (time.monotonic() - start) * 1000
+                    try:
+                        yield json.loads(data)
+                    except ValueError:
+                        raise LLMError("Invalid JSON chunk in stream")
+            finally:
+                await response.aclose()
+        except httpx.HTTPError as e:
+            self.client._count_error()
+            raise LLMError(f"Stream interrupted: {type(e).__name__}: {e}")
+        except LLMError as e:
+            attempts = attempts or e.attempts
+            self.client._count_error()
+            raise
+        finally:
+            self.client._record(start, attempts, first_chunk_ms)
+
+    async def _post(self, payload: Dict[str, Any], stream: bool = False):
+        """POST with the wrapped client's retry policy; returns (response, attempts)."""
+        http = self._http()
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            try:
+                request = http.build_request("POST", self.client.api_url, json=payload)
+                response = await http.send(request, stream=stream)
+            except httpx.TransportError as e:
+                error = LLMError(f"{type(e).__name__}: {e}")
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response, attempt
+                await response.aclose()
+                error = LLMError(f"HTTP {response.status_code}", response.status_code)
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            if attempt > self.client.max_retries:
+                error.attempts = attempt
+                raise error
+            if retry_after is not None and retry_after > self.client.max_retry_after:
+                error.attempts = attempt
+                raise error
+            await asyncio.sleep(self.client._backoff(attempt, retry_after))
+
+    def _http(self) -> "httpx.AsyncClient":
+        loop = asyncio.get_running_loop()
+        http = self._clients.get(loop)
+        if http is None:
+            connect, read = self.client.timeout
+            http = self._clients[loop] = httpx.AsyncClient(
+                headers=dict(self.client.session.headers),
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(
+                    max_connections=self.pool_size, max_keepalive_connections=self.pool_size
+                ),
+            )
+        return http
+
+    async def _thread_stream(self, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Drive the blocking ``chat_stream`` on a worker thread."""
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def pump():
+            try:
+                for chunk in self.client.chat_stream(payload):
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            except Exception as e:
+                loop.call_soon_threadsafe(chunks.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, done)
+
+        worker = loop.run_in_executor(None, pump)
+        try:
+            while True:
+                item = await chunks.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            await worker
+
+    async def aclose(self):
+        """Close the current event loop's connection pool."""
+        http = self._clients.pop(asyncio.get_running_loop(), None)
+        if http is not None:
+            await http.aclose()
+
+
+def merge_delta(message: Dict[str, Any], delta: Dict[str, Any]):
+    """
+    Fold one streamed ``delta`` into an assistant ``message`` in place.
+
+    Content is concatenated; tool calls arrive in pieces keyed by
+    ``index`` (id and name first, then argument fragments).
+    """
+    if delta.get("role"):
+        message["role"] = delta["role"]
+    if delta.get("content"):
+        message["content"] = (message.get("content") or "") + delta["content"]
+    for part in delta.get("tool_calls") or ():
+        calls = message.setdefault("tool_calls", [])
+        index = part.get("index", len(calls))
+        while len(calls) <= index:
+            calls.append({"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+        call = calls[index]
+        if part.get("id"):
+            call["id"] = part["id"]
+        if part.get("type"):
+            call["type"] = part["type"]
+        function = part.get("function") or {}
+        if function.get("name"):
+            call["function"]["name"] += function["name"]
+        if function.get("arguments"):
+            call["function"]["arguments"] += function["arguments"]
+
+
+def create_llm_client(api_url: Optional[str] = None, api_key: Optional[str] = None) -> LLMClient:
+    """Client configured from NOVA_LLM_* environment variables."""
+    return LLMClient(
+        api_url=api_url or DEFAULT_API_URL,
+        api_key=api_key,
+        connect_timeout=float(os.environ.get("NOVA_LLM_CONNECT_TIMEOUT", 5)),
+        read_timeout=float(os.environ.get("NOVA_LLM_READ_TIMEOUT", 60)),
+        max_retries=int(os.environ.get("NOVA_LLM_MAX_RETRIES", 3)),
+    )
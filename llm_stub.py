@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the chat-completions API, for running Nova offline.
+
+    python llm_stub.py --port 8099 [--fail-first 2 --fail-status 429 --retry-after 1]
+    GROQ_API_URL=http://127.0.0.1:8099/v1/chat/completions GROQ_API_KEY=stub python nova_ultimate.py
+
+It answers every POST with an OpenAI-style completion that echoes the last
+user message (as Server-Sent Events when the request has ``stream: true``).
+A user message containing ``[[tool:NAME {json args}]]`` gets a tool call
+back instead, so the agent loop can be exercised too.
+``--fail-first`` / ``--fail-status`` / ``--retry-after`` / ``--delay``
+script failures and slowness for testing the client's retries.
+"""
+
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+_TOOL_REQUEST = re.compile(r"\[\[tool:(\w+)\s*(\{.*?\})?\]\]", re.DOTALL)
+
+
+def make_completion(payload: Dict[str, Any], call_id: int) -> Dict[str, Any]:
+    messages = payload.get("messages", [])
+    last_user = next(
+        (m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), ""
+    )
+    message: Dict[str, Any] = {"role": "assistant", "content": f"(stub) {last_user}"}
+    request = _TOOL_REQUEST.search(last_user)
+    # Ask for the tool once; after the tool result comes back, answer
+    if (
+        request and payload.get("tools") and payload.get("tool_choice") != "none"
+        and messages and messages[-1].get("role") == "user"
+    ):
+        message = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{call_id}",
+                "type": "function",
+                "function": {"name": request.group(1), "arguments": request.group(2) or "{}"},
+            }],
+        }
+    return {
+        "id": f"stub-{call_id}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "stub"),
+        "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+    }
+
+
+def stream_chunks(completion: Dict[str, Any]):
+    """Split a completion into the chunk objects a streaming API would send."""
+    message = completion["choices"][0]["message"]
+    base = {k: completion[k] for k in ("id", "created", "model")}
+    base["object"] = "chat.completion.chunk"
+
+    def chunk(delta, finish=None):
+        return dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": finish}])
+
+    yield chunk({"role": "assistant"})
+    for call_index, call in enumerate(message.get("tool_calls") or ()):
+        yield chunk({"tool_calls": [{
+            "index": call_index, "id": call["id"], "type": "function",
+            "function": {"name": call["function"]["name"], "arguments": ""},
+        }]})
+        arguments = call["function"]["arguments"]
+        middle = len(arguments) // 2
+        for piece in (arguments[:middle], arguments[middle:]):
+            yield chunk({"tool_calls": [{"index": call_index, "function": {"arguments": piece}}]})
+    for word in re.findall(r"\S+\s*", message.get("content") or ""):
+        yield chunk({"content": word})
+    yield chunk({}, "tool_calls" if message.get("tool_calls") else "stop")
+
+
+def start_stub_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    fail_first: int = 0,
+    fail_status: int = 503,
+    retry_after: Optional[str] = None,
+    delay: float = 0.0
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve the stub on a background thread; returns (server, completions URL)."""
+    counter = itertools.count(1)
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            with lock:
+                call_id = next(counter)
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+            if delay:
+                time.sleep(delay)
+            if call_id <= fail_first:
+                self._send(fail_status, {"error": {"message": f"stub failure {call_id}"}},
+                           {"Retry-After": retry_after} if retry_after else {})
+                return
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                self._send(400, {"error": {"message": "invalid JSON"}})
+                return
+            completion = make_completion(payload, call_id)
+            if payload.get("stream"):
+                self._stream(completion)
+            else:
+                self._send(200, completion)
+
+        def _stream(self, completion: Dict[str, Any]):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            for chunk in stream_chunks(completion):
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                if delay:
+                    time.sleep(delay / 10)
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def _send(self, status: int, data: Dict[str, Any], headers: Dict[str, str] = None):
+            raw = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="nova-llm-stub", daemon=True).start()
+    url = f"http://{host}:{server.server_address[1]}/v1/chat/completions"
+    return server, url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline chat-completions stub for Nova")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--fail-first", type=int, default=0, help="fail this many requests first")
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--retry-after", default=None, help="Retry-After header on failures")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to wait per request")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(
+        args.host, args.port, args.fail_first, args.fail_status, args.retry_after, args.delay
+    )
+    print(f"LLM stub listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Monthly archive databases for Nova's memory.
+
+Rows that fall out of the hot retention window are moved into one SQLite
+file per month (``archive/memory-YYYY-MM.db``).  Text columns are stored
+zlib-compressed and indexed by contentless FTS5 tables, so archives stay
+small on disk but can still be searched by ATTACH-ing them.
+"""
+
+import re
+import sqlite3
+import zlib
+from pathlib import Path
+from typing import List, Dict, Iterable, Optional
+
+
+ARCHIVE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS conversations (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        user_message BLOB NOT NULL,
+        nova_response BLOB NOT NULL,
+        tools_used TEXT,
+        context BLOB
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+        user_message, nova_response, content=''
+    );
+
+    CREATE TABLE IF NOT EXISTS knowledge (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        fact_type TEXT NOT NULL,
+        content BLOB NOT NULL,
+        source TEXT,
+        confidence REAL,
+        content_hash TEXT,
+        occurrences INTEGER,
+        updated_at TEXT,
+        evidence_for REAL,
+        evidence_against REAL
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+        content, content=''
+    );
+
+    CREATE TABLE IF NOT EXISTS activity (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        activity_type TEXT NOT NULL,
+        description BLOB NOT NULL,
+        metadata BLOB
+    );
+"""
+
+# Per table: all columns, the compressed ones, and the ones FTS indexes
+ARCHIVE_TABLES = {
+    "conversations": {
+        "columns": ["id", "timestamp", "user_message", "nova_response", "tools_used", "context"],
+        "compressed": {"user_message", "nova_response", "context"},
+        "fts": ["user_message", "nova_response"],
+    },
+    "knowledge": {
+        "columns": ["id", "timestamp", "fact_type", "content", "source", "confidence",
+                    "content_hash", "occurrences", "updated_at",
+                    "evidence_for", "evidence_against"],
+        "compressed": {"content"},
+        "fts": ["content"],
+    },
+    "activity": {
+        "columns": ["id", "timestamp", "activity_type", "description", "metadata"],
+        "compressed": {"description", "metadata"},
+        "fts": [],
+    },
+}
+
+_ARCHIVE_NAME = re.compile(r"-(\d{4}-\d{2})\.db$")
+
+
+def compress(text: Optional[str]) -> Optional[bytes]:
+    if text is None:
+        return None
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def decompress(blob: Optional[bytes]) -> Optional[str]:
+    if blob is None:
+        return None
+    if isinstance(blob, str):
+        return blob
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def register_functions(conn: sqlite3.Connection):
+    """Make ``nova_unzip(blob)`` available to queries on this connection."""
+    conn.create_function("nova_unzip", 1, decompress, deterministic=True)
+
+
+def archive_path(archive_dir: Path, stem: str, month: str) -> Path:
+    return archive_dir / f"{stem}-{month}.db"
+
+
+def list_archives(archive_dir: Path, stem: str) -> List[Path]:
+    """Archive files for ``stem``, newest month first."""
+    if not archive_dir.exists():
+        return []
+    paths = [
+        p for p in archive_dir.glob(f"{stem}-*.db")
+        if _ARCHIVE_NAME.search(p.name)
+    ]
+    return sorted(paths, reverse=True)
+
+
+def write_rows(path: Path, table: str, rows: Iterable[Dict]) -> int:
+    """
+    Copy hot rows into the archive at ``path``.
+
+    Rows whose id is already archived are skipped, so an interrupted
+    archival run can simply be repeated.  Returns the rows written.
+    """
+    spec = ARCHIVE_TABLES[table]
+    columns = spec["columns"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    written = 0
+    try:
+        conn.executescript(ARCHIVE_SCHEMA)
+        _add_missing_columns(conn, table, columns)
+        insert = (
+            f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+        fts_insert = None
+        if spec["fts"]:
+            fts_insert = (
+                f"INSERT INTO {table}_fts (rowid, {', '.join(spec['fts'])}) "
+                f"VALUES (?, {', '.join('?' * len(spec['fts']))})"
+            )
+        with conn:
+            for row in rows:
+                values = [
+                    compress(row[c]) if c in spec["compressed"] else row[c]
+                    for c in columns
+                ]
+                if conn.execute(insert, values).rowcount == 0:
+                    continue
+                written += 1
+                if fts_insert:
+                    conn.execute(fts_insert, [row["id"]] + [row[c] for c in spec["fts"]])
+    finally:
+        conn.close()
+    return written
+
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: List[str]):
+    """Bring archives written by older versions up to the current columns."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for column in columns:
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+
+def make_snippet(
+    text: str,
+    terms: List[str],
+    open_: str,
+    close: str,
+    width: int = 80
+) -> str:
+    """Highlight prefix matches of ``terms`` around the first hit."""
+    if not terms:
+        return text[:width]
+    pattern = re.compile(r"\b(" + "|".join(re.escape(t) for t in terms) + r")\w*", re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(0, match.start() - width // 3) if match else 0
+    window = text[start:start + width]
+    highlighted = pattern.sub(lambda m: f"{open_}{m.group(0)}{close}", window)
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + width < len(text) else ""
+    return f"{prefix}{highlighted}{suffix}"
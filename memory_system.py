@@ -4,11 +4,468 @@ Persistent memory system for Nova - remembers everything across sessions
 
 import sqlite3
 import json
-from datetime import datetime
+import atexit
+import queue
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Callable, Iterable, Tuple
 import hashlib
 
+import memory_archive
+import similarity
+import telemetry
+from vector_index import (
+    VectorIndex, numpy_available, KIND_CONVERSATION, KIND_KNOWLEDGE, KIND_NAMES
+)
+
+
+class ConnectionPool:
+    """
+    Small pool of long-lived SQLite connections shared by all threads.
+
+    Connections are opened lazily, configured once (WAL journal,
+    synchronous=NORMAL, statement cache) and handed out to one thread at a
+    time.  Nested ``connection()`` calls on the same thread reuse the
+    connection already checked out, so a method can call other memory
+    methods inside a single transaction.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_size: int = 8,
+        cached_statements: int = 256,
+        on_connect: Optional[Callable[[sqlite3.Connection], None]] = None
+    ):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.cached_statements = cached_statements
+        self.on_connect = on_connect
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: List[sqlite3.Connection] = []
+        self._closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        if self.on_connect:
+            self.on_connect(conn)
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def _release(self, conn: sqlite3.Connection):
+        if not self._closed and self._idle.qsize() < self.max_size:
+            self._idle.put(conn)
+            return
+        with self._lock:
+            if conn in self._all:
+                self._all.remove(conn)
+        conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Check out a connection for the current thread.
+
+        The outermost block commits on success and rolls back on error.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        self._local.after_commit = []
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            hooks, self._local.after_commit = self._local.after_commit, []
+            self._release(conn)
+        for hook in hooks:
+            try:
+                hook()
+            except Exception:
+                pass  # the write is committed; hooks catch up on the next one
+
+    def after_commit(self, hook: Callable[[], None]):
+        """
+        Run ``hook`` once the current thread's transaction commits (now,
+        outside one).  Dropped on rollback; a hook already registered in
+        this transaction is not added twice.
+        """
+        if getattr(self._local, "conn", None) is None:
+            hook()
+        elif hook not in self._local.after_commit:
+            self._local.after_commit.append(hook)
+
+    def close(self):
+        """Close every connection owned by the pool."""
+        self._closed = True
+        with self._lock:
+            conns, self._all = self._all, []
+        for conn in conns:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                pass
+
+
+class WriteBehindQueue:
+    """
+    Bounded queue of pending writes flushed by a background thread.
+    
+    Writes are grouped into one transaction per batch; a batch is written
+    when it reaches ``max_batch`` items, when ``flush_interval`` seconds
+    have passed since its first item, on ``flush()`` and on shutdown.
+    Each write runs under its own savepoint so one bad row does not lose
+    the rest of the batch.  ``durable=True`` writes block the caller until
+    their batch has been committed.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        max_batch: int = 64,
+        flush_interval: float = 0.5,
+        max_pending: int = 1000,
+        durable: bool = False
+    ):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.durable = durable
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_pending)
+        self._closed = False
+        self._stats = {"written": 0, "failed": 0, "batches": 0}
+        self.last_error: Optional[str] = None
+        self._thread = threading.Thread(
+            target=self._run, name="nova-memory-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, fn: Callable, *args, durable: Optional[bool] = None):
+        """Queue ``fn(*args)``; blocks while the queue is full."""
+        if self._closed:
+            raise RuntimeError("Write-behind queue is closed")
+        if durable is None:
+            durable = self.durable
+        done = threading.Event() if durable else None
+        self._queue.put((fn, args, done))
+        if done is not None:
+            done.wait()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far is committed."""
+        if not self._thread.is_alive():
+            return self._queue.empty()
+        marker = threading.Event()
+        self._queue.put((None, (), marker))
+        return marker.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10):
+        """Flush pending writes and stop the writer thread."""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+        # The registration would keep an evicted tenant alive until exit
+        atexit.unregister(self.close)
+
+    def is_writer_thread(self) -> bool:
+        return threading.current_thread() is self._thread
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats, pending=self._queue.qsize())
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            # Keep gathering until the batch is full, the interval has
+            # elapsed, or someone asked for a flush.
+            while item[0] is not None and len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._write_batch(batch)
+                    return
+                batch.append(item)
+            self._write_batch(batch)
+
+    def _write_batch(self, batch: List[tuple]):
+        try:
+            with self.pool.connection() as conn:
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")
+                for fn, args, _ in batch:
+                    if fn is None:
+                        continue
+                    conn.execute("SAVEPOINT write_behind")
+                    try:
+                        fn(*args)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_behind")
+                        self._stats["failed"] += 1
+                        self.last_error = f"{type(e).__name__}: {e}"
+                    else:
+                        self._stats["written"] += 1
+                    conn.execute("RELEASE write_behind")
+            self._stats["batches"] += 1
+        except sqlite3.Error as e:
+            self._stats["failed"] += len(batch)
+            self.last_error = f"{type(e).__name__}: {e}"
+        finally:
+            for _, _, done in batch:
+                if done is not None:
+                    done.set()
+
+
+# FTS5 indexes over conversation and knowledge text.  External-content
+# tables keep a single copy of the text; triggers keep them in sync.
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+        user_message, nova_response,
+        content='conversations', content_rowid='id', prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS conversations_fts_ai AFTER INSERT ON conversations BEGIN
+        INSERT INTO conversations_fts(rowid, user_message, nova_response)
+        VALUES (new.id, new.user_message, new.nova_response);
+    END;
+    CREATE TRIGGER IF NOT EXISTS conversations_fts_ad AFTER DELETE ON conversations BEGIN
+        INSERT INTO conversations_fts(conversations_fts, rowid, user_message, nova_response)
+        VALUES ('delete', old.id, old.user_message, old.nova_response);
+    END;
+    CREATE TRIGGER IF NOT EXISTS conversations_fts_au AFTER UPDATE ON conversations BEGIN
+        INSERT INTO conversations_fts(conversations_fts, rowid, user_message, nova_response)
+        VALUES ('delete', old.id, old.user_message, old.nova_response);
+        INSERT INTO conversations_fts(rowid, user_message, nova_response)
+        VALUES (new.id, new.user_message, new.nova_response);
+    END;
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+        content,
+        content='knowledge', content_rowid='id', prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS knowledge_fts_ai AFTER INSERT ON knowledge BEGIN
+        INSERT INTO knowledge_fts(rowid, content) VALUES (new.id, new.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS knowledge_fts_ad AFTER DELETE ON knowledge BEGIN
+        INSERT INTO knowledge_fts(knowledge_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+    END;
+    CREATE TRIGGER IF NOT EXISTS knowledge_fts_au AFTER UPDATE OF content ON knowledge BEGIN
+        INSERT INTO knowledge_fts(knowledge_fts, rowid, content)
+        VALUES ('delete', old.id, old.content);
+        INSERT INTO knowledge_fts(rowid, content) VALUES (new.id, new.content);
+    END;
+"""
+
+# Row counters kept current by triggers so statistics never scan tables.
+# Keys: '<table>' totals, 'fact_type:<type>' and '<table>_day:<YYYY-MM-DD>'.
+# Day counters record what was written each day and are not decremented
+# when rows are archived.  'maintenance_last_run' holds the unix time of
+# the last run_maintenance(); 'db_identity' is a random id for the database
+# file, which tells its vector index apart from one built for another.
+STATS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS memory_stats (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+
+    CREATE TRIGGER IF NOT EXISTS conversations_stats_ai AFTER INSERT ON conversations BEGIN
+        INSERT INTO memory_stats(key, value) VALUES ('conversations', 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        INSERT INTO memory_stats(key, value) VALUES ('conversations_day:' || substr(new.timestamp, 1, 10), 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS conversations_stats_ad AFTER DELETE ON conversations BEGIN
+        UPDATE memory_stats SET value = value - 1 WHERE key = 'conversations';
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS knowledge_stats_ai AFTER INSERT ON knowledge BEGIN
+        INSERT INTO memory_stats(key, value) VALUES ('knowledge', 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        INSERT INTO memory_stats(key, value) VALUES ('fact_type:' || new.fact_type, 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS knowledge_stats_ad AFTER DELETE ON knowledge BEGIN
+        UPDATE memory_stats SET value = value - 1 WHERE key = 'knowledge';
+        UPDATE memory_stats SET value = value - 1 WHERE key = 'fact_type:' || old.fact_type;
+    END;
+    CREATE TRIGGER IF NOT EXISTS knowledge_stats_au AFTER UPDATE OF fact_type ON knowledge BEGIN
+        UPDATE memory_stats SET value = value - 1 WHERE key = 'fact_type:' || old.fact_type;
+        INSERT INTO memory_stats(key, value) VALUES ('fact_type:' || new.fact_type, 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS activity_stats_ai AFTER INSERT ON activity BEGIN
+        INSERT INTO memory_stats(key, value) VALUES ('activity', 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1;
+        INSERT INTO memory_stats(key, value) VALUES ('activity_day:' || substr(new.timestamp, 1, 10), 1)
+            ON CONFLICT(key) DO UPDATE SET value = value + 1;
+    END;
+    CREATE TRIGGER IF NOT EXISTS activity_stats_ad AFTER DELETE ON activity BEGIN
+        UPDATE memory_stats SET value = value - 1 WHERE key = 'activity';
+    END;
+"""
+
+# MinHash signature and LSH band buckets per conversation (see similarity.py)
+SIMILARITY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS conversation_minhash (
+        conversation_id INTEGER PRIMARY KEY,
+        signature BLOB NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS conversation_lsh (
+        bucket INTEGER NOT NULL,
+        conversation_id INTEGER NOT NULL,
+        PRIMARY KEY (bucket, conversation_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_conversation_lsh_id ON conversation_lsh(conversation_id);
+    CREATE TRIGGER IF NOT EXISTS conversations_minhash_ad AFTER DELETE ON conversations BEGIN
+        DELETE FROM conversation_minhash WHERE conversation_id = old.id;
+        DELETE FROM conversation_lsh WHERE conversation_id = old.id;
+    END;
+"""
+
+KNOWLEDGE_TABLE = """
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        fact_type TEXT NOT NULL,
+        content TEXT NOT NULL,
+        source TEXT,
+        confidence REAL DEFAULT 1.0,
+        content_hash TEXT NOT NULL,
+        occurrences INTEGER NOT NULL DEFAULT 1,
+        updated_at TEXT,
+        evidence_for REAL NOT NULL DEFAULT 0,
+        evidence_against REAL NOT NULL DEFAULT 0
+    )
+"""
+
+# One statement for both new and repeated facts: repeats bump the
+# occurrence counter and fold their confidence into a running mean.
+UPSERT_FACT = """
+    INSERT INTO knowledge (
+        timestamp, fact_type, content, source, confidence,
+        content_hash, occurrences, updated_at
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(content_hash) DO UPDATE SET
+        confidence = (confidence * occurrences + excluded.confidence * excluded.occurrences)
+                     / (occurrences + excluded.occurrences),
+        occurrences = occurrences + excluded.occurrences,
+        updated_at = excluded.updated_at
+"""
+
+
+def belief_confidence(
+    confidence: float,
+    occurrences: int,
+    evidence_for: float,
+    evidence_against: float,
+    age_days: float,
+    half_life_days: float
+) -> float:
+    """
+    Current confidence in a fact.
+    
+    The stored confidence and occurrence count form a Beta prior
+    (``occurrences`` pseudo-observations at ``confidence``), feedback adds
+    evidence for or against, and the posterior mean then halves every
+    ``half_life_days`` since the fact was last seen or reinforced.
+    """
+    confidence = 1.0 if confidence is None else confidence
+    weight = max(occurrences or 1, 1)
+    alpha = weight * confidence + (evidence_for or 0.0)
+    beta = weight * (1.0 - confidence) + (evidence_against or 0.0)
+    mean = alpha / (alpha + beta) if alpha + beta > 0 else 0.0
+    return mean * 0.5 ** (max(age_days or 0.0, 0.0) / half_life_days)
+
+
+# SQL for a knowledge row's current confidence (k is the table alias)
+BELIEF_SQL = (
+    "nova_belief(k.confidence, k.occurrences, k.evidence_for, k.evidence_against, "
+    "julianday('now') - julianday(COALESCE(k.updated_at, k.timestamp)))"
+)
+
+
+def content_hash(content: str) -> str:
+    """Stable dedupe key for a fact (whitespace/case-insensitive)."""
+    normalized = " ".join(content.split()).lower()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+_FTS_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_terms(text: str, max_terms: int = 16) -> List[str]:
+    """Distinct lowercase words of ``text`` (at most ``max_terms``)."""
+    terms = []
+    for token in _FTS_TOKEN.findall(text.lower()):
+        if token not in terms:
+            terms.append(token)
+        if len(terms) >= max_terms:
+            break
+    return terms
+
+
+def build_fts_query(text: str, max_terms: int = 16) -> str:
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term and terms are OR-ed together,
+    so BM25 ranks rows by how many (and how rare) the matching words are.
+    """
+    return " OR ".join(f'"{t}"*' for t in fts_terms(text, max_terms))
+
 
 class NovaMemory:
     """
@@ -16,16 +473,264 @@ class NovaMemory:
     Stores conversations, facts learned, and context forever.
     """
     
-    def __init__(self, db_path: str = "~/.nova/memory.db"):
+    # Markers wrapped around matched terms in search snippets
+    SNIPPET_OPEN = "«"
+    SNIPPET_CLOSE = "»"
+    
+    # What the prompt context snapshot keeps
+    CONTEXT_CONVERSATIONS = 5
+    CONTEXT_ACTIVITIES = 3
+    PROFILE_CONTEXT_KEYS = ('favorite_topics', 'current_projects', 'mood', 'goals')
+    
+    # Incremental vacuum: only bother past this many free pages, and
+    # reclaim at most this many per maintenance run
+    VACUUM_MIN_FREE_PAGES = 256
+    VACUUM_STEP_PAGES = 2048
+    
+    # Beliefs: confidence halves after this many days without being seen
+    # or reinforced; with prune_below set, maintenance archives facts that
+    # fall below it (prune_knowledge() defaults to PRUNE_CONFIDENCE)
+    BELIEF_HALF_LIFE_DAYS = 90.0
+    PRUNE_CONFIDENCE = 0.1
+    
+    def __init__(
+        self,
+        db_path: str = "~/.nova/memory.db",
+        pool_size: int = 8,
+        write_behind: bool = False,
+        write_behind_options: Dict[str, Any] = None,
+        semantic_index: bool = True,
+        embedder=None,
+        retention_days: Optional[int] = None,
+        maintenance_interval: Optional[float] = 6 * 3600,
+        prune_below: Optional[float] = None
+    ):
         self.db_path = Path(db_path).expanduser()
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Retention: rows older than retention_days move to monthly
+        # archives under archive_dir (None keeps everything hot).
+        self.retention_days = retention_days
+        self.archive_dir = self.db_path.parent / "archive"
+        # Pruning: maintenance archives facts whose belief confidence has
+        # decayed below prune_below (None never prunes).
+        self.prune_below = prune_below
+        self.maintenance_interval = maintenance_interval
+        self._maintenance_lock = threading.Lock()
+        
+        self._pool = ConnectionPool(
+            self.db_path, max_size=pool_size, on_connect=self._configure_connection
+        )
         self._init_db()
+        self._next_maintenance = self._first_maintenance_time()
+        
+        # Local embedding index over conversations and facts (needs numpy)
+        self._vectors: Optional[VectorIndex] = None
+        self._index_lock = threading.Lock()
+        if semantic_index and numpy_available():
+            self._vectors = VectorIndex(
+                self.db_path.with_suffix(""), embedder, source=self._database_identity()
+            )
+            self._index_new_rows()
+        
+        # Optional write-behind: conversation/fact/activity inserts are
+        # queued and committed in batches off the caller's thread.
+        self._writer: Optional[WriteBehindQueue] = None
+        if write_behind:
+            self._writer = WriteBehindQueue(self._pool, **(write_behind_options or {}))
+        
+        # In-memory snapshot behind get_context_for_prompt, updated by the
+        # write paths.  None in _context_text means "re-render on next read".
+        self._context_lock = threading.Lock()
+        self._context_stale = True
+        self._context_text: Optional[str] = None
+        self._context_convs: deque = deque(maxlen=self.CONTEXT_CONVERSATIONS)
+        self._context_activity: deque = deque(maxlen=self.CONTEXT_ACTIVITIES)
+        self._context_profile: Dict[str, Any] = {}
+    
+    def connection(self):
+        """Context manager yielding a pooled connection (one transaction)."""
+        return self._pool.connection()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued write-behind writes to be committed."""
+        if self._writer is None:
+            return True
+        return self._writer.flush(timeout)
+    
+    def get_write_stats(self) -> Dict[str, Any]:
+        """Write-behind queue counters (empty when running synchronously)."""
+        return self._writer.stats() if self._writer else {}
+    
+    def close(self):
+        """Flush pending writes and release all pooled connections."""
+        if self._writer is not None:
+            self._writer.close()
+        self._pool.close()
+    
+    def _submit_write(self, fn: Callable, *args, durable: Optional[bool] = None):
+        """Run a write now, or hand it to the write-behind queue."""
+        if self._writer is None or self._writer.is_writer_thread():
+            fn(*args)
+        else:
+            self._writer.submit(fn, *args, durable=durable)
+    
+    def _configure_connection(self, conn: sqlite3.Connection):
+        """Per-connection SQL functions."""
+        half_life = self.BELIEF_HALF_LIFE_DAYS
+        conn.create_function(
+            "nova_belief", 5,
+            lambda *args: belief_confidence(*args, half_life_days=half_life),
+            deterministic=True
+        )
     
     def _init_db(self):
         """Initialize database schema."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.connection() as conn:
+            self._create_schema(conn.cursor())
+            self._migrate(conn)
+            self._fts_enabled = self._has_table(conn, "conversations_fts")
+    
+    def _migrations(self):
+        """Ordered schema migrations; index + 1 is the target user_version."""
+        return [
+            self._migrate_fts_index,
+            self._migrate_knowledge_hash,
+            self._migrate_incremental_vacuum,
+            self._migrate_stats_counters,
+            self._migrate_similarity_index,
+            self._migrate_belief_evidence,
+        ]
+    
+    def _migrate(self, conn: sqlite3.Connection):
+        """Apply pending migrations tracked via PRAGMA user_version."""
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        for target, migration in enumerate(self._migrations(), start=1):
+            if version < target:
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {target}")
+    
+    def _migrate_fts_index(self, conn: sqlite3.Connection):
+        """Create FTS5 indexes and backfill them from existing rows."""
+        try:
+            conn.executescript("BEGIN;" + FTS_SCHEMA + "COMMIT;")
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: search_memory falls back to LIKE
+            conn.rollback()
+            return
+        conn.execute("INSERT INTO conversations_fts(conversations_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO knowledge_fts(knowledge_fts) VALUES ('rebuild')")
+    
+    def _migrate_knowledge_hash(self, conn: sqlite3.Connection):
+        """
+        Key knowledge on a content hash instead of UNIQUE(content).
         
+        Old databases are rebuilt (ids are kept, duplicates that only
+        differ in case/whitespace are merged) and the FTS index resynced.
+        """
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(knowledge)")}
+        if "content_hash" not in columns:
+            conn.create_function("nova_content_hash", 1, content_hash, deterministic=True)
+            script = [
+                "BEGIN;",
+                KNOWLEDGE_TABLE.format(name="knowledge_new") + ";",
+                "CREATE UNIQUE INDEX knowledge_new_hash ON knowledge_new(content_hash);",
+                """
+                INSERT INTO knowledge_new (
+                    id, timestamp, fact_type, content, source, confidence,
+                    content_hash, occurrences, updated_at
+                )
+                SELECT id, timestamp, fact_type, content, source, confidence,
+                       nova_content_hash(content), 1, timestamp
+                FROM knowledge WHERE true ORDER BY id
+                ON CONFLICT(content_hash) DO UPDATE SET occurrences = occurrences + 1;
+                """,
+                "DROP TABLE knowledge;",
+                "DROP INDEX knowledge_new_hash;",
+                "ALTER TABLE knowledge_new RENAME TO knowledge;",
+            ]
+            if self._has_table(conn, "knowledge_fts"):
+                # Dropping the table took its FTS triggers with it
+                script.append(FTS_SCHEMA)
+                script.append("INSERT INTO knowledge_fts(knowledge_fts) VALUES ('rebuild');")
+            script.append("COMMIT;")
+            conn.executescript("\n".join(script))
+        conn.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_knowledge_content_hash
+            ON knowledge(content_hash)
+        """)
+    
+    def _migrate_incremental_vacuum(self, conn: sqlite3.Connection):
+        """Switch to auto_vacuum=INCREMENTAL (needs a one-time VACUUM)."""
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+    
+    def _migrate_stats_counters(self, conn: sqlite3.Connection):
+        """Create trigger-maintained counters and seed them from the tables."""
+        conn.executescript("BEGIN;" + STATS_SCHEMA + """
+            DELETE FROM memory_stats;
+            INSERT INTO memory_stats(key, value)
+                SELECT 'conversations', COUNT(*) FROM conversations;
+            INSERT INTO memory_stats(key, value)
+                SELECT 'knowledge', COUNT(*) FROM knowledge;
+            INSERT INTO memory_stats(key, value)
+                SELECT 'activity', COUNT(*) FROM activity;
+            INSERT INTO memory_stats(key, value)
+                SELECT 'fact_type:' || fact_type, COUNT(*) FROM knowledge GROUP BY fact_type;
+            INSERT INTO memory_stats(key, value)
+                SELECT 'conversations_day:' || substr(timestamp, 1, 10), COUNT(*)
+                FROM conversations GROUP BY 1;
+            INSERT INTO memory_stats(key, value)
+                SELECT 'activity_day:' || substr(timestamp, 1, 10), COUNT(*)
+                FROM activity GROUP BY 1;
+        COMMIT;""")
+    
+    def _migrate_similarity_index(self, conn: sqlite3.Connection, batch: int = 1000):
+        """Create the MinHash/LSH tables and sign existing conversations."""
+        conn.executescript(SIMILARITY_SCHEMA)
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                "SELECT id, user_message FROM conversations WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch)
+            ).fetchall()
+            if not rows:
+                break
+            for conversation_id, user_message in rows:
+                self._store_signature(conn, conversation_id, user_message)
+            last_id = rows[-1][0]
+    
+    def _migrate_belief_evidence(self, conn: sqlite3.Connection):
+        """Add feedback evidence counters to knowledge."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(knowledge)")}
+        for column in ("evidence_for", "evidence_against"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE knowledge ADD COLUMN {column} REAL NOT NULL DEFAULT 0")
+    
+    @staticmethod
+    def _store_signature(conn: sqlite3.Connection, conversation_id: int, text: str):
+        sig = similarity.signature(text)
+        conn.execute(
+            "INSERT OR REPLACE INTO conversation_minhash (conversation_id, signature) VALUES (?, ?)",
+            (conversation_id, similarity.pack(sig))
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO conversation_lsh (bucket, conversation_id) VALUES (?, ?)",
+            [(bucket, conversation_id) for bucket in similarity.band_buckets(sig)]
+        )
+    
+    @staticmethod
+    def _has_table(conn: sqlite3.Connection, name: str) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+        ).fetchone() is not None
+    
+    def _create_schema(self, cursor: sqlite3.Cursor):
+        """Create base tables if they do not exist."""
         # Conversations table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS conversations (
@@ -38,18 +743,8 @@ class NovaMemory:
             )
         """)
         
-        # Facts/knowledge table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS knowledge (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                fact_type TEXT NOT NULL,
-                content TEXT NOT NULL,
-                source TEXT,
-                confidence REAL DEFAULT 1.0,
-                UNIQUE(content)
-            )
-        """)
+        # Facts/knowledge table (deduplicated on content_hash, see migrations)
+        cursor.execute(KNOWLEDGE_TABLE.format(name="knowledge"))
         
         # Stephen's profile/preferences
         cursor.execute("""
@@ -70,83 +765,363 @@ class NovaMemory:
                 metadata TEXT
             )
         """)
-        
-        conn.commit()
-        conn.close()
     
+    @telemetry.timed("memory.save_conversation")
     def save_conversation(
         self, 
         user_message: str, 
         nova_response: str,
         tools_used: List[str] = None,
-        context: Dict[str, Any] = None
+        context: Dict[str, Any] = None,
+        durable: Optional[bool] = None
     ):
-        """Save a conversation exchange."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """
+        Save a conversation exchange.
         
-        cursor.execute("""
-            INSERT INTO conversations (timestamp, user_message, nova_response, tools_used, context)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            datetime.utcnow().isoformat(),
-            user_message,
-            nova_response,
-            json.dumps(tools_used or []),
-            json.dumps(context or {})
-        ))
-        
-        conn.commit()
-        conn.close()
+        With write-behind enabled the row is committed asynchronously
+        unless ``durable`` is set; the prompt context sees it immediately.
+        """
+        # Queued under the context lock: a snapshot reload (which flushes
+        # the queue first) then sees the row either committed or appended
+        # below, never both and never neither
+        with self._context_lock:
+            self._submit_write(
+                self._insert_conversation,
+                datetime.utcnow().isoformat(),
+                user_message,
+                nova_response,
+                json.dumps(tools_used or []),
+                json.dumps(context or {}),
+                durable=durable
+            )
+            self._context_convs.append((user_message, nova_response))
+            self._context_text = None
+        
+        self._maybe_schedule_maintenance()
+    
+    def _insert_conversation(self, timestamp, user_message, nova_response, tools_used, context):
+        with self.connection() as conn:
+            cursor = conn.execute("""
+                INSERT INTO conversations (timestamp, user_message, nova_response, tools_used, context)
+                VALUES (?, ?, ?, ?, ?)
+            """, (timestamp, user_message, nova_response, tools_used, context))
+            self._store_signature(conn, cursor.lastrowid, user_message)
+            # Vectors are appended only for committed rows
+            self._pool.after_commit(self._index_new_rows)
     
     def learn_fact(
         self,
         fact_type: str,
         content: str,
         source: str = "conversation",
-        confidence: float = 1.0
+        confidence: float = 1.0,
+        durable: Optional[bool] = None
     ):
-        """Store a new fact/piece of knowledge."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """
+        Store a new fact/piece of knowledge.
         
-        try:
-            cursor.execute("""
-                INSERT INTO knowledge (timestamp, fact_type, content, source, confidence)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                datetime.utcnow().isoformat(),
-                fact_type,
-                content,
-                source,
-                confidence
-            ))
-            conn.commit()
-        except sqlite3.IntegrityError:
-            # Fact already exists, update confidence
-            cursor.execute("""
-                UPDATE knowledge 
-                SET confidence = ?, updated_at = ?
-                WHERE content = ?
-            """, (confidence, datetime.utcnow().isoformat(), content))
-            conn.commit()
-        finally:
-            conn.close()
+        Repeating a known fact increments its occurrence count and
+        averages the confidence in.
+        """
+        self.learn_facts([(fact_type, content, source, confidence)], durable=durable)
     
-    def get_recent_conversations(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get recent conversation history."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    @telemetry.timed("memory.learn_facts")
+    def learn_facts(
+        self,
+        facts: Iterable[Tuple[str, str, str, float]],
+        durable: Optional[bool] = None
+    ):
+        """
+        Store many facts with a single upsert statement.
         
-        cursor.execute("""
-            SELECT timestamp, user_message, nova_response, tools_used, context
-            FROM conversations
-            ORDER BY id DESC
-            LIMIT ?
-        """, (limit,))
+        Duplicates within the call are coalesced into one row whose
+        confidence is their mean and whose weight is their count, which
+        leaves the stored running mean exactly as if each was written alone.
         
-        rows = cursor.fetchall()
-        conn.close()
+        Args:
+            facts: (fact_type, content, source, confidence) tuples
+        """
+        timestamp = datetime.utcnow().isoformat()
+        merged: Dict[str, list] = {}
+        for fact_type, content, source, confidence in facts:
+            key = content_hash(content)
+            row = merged.get(key)
+            if row is None:
+                merged[key] = [timestamp, fact_type, content, source, confidence, key, 1, timestamp]
+            else:
+                row[4] = (row[4] * row[6] + confidence) / (row[6] + 1)
+                row[6] += 1
+        rows = [tuple(row) for row in merged.values()]
+        if rows:
+            self._submit_write(self._upsert_facts, rows, durable=durable)
+    
+    def _upsert_facts(self, rows: List[tuple]):
+        with self.connection() as conn:
+            conn.executemany(UPSERT_FACT, rows)
+            self._pool.after_commit(self._index_new_rows)
+    
+    def reinforce_fact(
+        self,
+        content: str,
+        positive: bool = True,
+        weight: float = 1.0,
+        durable: Optional[bool] = None
+    ):
+        """Record feedback for or against a known fact (a Bayesian update)."""
+        self.reinforce_facts([content], positive, weight, durable=durable)
+    
+    def reinforce_facts(
+        self,
+        contents: Iterable[str],
+        positive: bool = True,
+        weight: float = 1.0,
+        durable: Optional[bool] = None
+    ):
+        """
+        Add ``weight`` evidence for (or against) each fact.
+        
+        Feedback also refreshes the fact, restarting its time decay.
+        Unknown facts are ignored.
+        """
+        hashes = list(dict.fromkeys(content_hash(c) for c in contents))
+        if hashes:
+            column = "evidence_for" if positive else "evidence_against"
+            self._submit_write(
+                self._apply_evidence, column, weight, datetime.utcnow().isoformat(), hashes,
+                durable=durable
+            )
+    
+    def _apply_evidence(self, column: str, weight: float, timestamp: str, hashes: List[str]):
+        with self.connection() as conn:
+            conn.executemany(
+                f"UPDATE knowledge SET {column} = {column} + ?, updated_at = ? WHERE content_hash = ?",
+                [(weight, timestamp, h) for h in hashes]
+            )
+    
+    @telemetry.timed("memory.get_beliefs")
+    def get_beliefs(
+        self,
+        fact_type: Optional[str] = None,
+        min_confidence: float = 0.0,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Facts ranked by current (decayed, feedback-adjusted) confidence."""
+        where, params = "", []
+        if fact_type:
+            where, params = "WHERE k.fact_type = ?", [fact_type]
+        with self.connection() as conn:
+            rows = conn.execute(f"""
+                SELECT * FROM (
+                    SELECT k.fact_type, k.content, k.source, k.occurrences,
+                           k.evidence_for, k.evidence_against,
+                           COALESCE(k.updated_at, k.timestamp), {BELIEF_SQL} AS belief
+                    FROM knowledge k {where}
+                )
+                WHERE belief >= ?
+                ORDER BY belief DESC
+                LIMIT ?
+            """, params + [min_confidence, limit]).fetchall()
+        
+        return [
+            {
+                "fact_type": row[0],
+                "content": row[1],
+                "source": row[2],
+                "occurrences": row[3],
+                "evidence_for": row[4],
+                "evidence_against": row[5],
+                "last_seen": row[6],
+                "confidence": round(row[7], 4)
+            }
+            for row in rows
+        ]
+    
+    def _database_identity(self) -> int:
+        """Random id stored in the database, so its index can tell it apart from others."""
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO memory_stats(key, value) VALUES ('db_identity', ?)",
+                (secrets.randbits(62),)
+            )
+            return conn.execute(
+                "SELECT value FROM memory_stats WHERE key = 'db_identity'"
+            ).fetchone()[0]
+    
+    def _index_new_rows(self, batch: int = 500):
+        """
+        Append embeddings for rows newer than the index high-water marks.
+        
+        Call it only after the rows are committed (see ConnectionPool.after_commit).
+        """
+        if self._vectors is None:
+            return
+        sources = (
+            (KIND_CONVERSATION, "conversations", "SELECT id, user_message || ' ' || nova_response FROM conversations"),
+            (KIND_KNOWLEDGE, "knowledge", "SELECT id, content FROM knowledge"),
+        )
+        with self._index_lock, self.connection() as conn:
+            for kind, table, _ in sources:
+                # AUTOINCREMENT never reuses an id that was committed, so
+                # the sequence only falls behind the index when the file
+                # was restored from an older copy of this database
+                issued = conn.execute(
+                    "SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)
+                ).fetchone()
+                issued = issued[0] if issued else 0
+                if issued < self._vectors.high_water[KIND_NAMES[kind]]:
+                    self._vectors.forget_after(kind, issued)
+            for kind, _, select in sources:
+                while True:
+                    rows = conn.execute(
+                        f"{select} WHERE id > ? ORDER BY id LIMIT ?",
+                        (self._vectors.high_water[KIND_NAMES[kind]], batch)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    self._vectors.append(kind, ((row_id, text[:4000]) for row_id, text in rows))
+    
+    @telemetry.timed("memory.semantic_search")
+    def semantic_search(
+        self,
+        query: str,
+        k: int = 5,
+        kind: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Nearest conversations/facts by embedding similarity.
+        
+        Args:
+            query: Free text to compare against
+            k: Number of hits
+            kind: 'conversation', 'knowledge' or None for both
+        """
+        if self._vectors is None or not query.strip():
+            return []
+        kind_code = {name: code for code, name in KIND_NAMES.items()}.get(kind)
+        hits = self._vectors.search([query], k=k, kind=kind_code)[0]
+        if not hits:
+            return []
+        
+        conv_ids = [row_id for code, row_id, _ in hits if code == KIND_CONVERSATION]
+        fact_ids = [row_id for code, row_id, _ in hits if code == KIND_KNOWLEDGE]
+        with self.connection() as conn:
+            convs = self._rows_by_id(conn, """
+                SELECT id, timestamp, user_message, nova_response, tools_used
+                FROM conversations WHERE id IN ({})
+            """, conv_ids)
+            facts = self._rows_by_id(conn, """
+                SELECT id, timestamp, fact_type, content FROM knowledge WHERE id IN ({})
+            """, fact_ids)
+        
+        results = []
+        for code, row_id, score in hits:
+            if code == KIND_CONVERSATION and row_id in convs:
+                row = convs[row_id]
+                results.append({
+                    "type": "conversation",
+                    "id": row_id,
+                    "timestamp": row[1],
+                    "user": row[2],
+                    "nova": row[3],
+                    "tools": json.loads(row[4]) if row[4] else [],
+                    "similarity": score
+                })
+            elif code == KIND_KNOWLEDGE and row_id in facts:
+                row = facts[row_id]
+                results.append({
+                    "type": "knowledge",
+                    "id": row_id,
+                    "timestamp": row[1],
+                    "fact_type": row[2],
+                    "content": row[3],
+                    "similarity": score
+                })
+        return results
+    
+    @telemetry.timed("memory.find_similar_queries")
+    def find_similar_queries(
+        self,
+        query: str,
+        k: int = 3,
+        min_similarity: float = 0.2,
+        budget_ms: float = 25.0,
+        bucket_limit: int = 64
+    ) -> List[Dict[str, Any]]:
+        """
+        Past user messages most similar to ``query``, with their tools.
+        
+        Candidates come from the LSH buckets of the query's MinHash
+        signature, newest ``bucket_limit`` per bucket, so the work per
+        lookup is bounded however long the history gets.  Candidates are
+        ranked by estimated Jaccard similarity; once ``budget_ms`` is spent
+        the best hits found so far are returned.
+        """
+        if not query.strip():
+            return []
+        deadline = time.monotonic() + budget_ms / 1000
+        sig = similarity.signature(query)
+        hits: Dict[int, int] = {}
+        with self.connection() as conn:
+            for bucket in similarity.band_buckets(sig):
+                rows = conn.execute("""
+                    SELECT conversation_id FROM conversation_lsh
+                    WHERE bucket = ? ORDER BY conversation_id DESC LIMIT ?
+                """, (bucket, bucket_limit)).fetchall()
+                for (conversation_id,) in rows:
+                    hits[conversation_id] = hits.get(conversation_id, 0) + 1
+                if time.monotonic() > deadline:
+                    break
+            
+            # Most shared bands first: those are the likeliest matches
+            candidates = sorted(hits, key=lambda cid: (hits[cid], cid), reverse=True)
+            candidates = candidates[:bucket_limit * 2]
+            signatures = self._rows_by_id(conn, """
+                SELECT conversation_id, signature FROM conversation_minhash
+                WHERE conversation_id IN ({})
+            """, candidates)
+            scored = []
+            for conversation_id in candidates:
+                row = signatures.get(conversation_id)
+                if row is None:
+                    continue
+                score = similarity.estimate_jaccard(sig, similarity.unpack(row[1]))
+                if score >= min_similarity:
+                    scored.append((score, conversation_id))
+            scored.sort(reverse=True)
+            best = scored[:k]
+            convs = self._rows_by_id(conn, """
+                SELECT id, timestamp, user_message, tools_used
+                FROM conversations WHERE id IN ({})
+            """, [conversation_id for _, conversation_id in best])
+        
+        return [
+            {
+                "id": conversation_id,
+                "timestamp": convs[conversation_id][1],
+                "user": convs[conversation_id][2],
+                "tools": json.loads(convs[conversation_id][3]) if convs[conversation_id][3] else [],
+                "similarity": score
+            }
+            for score, conversation_id in best
+            if conversation_id in convs
+        ]
+    
+    @staticmethod
+    def _rows_by_id(conn: sqlite3.Connection, sql: str, ids: List[int]) -> Dict[int, tuple]:
+        if not ids:
+            return {}
+        rows = conn.execute(sql.format(",".join("?" * len(ids))), ids).fetchall()
+        return {row[0]: row for row in rows}
+    
+    def get_recent_conversations(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get recent conversation history."""
+        with self.connection() as conn:
+            rows = conn.execute("""
+                SELECT timestamp, user_message, nova_response, tools_used, context
+                FROM conversations
+                ORDER BY id DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
         
         return [
             {
@@ -159,33 +1134,160 @@ class NovaMemory:
             for row in rows
         ][::-1]  # Reverse to chronological order
     
-    def search_memory(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Search past conversations and knowledge."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    @telemetry.timed("memory.search_memory")
+    def search_memory(
+        self,
+        query: str,
+        limit: int = 5,
+        include_archive: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Search past conversations and knowledge.
         
-        # Search conversations
-        cursor.execute("""
-            SELECT timestamp, user_message, nova_response
-            FROM conversations
-            WHERE user_message LIKE ? OR nova_response LIKE ?
-            ORDER BY id DESC
-            LIMIT ?
-        """, (f"%{query}%", f"%{query}%", limit))
+        Uses the FTS5 indexes (BM25-ranked, with highlighted snippets)
+        when available, otherwise a LIKE scan.  When the hot tables return
+        fewer than ``limit`` hits, monthly archives are searched too,
+        newest first.
+        """
+        if not self._fts_enabled:
+            return self._search_memory_like(query, limit)
         
-        conv_results = cursor.fetchall()
+        match = build_fts_query(query)
+        if not match:
+            return []
         
-        # Search knowledge
-        cursor.execute("""
-            SELECT timestamp, fact_type, content
-            FROM knowledge
-            WHERE content LIKE ?
-            ORDER BY confidence DESC, id DESC
-            LIMIT ?
-        """, (f"%{query}%", limit))
-        
-        knowledge_results = cursor.fetchall()
-        conn.close()
+        open_, close = self.SNIPPET_OPEN, self.SNIPPET_CLOSE
+        with self.connection() as conn:
+            # Search conversations
+            conv_results = conn.execute("""
+                SELECT c.timestamp, c.user_message, c.nova_response,
+                       snippet(conversations_fts, -1, ?, ?, '…', 12),
+                       bm25(conversations_fts) AS score, c.tools_used
+                FROM conversations_fts
+                JOIN conversations c ON c.id = conversations_fts.rowid
+                WHERE conversations_fts MATCH ?
+                ORDER BY score
+                LIMIT ?
+            """, (open_, close, match, limit)).fetchall()
+            
+            # Search knowledge; relevance is weighted by current belief
+            knowledge_results = conn.execute("""
+                SELECT k.timestamp, k.fact_type, k.content,
+                       snippet(knowledge_fts, 0, ?, ?, '…', 12),
+                       bm25(knowledge_fts) AS score
+                FROM knowledge_fts
+                JOIN knowledge k ON k.id = knowledge_fts.rowid
+                WHERE knowledge_fts MATCH ?
+                ORDER BY score * (0.5 + {belief})
+                LIMIT ?
+            """.format(belief=BELIEF_SQL), (open_, close, match, limit)).fetchall()
+            
+            if include_archive and not conn.in_transaction:
+                terms = fts_terms(query)
+                for path in memory_archive.list_archives(self.archive_dir, self.db_path.stem):
+                    if len(conv_results) >= limit and len(knowledge_results) >= limit:
+                        break
+                    conv_more, knowledge_more = self._search_archive(
+                        conn, path, match, terms,
+                        limit - len(conv_results), limit - len(knowledge_results)
+                    )
+                    conv_results.extend(conv_more)
+                    knowledge_results.extend(knowledge_more)
+        
+        results = []
+        
+        for row in conv_results:
+            results.append({
+                "type": "conversation",
+                "timestamp": row[0],
+                "user": row[1],
+                "nova": row[2],
+                "snippet": row[3],
+                "score": row[4],
+                "tools": json.loads(row[5]) if row[5] else []
+            })
+        
+        for row in knowledge_results:
+            results.append({
+                "type": "knowledge",
+                "timestamp": row[0],
+                "fact_type": row[1],
+                "content": row[2],
+                "snippet": row[3],
+                "score": row[4]
+            })
+        
+        return results
+    
+    def _search_archive(
+        self,
+        conn: sqlite3.Connection,
+        path: Path,
+        match: str,
+        terms: List[str],
+        conv_limit: int,
+        knowledge_limit: int
+    ):
+        """Query one archive database through ATTACH."""
+        open_, close = self.SNIPPET_OPEN, self.SNIPPET_CLOSE
+        memory_archive.register_functions(conn)
+        conn.execute("ATTACH DATABASE ? AS nova_archive", (str(path),))
+        try:
+            conv_rows, knowledge_rows = [], []
+            if conv_limit > 0:
+                conv_rows = conn.execute("""
+                    SELECT a.timestamp, nova_unzip(a.user_message), nova_unzip(a.nova_response),
+                           bm25(conversations_fts) AS score, a.tools_used
+                    FROM nova_archive.conversations_fts
+                    JOIN nova_archive.conversations a ON a.id = conversations_fts.rowid
+                    WHERE conversations_fts MATCH ?
+                    ORDER BY score
+                    LIMIT ?
+                """, (match, conv_limit)).fetchall()
+            if knowledge_limit > 0:
+                knowledge_rows = conn.execute("""
+                    SELECT a.timestamp, a.fact_type, nova_unzip(a.content),
+                           bm25(knowledge_fts) AS score
+                    FROM nova_archive.knowledge_fts
+                    JOIN nova_archive.knowledge a ON a.id = knowledge_fts.rowid
+                    WHERE knowledge_fts MATCH ?
+                    ORDER BY score
+                    LIMIT ?
+                """, (match, knowledge_limit)).fetchall()
+        finally:
+            conn.execute("DETACH DATABASE nova_archive")
+        
+        # Contentless FTS tables cannot build snippets, so do it here
+        conv_results = [
+            (ts, user, nova,
+             memory_archive.make_snippet(f"{user} {nova}", terms, open_, close), score, tools)
+            for ts, user, nova, score, tools in conv_rows
+        ]
+        knowledge_results = [
+            (ts, fact_type, content,
+             memory_archive.make_snippet(content, terms, open_, close), score)
+            for ts, fact_type, content, score in knowledge_rows
+        ]
+        return conv_results, knowledge_results
+    
+    def _search_memory_like(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Substring search used when SQLite lacks FTS5."""
+        with self.connection() as conn:
+            conv_results = conn.execute("""
+                SELECT timestamp, user_message, nova_response, tools_used
+                FROM conversations
+                WHERE user_message LIKE ? OR nova_response LIKE ?
+                ORDER BY id DESC
+                LIMIT ?
+            """, (f"%{query}%", f"%{query}%", limit)).fetchall()
+            
+            knowledge_results = conn.execute("""
+                SELECT k.timestamp, k.fact_type, k.content
+                FROM knowledge k
+                WHERE k.content LIKE ?
+                ORDER BY {belief} DESC, k.id DESC
+                LIMIT ?
+            """.format(belief=BELIEF_SQL), (f"%{query}%", limit)).fetchall()
         
         results = []
         
@@ -194,7 +1296,9 @@ class NovaMemory:
                 "type": "conversation",
                 "timestamp": row[0],
                 "user": row[1],
-                "nova": row[2]
+                "nova": row[2],
+                "snippet": row[1][:80],
+                "tools": json.loads(row[3]) if row[3] else []
             })
         
         for row in knowledge_results:
@@ -202,32 +1306,32 @@ class NovaMemory:
                 "type": "knowledge",
                 "timestamp": row[0],
                 "fact_type": row[1],
-                "content": row[2]
+                "content": row[2],
+                "snippet": row[2][:80]
             })
         
         return results
     
     def update_profile(self, key: str, value: Any):
         """Update Stephen's profile/preferences."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.connection() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO profile (key, value, updated_at)
+                VALUES (?, ?, ?)
+            """, (key, json.dumps(value), datetime.utcnow().isoformat()))
         
-        cursor.execute("""
-            INSERT OR REPLACE INTO profile (key, value, updated_at)
-            VALUES (?, ?, ?)
-        """, (key, json.dumps(value), datetime.utcnow().isoformat()))
-        
-        conn.commit()
-        conn.close()
+        if key in self.PROFILE_CONTEXT_KEYS:
+            with self._context_lock:
+                if value:
+                    self._context_profile[key] = value
+                else:
+                    self._context_profile.pop(key, None)
+                self._context_text = None
     
     def get_profile(self, key: str, default: Any = None) -> Any:
         """Get profile value."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT value FROM profile WHERE key = ?", (key,))
-        row = cursor.fetchone()
-        conn.close()
+        with self.connection() as conn:
+            row = conn.execute("SELECT value FROM profile WHERE key = ?", (key,)).fetchone()
         
         if row:
             return json.loads(row[0])
@@ -235,36 +1339,33 @@ class NovaMemory:
     
     def log_activity(self, activity_type: str, description: str, metadata: Dict = None):
         """Log what Stephen is doing."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO activity (timestamp, activity_type, description, metadata)
-            VALUES (?, ?, ?, ?)
-        """, (
-            datetime.utcnow().isoformat(),
-            activity_type,
-            description,
-            json.dumps(metadata or {})
-        ))
-        
-        conn.commit()
-        conn.close()
+        with self._context_lock:  # see save_conversation
+            self._submit_write(
+                self._insert_activity,
+                datetime.utcnow().isoformat(),
+                activity_type,
+                description,
+                json.dumps(metadata or {})
+            )
+            self._context_activity.append(description)
+            self._context_text = None
+    
+    def _insert_activity(self, timestamp, activity_type, description, metadata):
+        with self.connection() as conn:
+            conn.execute("""
+                INSERT INTO activity (timestamp, activity_type, description, metadata)
+                VALUES (?, ?, ?, ?)
+            """, (timestamp, activity_type, description, metadata))
     
     def get_recent_activity(self, limit: int = 5) -> List[Dict[str, Any]]:
         """Get recent activity log."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT timestamp, activity_type, description, metadata
-            FROM activity
-            ORDER BY id DESC
-            LIMIT ?
-        """, (limit,))
-        
-        rows = cursor.fetchall()
-        conn.close()
+        with self.connection() as conn:
+            rows = conn.execute("""
+                SELECT timestamp, activity_type, description, metadata
+                FROM activity
+                ORDER BY id DESC
+                LIMIT ?
+            """, (limit,)).fetchall()
         
         return [
             {
@@ -276,58 +1377,439 @@ class NovaMemory:
             for row in rows
         ][::-1]
     
-    def get_context_for_prompt(self) -> str:
-        """Generate context string for Nova's system prompt."""
-        recent_convs = self.get_recent_conversations(limit=5)
-        recent_activity = self.get_recent_activity(limit=3)
+    @telemetry.timed("memory.context")
+    def get_context_for_prompt(self, query: Optional[str] = None, k: int = 3) -> str:
+        """
+        Generate context string for Nova's system prompt.
+        
+        Served from the in-memory snapshot; only the first call (or the
+        first call after invalidate_context) touches the database.  With a
+        ``query`` the k most similar past exchanges (outside the recent
+        window) are appended from the semantic index.
+        """
+        with self._context_lock:
+            if self._context_stale:
+                self._load_context_snapshot()
+            if self._context_text is None:
+                self._context_text = self._render_context()
+            context = self._context_text
+            recent = set(self._context_convs)
+        
+        if not query or self._vectors is None:
+            return context
+        
+        relevant = [
+            hit for hit in self.semantic_search(query, k=k + len(recent), kind="conversation")
+            if (hit["user"], hit["nova"]) not in recent
+        ][:k]
+        if not relevant:
+            return context
+        
+        context_parts = [context] if context else []
+        context_parts.append("=== RELEVANT PAST CONVERSATIONS ===")
+        for hit in relevant:
+            context_parts.append(f"[{hit['timestamp'][:10]}] You: {hit['user']}")
+            context_parts.append(f"Nova: {hit['nova']}")
+        context_parts.append("")
+        return "\n".join(context_parts)
+    
+    def context_fingerprint(self) -> str:
+        """
+        Short hash of the profile part of the prompt context.
         
+        Changes when a profile value the prompt shows changes, but not on
+        every new conversation, so response caches can key on it.
+        """
+        with self._context_lock:
+            if self._context_stale:
+                self._load_context_snapshot()
+            profile = json.dumps(self._context_profile, sort_keys=True, default=str)
+        return hashlib.sha1(profile.encode("utf-8")).hexdigest()[:12]
+    
+    def invalidate_context(self):
+        """
+        Drop the prompt context snapshot.
+        
+        Call this after another process (or a raw connection) has written
+        to the database; the next read reloads from SQLite.
+        """
+        with self._context_lock:
+            self._context_stale = True
+            self._context_text = None
+    
+    def _load_context_snapshot(self):
+        """Reload the snapshot from the database (caller holds the lock)."""
+        if self._writer is not None and not self._writer.is_writer_thread():
+            # Queued exchanges would otherwise drop out of the prompt
+            self._writer.flush()
+        with self.connection() as conn:
+            conv_rows = conn.execute("""
+                SELECT user_message, nova_response FROM conversations
+                ORDER BY id DESC LIMIT ?
+            """, (self.CONTEXT_CONVERSATIONS,)).fetchall()
+            activity_rows = conn.execute("""
+                SELECT description FROM activity
+                ORDER BY id DESC LIMIT ?
+            """, (self.CONTEXT_ACTIVITIES,)).fetchall()
+            placeholders = ",".join("?" * len(self.PROFILE_CONTEXT_KEYS))
+            profile_rows = conn.execute(
+                f"SELECT key, value FROM profile WHERE key IN ({placeholders})",
+                self.PROFILE_CONTEXT_KEYS
+            ).fetchall()
+        
+        self._context_convs.clear()
+        self._context_convs.extend(reversed(conv_rows))
+        self._context_activity.clear()
+        self._context_activity.extend(row[0] for row in reversed(activity_rows))
+        self._context_profile = {
+            key: value for key, value in
+            ((key, json.loads(raw)) for key, raw in profile_rows)
+            if value
+        }
+        self._context_stale = False
+    
+    def _render_context(self) -> str:
+        """Format the snapshot (caller holds the lock)."""
         context_parts = []
         
         # Recent conversations
-        if recent_convs:
+        if self._context_convs:
             context_parts.append("=== RECENT CONVERSATION HISTORY ===")
-            for conv in recent_convs:
-                context_parts.append(f"You: {conv['user']}")
-                context_parts.append(f"Nova: {conv['nova']}")
+            for user, nova in self._context_convs:
+                context_parts.append(f"You: {user}")
+                context_parts.append(f"Nova: {nova}")
             context_parts.append("")
         
         # Recent activity
-        if recent_activity:
+        if self._context_activity:
             context_parts.append("=== WHAT STEPHEN HAS BEEN DOING ===")
-            for act in recent_activity:
-                context_parts.append(f"- {act['description']}")
+            for description in self._context_activity:
+                context_parts.append(f"- {description}")
             context_parts.append("")
         
-        # Profile/preferences
-        profile_keys = ['favorite_topics', 'current_projects', 'mood', 'goals']
-        profile_data = {k: self.get_profile(k) for k in profile_keys if self.get_profile(k)}
+        # Profile/preferences, in the fixed key order
+        profile_data = [
+            (k, self._context_profile[k])
+            for k in self.PROFILE_CONTEXT_KEYS if k in self._context_profile
+        ]
         
         if profile_data:
             context_parts.append("=== STEPHEN'S PROFILE ===")
-            for key, value in profile_data.items():
+            for key, value in profile_data:
                 context_parts.append(f"{key}: {value}")
             context_parts.append("")
         
         return "\n".join(context_parts)
     
-    def get_stats(self) -> Dict[str, int]:
-        """Get memory statistics."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def archive_old_rows(self, now: Optional[datetime] = None, batch: int = 1000) -> Dict[str, int]:
+        """
+        Move rows older than the retention window into monthly archives.
         
-        cursor.execute("SELECT COUNT(*) FROM conversations")
-        total_convs = cursor.fetchone()[0]
+        Each chunk is committed to its archive before it is deleted from
+        the hot tables, so an interrupted run loses nothing and can be
+        repeated.  Returns the number of rows moved per table.
+        """
+        if not self.retention_days:
+            return {}
+        cutoff = ((now or datetime.utcnow()) - timedelta(days=self.retention_days)).isoformat()
+        moved = {}
+        for table, spec in memory_archive.ARCHIVE_TABLES.items():
+            columns = spec["columns"]
+            # Conversations/activity are append-only, so id order is time
+            # order and the scan can stop at the first recent row.
+            # Facts age by their last update instead.
+            if table == "knowledge":
+                select = (
+                    f"SELECT {', '.join(columns)} FROM knowledge "
+                    f"WHERE COALESCE(updated_at, timestamp) < ? ORDER BY id LIMIT ?"
+                )
+            else:
+                select = (
+                    f"SELECT {', '.join(columns)} FROM {table} "
+                    f"WHERE timestamp < ? ORDER BY id LIMIT ?"
+                )
+            moved[table] = 0
+            while True:
+                with self.connection() as conn:
+                    rows = [dict(zip(columns, row)) for row in conn.execute(select, (cutoff, batch))]
+                if not rows:
+                    break
+                self._move_to_archive(table, rows)
+                moved[table] += len(rows)
+                if len(rows) < batch:
+                    break
+        return moved
+    
+    def _move_to_archive(self, table: str, rows: List[Dict]):
+        """Write rows to their monthly archives, then delete them here."""
+        by_month: Dict[str, List[Dict]] = {}
+        for row in rows:
+            by_month.setdefault(row["timestamp"][:7], []).append(row)
+        for month, month_rows in by_month.items():
+            path = memory_archive.archive_path(self.archive_dir, self.db_path.stem, month)
+            memory_archive.write_rows(path, table, month_rows)
+        ids = [row["id"] for row in rows]
+        with self.connection() as conn:
+            conn.execute(
+                f"DELETE FROM {table} WHERE id IN ({','.join('?' * len(ids))})", ids
+            )
+            kind = {"conversations": KIND_CONVERSATION, "knowledge": KIND_KNOWLEDGE}.get(table)
+            if kind is not None and self._vectors is not None:
+                self._pool.after_commit(lambda: self._vectors.remove(kind, ids))
+    
+    def prune_knowledge(self, threshold: Optional[float] = None, batch: int = 500) -> int:
+        """
+        Move facts whose current confidence is below ``threshold`` out of
+        the hot table into the monthly archives (still searchable there).
         
-        cursor.execute("SELECT COUNT(*) FROM knowledge")
-        total_facts = cursor.fetchone()[0]
+        Works in batches so writers are never blocked for long.
+        Returns the number of facts moved.
+        """
+        if threshold is None:
+            threshold = self.PRUNE_CONFIDENCE
+        columns = memory_archive.ARCHIVE_TABLES["knowledge"]["columns"]
+        removed = 0
+        while True:
+            with self.connection() as conn:
+                rows = [dict(zip(columns, row)) for row in conn.execute(f"""
+                    SELECT {', '.join('k.' + c for c in columns)} FROM knowledge k
+                    WHERE {BELIEF_SQL} < ? ORDER BY k.id LIMIT ?
+                """, (threshold, batch))]
+            if rows:
+                self._move_to_archive("knowledge", rows)
+            removed += len(rows)
+            if len(rows) < batch:
+                return removed
+    
+    def run_maintenance(self) -> Dict[str, Any]:
+        """Archive expired rows and (if enabled) weak beliefs, then reclaim free pages."""
+        report: Dict[str, Any] = {"archived": self.archive_old_rows()}
+        report["pruned"] = self.prune_knowledge(self.prune_below) if self.prune_below is not None else 0
+        with self.connection() as conn:
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if free_pages >= self.VACUUM_MIN_FREE_PAGES:
+                conn.execute(f"PRAGMA incremental_vacuum({int(self.VACUUM_STEP_PAGES)})").fetchall()
+            conn.execute("PRAGMA optimize")
+            conn.execute("""
+                INSERT INTO memory_stats(key, value) VALUES ('maintenance_last_run', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, (int(time.time()),))
+        report["free_pages_before"] = free_pages
+        return report
+    
+    def _first_maintenance_time(self) -> float:
+        """
+        Monotonic deadline for the first maintenance run in this process,
+        an interval after the last recorded run.  A database that has never
+        run maintenance waits a full interval as well, so opening a tenant
+        or restarting never puts maintenance in front of a request.
+        """
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT value FROM memory_stats WHERE key = 'maintenance_last_run'"
+            ).fetchone()
+        elapsed = max(time.time() - row[0], 0) if row else 0
+        return time.monotonic() + max((self.maintenance_interval or 0) - elapsed, 0)
+    
+    def _maybe_schedule_maintenance(self):
+        """Run maintenance on a background thread at most once per interval."""
+        if self.maintenance_interval is None:
+            return
+        now = time.monotonic()
+        if now < self._next_maintenance:
+            return
+        with self._maintenance_lock:
+            if now < self._next_maintenance:
+                return
+            self._next_maintenance = now + self.maintenance_interval
+        threading.Thread(
+            target=self._maintenance_job, name="nova-memory-maintenance", daemon=True
+        ).start()
+    
+    def _maintenance_job(self):
+        try:
+            self.run_maintenance()
+        except sqlite3.Error:
+            # Retried on the next interval
+            pass
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Get memory statistics (reads trigger-maintained counters)."""
+        with self.connection() as conn:
+            counts = dict(conn.execute("""
+                SELECT key, value FROM memory_stats
+                WHERE key IN ('conversations', 'knowledge', 'activity', 'kg_nodes')
+            """).fetchall())
         
-        cursor.execute("SELECT COUNT(*) FROM activity")
-        total_activities = cursor.fetchone()[0]
+        return {
+            "conversations": counts.get("conversations", 0),
+            "facts_learned": counts.get("knowledge", 0),
+            "activities_logged": counts.get("activity", 0),
+            # Kept by the epistemic engine's knowledge graph, when it has one
+            "entities": counts.get("kg_nodes", 0)
+        }
+    
+    def get_fact_type_counts(self) -> Dict[str, int]:
+        """Number of facts per fact_type, largest first."""
+        with self.connection() as conn:
+            rows = conn.execute("""
+                SELECT substr(key, 11), value FROM memory_stats
+                WHERE key >= 'fact_type:' AND key < 'fact_type;' AND value > 0
+            """).fetchall()
+        return dict(sorted(rows, key=lambda row: row[1], reverse=True))
+    
+    def get_daily_counts(self, table: str = "conversations", days: int = 7) -> Dict[str, int]:
+        """
+        Rows written per day for the last ``days`` days.
         
-        conn.close()
+        Args:
+            table: 'conversations' or 'activity'
+        """
+        if table not in ("conversations", "activity"):
+            raise ValueError(f"No daily counters for {table}")
+        today = datetime.utcnow().date()
+        dates = [(today - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+        prefix = f"{table}_day:"
+        with self.connection() as conn:
+            rows = dict(conn.execute(
+                "SELECT key, value FROM memory_stats WHERE key BETWEEN ? AND ?",
+                (prefix + dates[0], prefix + dates[-1])
+            ).fetchall())
+        return {date: rows.get(prefix + date, 0) for date in dates}
+    
+    def get_storage_stats(self) -> Dict[str, int]:
+        """On-disk sizes (bytes) of the database, its WAL and the archives."""
+        def size(path: Path) -> int:
+            try:
+                return path.stat().st_size
+            except OSError:
+                return 0
         
+        archives = memory_archive.list_archives(self.archive_dir, self.db_path.stem)
         return {
-            "conversations": total_convs,
-            "facts_learned": total_facts,
-            "activities_logged": total_activities
+            "db_bytes": size(self.db_path),
+            "wal_bytes": size(self.db_path.with_name(self.db_path.name + "-wal")),
+            "archive_bytes": sum(size(p) for p in archives),
+            "archive_files": len(archives)
         }
+
+
+class TenantMemoryManager:
+    """
+    Per-tenant memory databases, opened lazily.
+    
+    Each tenant (web user, phone number, ...) gets its own SQLite file under
+    ``base_dir/tenants/<key>/memory.db`` so lookups only ever touch that
+    tenant's rows.  At most ``max_open`` tenant handles stay open; the least
+    recently used one is closed once no request is still using it.  The
+    default tenant (``None``) is the owner's regular database and is never
+    evicted.
+    """
+    
+    def __init__(
+        self,
+        base_dir: str = "~/.nova",
+        max_open: int = 32,
+        default: Optional[NovaMemory] = None,
+        memory_options: Dict[str, Any] = None,
+        on_evict: Optional[Callable[[str, NovaMemory], None]] = None
+    ):
+        self.base_dir = Path(base_dir).expanduser()
+        self.max_open = max_open
+        self.memory_options = memory_options or {}
+        self.on_evict = on_evict
+        self._default = default
+        self._lock = threading.Lock()
+        self._open: "OrderedDict[str, NovaMemory]" = OrderedDict()
+        self._leases: Dict[str, int] = {}
+        self._retired: Dict[str, NovaMemory] = {}
+    
+    @staticmethod
+    def tenant_key(tenant_id: str) -> str:
+        """Filesystem-safe, collision-free directory name for a tenant id."""
+        readable = re.sub(r"[^A-Za-z0-9_.+-]", "_", tenant_id)[:40]
+        digest = hashlib.sha1(tenant_id.encode("utf-8")).hexdigest()[:10]
+        return f"{readable}-{digest}"
+    
+    def get(self, tenant_id: Optional[str] = None) -> NovaMemory:
+        """Return the tenant's memory, opening it if needed."""
+        if tenant_id is None:
+            return self._default_memory()
+        key = self.tenant_key(tenant_id)
+        with self._lock:
+            memory = self._open.get(key) or self._retired.pop(key, None)
+            if memory is not None:
+                self._open[key] = memory
+                self._open.move_to_end(key)
+                return memory
+        
+        # Open outside the lock: migrations and index backfill can be slow
+        memory = NovaMemory(
+            self.base_dir / "tenants" / key / "memory.db", **self.memory_options
+        )
+        evicted = []
+        duplicate = None
+        with self._lock:
+            existing = self._open.get(key) or self._retired.pop(key, None)
+            if existing is not None:
+                # Another request opened it meanwhile; the tenant stays
+                # open, so on_evict must not run for it
+                duplicate, memory = memory, existing
+            self._open[key] = memory
+            self._open.move_to_end(key)
+            while len(self._open) > self.max_open:
+                old_key, old_memory = self._open.popitem(last=False)
+                if self._leases.get(old_key):
+                    # Still in use: close when the last lease is released
+                    self._retired[old_key] = old_memory
+                else:
+                    evicted.append((old_key, old_memory))
+        if duplicate is not None:
+            duplicate.close()
+        for old_key, old_memory in evicted:
+            self._close(old_key, old_memory)
+        return memory
+    
+    @contextmanager
+    def lease(self, tenant_id: Optional[str] = None) -> Iterator[NovaMemory]:
+        """Use a tenant's memory without it being closed underneath you."""
+        if tenant_id is None:
+            yield self._default_memory()
+            return
+        key = self.tenant_key(tenant_id)
+        with self._lock:
+            self._leases[key] = self._leases.get(key, 0) + 1
+        try:
+            yield self.get(tenant_id)
+        finally:
+            retired = None
+            with self._lock:
+                self._leases[key] -= 1
+                if not self._leases[key]:
+                    del self._leases[key]
+                    retired = self._retired.pop(key, None)
+            if retired is not None:
+                self._close(key, retired)
+    
+    def open_tenants(self) -> List[str]:
+        with self._lock:
+            return list(self._open)
+    
+    def close_all(self):
+        """Flush and close every open tenant database."""
+        with self._lock:
+            handles = list(self._open.items()) + list(self._retired.items())
+            self._open.clear()
+            self._retired.clear()
+        for key, memory in handles:
+            self._close(key, memory)
+    
+    def _default_memory(self) -> NovaMemory:
+        if self._default is None:
+            self._default = NovaMemory(self.base_dir / "memory.db", **self.memory_options)
+        return self._default
+    
+    def _close(self, key: str, memory: NovaMemory):
+        if self.on_evict:
+            self.on_evict(key, memory)
+        memory.close()
@@ -5,17 +5,26 @@ Nova Ultimate - Memory + Proactive Messages + Self-Improving
 
 import os
 import json
-import requests
+import re
+import asyncio
 import threading
+import time
 from rich.console import Console
 from rich.panel import Panel
 from rich.live import Live
 from rich.text import Text
+from rich.markup import escape
 from tools.runner import ToolRunner
-from memory_system import NovaMemory
+from tools.registry import select_tools, tool_schemas
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from memory_system import NovaMemory, TenantMemoryManager
 from proactive_nova import create_proactive_system
 from epistemic_engine import create_epistemic_engine
 from nova_personas import NovaPersona, get_nova_mood_description
+from prompt_budget import PromptAssembler
+import telemetry
+from response_cache import ResponseCache
+from llm_client import AsyncLLMClient, LLMError, create_llm_client, merge_delta, DEFAULT_API_URL
 
 console = Console()
 from dotenv import load_dotenv
@@ -23,126 +32,319 @@ load_dotenv(override=False)
 
 
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+# Point GROQ_API_URL at llm_stub.py to run offline
+GROQ_API_URL = os.environ.get("GROQ_API_URL") or DEFAULT_API_URL
 if not GROQ_API_KEY:
     raise RuntimeError("GROQ_API_KEY not set. Export it or add it to a .env file.")
 
-TOOLS = [
-    {
-        "type": "function",
-        "function": {
-            "name": "file_ops",
-            "description": "Read, write, move, copy, or delete files and folders",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "operation": {"type": "string", "enum": ["read", "write", "move", "copy", "delete", "list"]},
-                    "path": {"type": "string"},
-                    "content": {"type": "string"},
-                    "destination": {"type": "string"}
-                },
-                "required": ["operation", "path"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "shell",
-            "description": "Execute bash commands",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "command": {"type": "string"}
-                },
-                "required": ["command"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "web_browser",
-            "description": "Actually browse the web - navigate sites, extract data, read articles",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "action": {"type": "string", "enum": ["navigate", "extract_links", "extract_text", "extract_data", "search_page", "get_article"]},
-                    "url": {"type": "string"}
-                },
-                "required": ["action"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "gemini_vision",
-            "description": "Analyze images, videos, or ask Gemini AI questions",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "operation": {"type": "string", "enum": ["analyze_image", "analyze_video", "ask"]},
-                    "image_path": {"type": "string"},
-                    "image_url": {"type": "string"},
-                    "video_url": {"type": "string"},
-                    "question": {"type": "string"},
-                    "prompt": {"type": "string"}
-                },
-                "required": ["operation"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "code_ops",
-            "description": "Edit or analyze code files",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "operation": {"type": "string", "enum": ["append", "replace", "insert", "analyze"]},
-                    "path": {"type": "string"}
-                },
-                "required": ["operation", "path"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "system_ops",
-            "description": "Check system stats (battery, cpu) or open applications",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "operation": {"type": "string", "enum": ["stats", "open_app"]},
-                    "app_name": {"type": "string", "description": "Name of app to open (e.g. 'Spotify', 'Safari')"}
-                },
-                "required": ["operation"]
-            }
-        }
-    }
-]
+# Pooled keep-alive session with timeouts and retries, shared by all chats
+llm = create_llm_client(GROQ_API_URL, GROQ_API_KEY)
+# The same client for asyncio callers (achat_with_tools)
+allm = AsyncLLMClient(llm)
+
+# Function-calling schemas, generated from the tools' declared parameters
+TOOLS = tool_schemas()
+# Send every tool schema with each request instead of only the relevant ones
+SEND_ALL_TOOLS = os.environ.get("NOVA_SEND_ALL_TOOLS", "") in ("1", "true", "yes")
+
+MEMORY_OPTIONS = {
+    "write_behind": os.environ.get("NOVA_WRITE_BEHIND", "") in ("1", "true", "yes"),
+    "retention_days": int(os.environ["NOVA_RETENTION_DAYS"]) if os.environ.get("NOVA_RETENTION_DAYS") else None,
+    "prune_below": float(os.environ["NOVA_PRUNE_BELOW"]) if os.environ.get("NOVA_PRUNE_BELOW") else None,
+}
+
+# Learn from exchanges on a background thread instead of the response path
+ASYNC_LEARNING = os.environ.get("NOVA_ASYNC_LEARNING", "") in ("1", "true", "yes")
+
+# Answer repeated questions from a short-lived cache (opt-in)
+RESPONSE_CACHE = os.environ.get("NOVA_RESPONSE_CACHE", "") in ("1", "true", "yes")
+
+# Wall-clock seconds all tool calls of one message may take together; once
+# spent, the model has to answer with what it has
+TOOL_TURN_BUDGET = float(os.environ.get("NOVA_TOOL_TURN_BUDGET", 90))
 
 # Global instances
-memory = NovaMemory()
+memory = NovaMemory(**MEMORY_OPTIONS)
 runner = ToolRunner()
+# Import and construct these tools at startup instead of on first use
+if os.environ.get("NOVA_PREWARM_TOOLS"):
+    runner.prewarm(name.strip() for name in os.environ["NOVA_PREWARM_TOOLS"].split(","))
+# Keeps each model request under a token budget (tool outputs, memory context)
+prompt = PromptAssembler(
+    max_prompt_tokens=int(os.environ.get("NOVA_PROMPT_BUDGET", 8000)),
+    max_tool_tokens=int(os.environ.get("NOVA_TOOL_OUTPUT_TOKENS", 1500))
+)
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get("NOVA_RESPONSE_CACHE_SIZE", 512)),
+    ttl_seconds=float(os.environ.get("NOVA_RESPONSE_CACHE_TTL", 120)),
+    near_threshold=float(os.environ.get("NOVA_RESPONSE_CACHE_NEAR", 0.8))
+) if RESPONSE_CACHE else None
 epistemic = create_epistemic_engine(memory)
+if ASYNC_LEARNING:
+    epistemic.start_worker()
 proactive_engine = None
 proactive_messages = []  # Queue for proactive messages
 
+# Other users (SMS numbers, web tenants) get their own memory + engine
+_tenant_engines = {}
+_tenant_engines_lock = threading.Lock()
+
+
+def _drop_tenant_engine(key, tenant_memory):
+    with _tenant_engines_lock:
+        engine = _tenant_engines.pop(key, None)
+    if engine is not None:
+        # Finish pending learning before the tenant's database closes
+        engine.stop_worker()
+    # Browser sessions and other per-conversation tool state
+    runner.end_sessions(lambda session_id: isinstance(session_id, tuple) and session_id[0] == key)
+
+
+tenants = TenantMemoryManager(
+    default=memory,
+    max_open=int(os.environ.get("NOVA_MAX_OPEN_TENANTS", 32)),
+    memory_options=MEMORY_OPTIONS,
+    on_evict=_drop_tenant_engine
+)
+
+
+def _epistemic_for(tenant_id, tenant_memory):
+    """Epistemic engine bound to a tenant's memory."""
+    if tenant_id is None:
+        return epistemic
+    key = tenants.tenant_key(tenant_id)
+    with _tenant_engines_lock:
+        engine = _tenant_engines.get(key)
+        if engine is None or engine.memory is not tenant_memory:
+            engine = create_epistemic_engine(tenant_memory)
+            if ASYNC_LEARNING:
+                engine.start_worker()
+            _tenant_engines[key] = engine
+        return engine
+
 
 def handle_proactive_message(message: str):
     """Handle proactive message from engine."""
     proactive_messages.append(message)
 
 
-def chat_with_tools(user_message: str) -> str:
-    """Chat with full memory and tools (Multi-step Agent Loop)."""
+def _session_id(tenant_id: Optional[str], conversation_id: Optional[str]):
+    """
+    Key for conversation-scoped tool state (the web browser's cookies and
+    page).  Without a conversation id those tools get a fresh instance per
+    call rather than sharing one with everyone on the same memory.
+    """
+    if conversation_id is None:
+        return None
+    return (tenants.tenant_key(tenant_id) if tenant_id is not None else None, conversation_id)
+
+
+def chat_with_tools(
+    user_message: str,
+    tenant_id: Optional[str] = None,
+    profile: bool = False,
+    conversation_id: Optional[str] = None
+) -> str:
+    """
+    Chat with full memory and tools (Multi-step Agent Loop).
+    
+    tenant_id selects whose memory is used; None is the owner.
+    conversation_id groups messages whose tools keep state between them
+    (see _session_id).  profile stores a profiler report with the
+    request's trace (telemetry.py).
+    """
+    with tenants.lease(tenant_id) as tenant_memory:
+        return _chat_with_memory(
+            user_message, tenant_memory, _epistemic_for(tenant_id, tenant_memory), profile,
+            _session_id(tenant_id, conversation_id)
+        )
+
+
+def chat_with_tools_stream(
+    user_message: str,
+    tenant_id: Optional[str] = None,
+    profile: bool = False,
+    conversation_id: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of chat_with_tools.
+    
+    Yields events as they happen:
+        {"type": "token", "text": ...}              model output fragments
+        {"type": "tool_start", "tool": ..., "arguments": {...}}
+        {"type": "tool_end", "tool": ..., "ok": bool}
+        {"type": "done", "response": ..., "prompt": [...], "trace_id": ...}
+                                                    the full final reply, the
+                                                    token report of each request
+                                                    and the telemetry trace id
+    """
+    with tenants.lease(tenant_id) as tenant_memory:
+        yield from _agent_events(
+            user_message, tenant_memory, _epistemic_for(tenant_id, tenant_memory),
+            stream=True, profile=profile, session_id=_session_id(tenant_id, conversation_id)
+        )
+
+
+def _chat_with_memory(
+    user_message: str,
+    memory: NovaMemory,
+    epistemic,
+    profile: bool = False,
+    session_id=None
+) -> str:
+    """Agent loop against one tenant's memory and epistemic engine."""
+    for event in _agent_events(user_message, memory, epistemic, profile=profile, session_id=session_id):
+        if event["type"] == "done":
+            return event["response"]
+
+
+async def achat_with_tools(
+    user_message: str,
+    tenant_id: Optional[str] = None,
+    profile: bool = False,
+    conversation_id: Optional[str] = None
+) -> str:
+    """
+    asyncio version of chat_with_tools.
+    
+    Model calls and tools are awaited instead of holding a thread, so one
+    event loop can serve many conversations at once.
+    """
+    with tenants.lease(tenant_id) as tenant_memory:
+        tenant_epistemic = _epistemic_for(tenant_id, tenant_memory)
+        async for event in _aagent_events(
+            user_message, tenant_memory, tenant_epistemic, profile=profile,
+            session_id=_session_id(tenant_id, conversation_id)
+        ):
+            if event["type"] == "done":
+                return event["response"]
+
+
+def _completion_payload(
+    messages: list,
+    context: str,
+    tools: list,
+    reports: list,
+    tool_choice: str = "auto"
+) -> Dict[str, Any]:
+    """Request body for one model turn, fitted to the prompt budget."""
+    fitted, report = prompt.fit(messages, tools, context=context)
+    reports.append(report)
+    if report["context_entries_dropped"] or report["tool_outputs_omitted"]:
+        console.print(
+            f"[dim]Prompt trimmed to {report['total']} tokens "
+            f"({report['context_entries_dropped']} context entries, "
+            f"{report['tool_outputs_omitted']} tool outputs dropped)[/dim]"
+        )
+    return {
+        "model": "llama-3.3-70b-versatile",
+        "messages": fitted,
+        "temperature": 0.8,
+        "max_tokens": 800,
+        "tools": tools,
+        "tool_choice": tool_choice
+    }
+
+
+def _complete(
+    messages: list,
+    stream: bool,
+    context: str,
+    tools: list,
+    reports: list,
+    tool_choice: str = "auto"
+):
+    """
+    One model turn.
+    
+    Yields token events while streaming and returns the response in the
+    non-streaming shape (choices[0].message, tool-call deltas assembled).
+    The request's token report is appended to ``reports``.
+    """
+    with telemetry.span("llm.chat", stream=stream, tool_choice=tool_choice) as span:
+        payload = _completion_payload(messages, context, tools, reports, tool_choice)
+        span.set(prompt_tokens=reports[-1]["total"])
+        if not stream:
+            result = llm.chat(payload)
+        else:
+            result = yield from _stream_completion(payload)
+        _annotate(span, result)
+        return result
+
+
+def _stream_completion(payload: Dict[str, Any]):
+    message = {"role": "assistant", "content": None}
+    for chunk in llm.chat_stream(payload):
+        if "error" in chunk:
+            return chunk
+        for choice in chunk.get("choices", []):
+            delta = choice.get("delta") or {}
+            merge_delta(message, delta)
+            if delta.get("content"):
+                yield {"type": "token", "text": delta["content"]}
+    return {"choices": [{"message": message}]}
+
+
+def _annotate(span, result: Dict[str, Any]):
+    """Outcome of a model turn, for its trace span."""
+    if "error" in result:
+        span.error = "api_error"
+    else:
+        span.set(tool_calls=len(result["choices"][0]["message"].get("tool_calls") or ()))
+
+
+async def _acomplete(
+    messages: list,
+    stream: bool,
+    context: str,
+    tools: list,
+    reports: list,
+    tool_choice: str = "auto"
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async _complete.
+    
+    Async generators cannot return a value, so the response comes last as
+    {"type": "completion", "result": ...} after any token events.
+    """
+    with telemetry.span("llm.chat", stream=stream, tool_choice=tool_choice) as span:
+        payload = _completion_payload(messages, context, tools, reports, tool_choice)
+        span.set(prompt_tokens=reports[-1]["total"])
+        if not stream:
+            result = await allm.chat(payload)
+        else:
+            result = {"choices": [{"message": {"role": "assistant", "content": None}}]}
+            message = result["choices"][0]["message"]
+            async for chunk in allm.chat_stream(payload):
+                if "error" in chunk:
+                    result = chunk
+                    break
+                for choice in chunk.get("choices", []):
+                    delta = choice.get("delta") or {}
+                    merge_delta(message, delta)
+                    if delta.get("content"):
+                        yield {"type": "token", "text": delta["content"]}
+        _annotate(span, result)
+    yield {"type": "completion", "result": result}
+
+
+@telemetry.timed("prompt.build")
+def _initial_messages(user_message: str, memory: NovaMemory, epistemic):
+    """
+    System prompt (persona, memory, tool hints) plus the user's message.
+    
+    Returns (messages, memory context, tool schemas to send); the context
+    is what the prompt budget trims first.
+    """
     
     # Get memory context
-    memory_context = memory.get_context_for_prompt()
+    memory_context = memory.get_context_for_prompt(query=user_message)
+    
+    # Tools this kind of request has needed before
+    predicted_tools = [tool for tool, share in epistemic.predict_tools(user_message) if share >= 0.5]
+    tool_hint = ""
+    if predicted_tools:
+        tool_hint = f"\nTOOLS THAT USUALLY HELP WITH REQUESTS LIKE THIS: {', '.join(predicted_tools)}\n"
     
     # Get current personality (Day Nova vs Night Nova)
     base_prompt = NovaPersona.get_system_prompt()
@@ -158,69 +360,211 @@ YOU NOW HAVE:
 - Self-improving knowledge
 
 {memory_context}
-"""
+{tool_hint}"""
     
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_message}
     ]
+    if SEND_ALL_TOOLS:
+        tools = TOOLS
+    else:
+        tools = tool_schemas(select_tools(user_message, extra=predicted_tools))
+    return messages, memory_context, tools
+
+
+def _attachment_calls(user_message: str) -> List[Dict[str, Any]]:
+    """gemini_vision calls that preprocess [ATTACHED_FILE:...] markers."""
+    calls = []
+    for idx, path in enumerate(re.findall(r"\[ATTACHED_FILE:([^\\]]+)\\]", user_message), start=1):
+        path = path.strip()
+        ext = path.split('.')[-1].lower() if '.' in path else ''
+        if ext in ("mp4", "mov", "webm", "mkv"):
+            arguments = {"operation": "analyze_video", "video_url": path}
+        else:
+            arguments = {"operation": "analyze_image", "image_path": path}
+        console.print(f"[dim]🔧 Preprocessing attachment: {path} -> {arguments['operation']}[/dim]")
+        calls.append({"id": f"attachment-{idx}", "name": "gemini_vision", "arguments": arguments})
+    return calls
+
+
+def _tool_calls(assistant_message: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The model's tool calls as ToolRunner.run_many calls."""
+    calls = []
+    for tool_call in assistant_message["tool_calls"]:
+        raw_arguments = tool_call["function"]["arguments"] or "{}"
+        try:
+            arguments = json.loads(raw_arguments)
+        except ValueError:
+            arguments = raw_arguments  # reported back as a tool error
+        calls.append({"id": tool_call["id"], "name": tool_call["function"]["name"], "arguments": arguments})
+    return calls
+
+
+def _tool_end(tool_result: Dict[str, Any]) -> Dict[str, Any]:
+    if tool_result["ok"]:
+        console.print(f"[dim]✓ {tool_result['tool']} completed[/dim]\n")
+    elif tool_result.get("timed_out"):
+        console.print(f"[dim]⏱ {tool_result['tool']} timed out[/dim]\n")
+    else:
+        console.print(f"[dim]✗ {tool_result['tool']} failed[/dim]\n")
+    event = {"type": "tool_end", "tool": tool_result["tool"], "ok": tool_result["ok"]}
+    if tool_result.get("timed_out"):
+        event["timed_out"] = True
+    return event
+
+
+def _tool_message(tool_result: Dict[str, Any]) -> Dict[str, Any]:
+    """History entry carrying a tool result back to the model."""
+    if tool_result["ok"]:
+        content = prompt.tool_content(tool_result["result"])
+    elif tool_result.get("timed_out"):
+        content = (
+            f"Error: {tool_result['error']}. No result is available; "
+            "answer without it or try a simpler request."
+        )
+    else:
+        content = f"Error: {tool_result.get('error', 'Unknown error')}"
+    return {"role": "tool", "tool_call_id": tool_result["tool_call_id"], "content": content}
+
+
+def _run_tools(calls: List[Dict[str, Any]], session_id, deadline: float) -> List[Dict[str, Any]]:
+    """runner.run_many, with a trace span per call (timed by the runner)."""
+    with telemetry.span("tools", calls=len(calls)):
+        return _record_tools(runner.run_many(calls, session_id, deadline))
+
+
+async def _arun_tools(calls: List[Dict[str, Any]], session_id, deadline: float) -> List[Dict[str, Any]]:
+    with telemetry.span("tools", calls=len(calls)):
+        return _record_tools(await runner.arun_many(calls, session_id, deadline))
+
+
+def _record_tools(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for result in results:
+        error = None
+        if not result["ok"]:
+            error = "timeout" if result.get("timed_out") else result.get("trace", "error")
+        telemetry.record(f"tool.{result['tool']}", result.get("duration_ms", 0), error)
+    return results
+
+
+def _cache_lookup(user_message: str, memory: NovaMemory):
+    """
+    (scope, cached response or None) for a message.
+    
+    The scope is whose memory, which persona and the profile the prompt
+    would show; conversation history is left out so it does not change
+    on every turn.  Follow-ups that depend on that history are never
+    cached (see response_cache.is_follow_up).
+    """
+    if response_cache is None:
+        return None, None
+    scope = (
+        str(memory.db_path),
+        NovaPersona.get_current_persona()["mode"],
+        memory.context_fingerprint()
+    )
+    return scope, response_cache.get(user_message, scope)
+
+
+def _cache_hit(user_message: str, response: str, memory: NovaMemory) -> Dict[str, Any]:
+    # Still part of the conversation history; already learned from
+    memory.save_conversation(user_message, response, tools_used=[])
+    console.print("[dim]⚡ Answered from the response cache[/dim]")
+    return {"type": "done", "response": response, "prompt": [], "cached": True}
+
+
+@telemetry.timed("finish")
+def _finish(
+    user_message: str,
+    final_response: str,
+    tools_used: list,
+    memory: NovaMemory,
+    epistemic,
+    cache_scope=None,
+    cacheable: bool = False
+) -> str:
+    if not final_response:
+        final_response = "I'm sorry, I got stuck in a loop and couldn't finish the task."
+        cacheable = False
+    
+    if response_cache is not None:
+        if cacheable:
+            response_cache.put(user_message, final_response, cache_scope)
+        else:
+            response_cache.skip()
+    
+    # Save to memory
+    memory.save_conversation(user_message, final_response, tools_used=tools_used)
+    
+    # Epistemic engine learns (in the background with NOVA_ASYNC_LEARNING)
+    epistemic.submit(user_message, final_response, tools_used)
+    return final_response
+
+
+def _agent_events(
+    user_message: str,
+    memory: NovaMemory,
+    epistemic,
+    stream: bool = False,
+    profile: bool = False,
+    session_id=None
+) -> Iterator[Dict[str, Any]]:
+    """
+    The multi-step agent loop, as a stream of events ending in 'done'.
+    
+    The request is one telemetry trace; its id comes with the 'done'
+    event.  ``profile`` also captures a profiler report for it.
+    """
+    with telemetry.trace("chat", profile=profile, stream=stream) as trace:
+        for event in _agent_loop(user_message, memory, epistemic, stream, session_id):
+            if event["type"] == "done":
+                event["trace_id"] = trace.trace_id
+            yield event
+
+
+def _agent_loop(
+    user_message: str,
+    memory: NovaMemory,
+    epistemic,
+    stream: bool,
+    session_id=None
+) -> Iterator[Dict[str, Any]]:
+    cache_scope, cached = _cache_lookup(user_message, memory)
+    if cached is not None:
+        yield _cache_hit(user_message, cached, memory)
+        return
+    
+    messages, memory_context, tools = _initial_messages(user_message, memory, epistemic)
+    prompt_reports = []
     
     tools_used = []
     final_response = ""
     max_turns = 5  # Prevent infinite loops
+    # Every tool call of this message shares one deadline
+    tool_deadline = time.monotonic() + TOOL_TURN_BUDGET
     
-    
-    # --- Attachment preprocessing (auto-inserted) ---
-    import re as _re
-    _attachment_matches = _re.findall(r"\[ATTACHED_FILE:([^\\]]+)\\]", user_message)
-    if _attachment_matches:
-        for _idx, _path in enumerate(_attachment_matches, start=1):
-            _path = _path.strip()
-            _ext = _path.split('.')[-1].lower() if '.' in _path else ''
-            if _ext in ("mp4","mov","webm","mkv"):
-                _op = "analyze_video"
-                _args = {"operation": _op, "video_url": _path}
-            else:
-                _op = "analyze_image"
-                _args = {"operation": _op, "image_path": _path}
-            console.print(f"[dim]🔧 Preprocessing attachment: {_path} -> {_op}[/dim]")
-            try:
-                _tool_result = runner.run("gemini_vision", **_args)
-            except Exception as _e:
-                _tool_result = {"ok": False, "error": str(_e)}
-            if _tool_result.get("ok"):
-                _res_content = json.dumps(_tool_result["result"])
-            else:
-                _res_content = f"Error: {_tool_result.get('error','Unknown error')}"
-            messages.append({
-                "role": "tool",
-                "tool_call_id": f"attachment-{_idx}",
-                "content": _res_content
-            })
-    # --- end attachment preprocessing ---
+    # Replies that depend on attachments or changed something are not cached
+    attachments = _attachment_calls(user_message)
+    cacheable = not attachments
+    if attachments:
+        messages.extend(_tool_message(result) for result in _run_tools(attachments, session_id, tool_deadline))
 
     for turn in range(max_turns):
+        # Out of tool time: the model must answer now
+        tool_choice = "auto" if time.monotonic() < tool_deadline else "none"
         # Call Groq API
-        response = requests.post(
-            GROQ_API_URL,
-            headers={
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "llama-3.3-70b-versatile",
-                "messages": messages,
-                "temperature": 0.8,
-                "max_tokens": 800,
-                "tools": TOOLS,
-                "tool_choice": "auto"
-            }
-        )
-        
-        result = response.json()
+        try:
+            result = yield from _complete(
+                messages, stream, memory_context, tools, prompt_reports, tool_choice
+            )
+        except LLMError as e:
+            yield {"type": "done", "response": f"Error: {e}"}
+            return
         
         if "error" in result:
-            return f"Error: {result['error']['message']}"
+            yield {"type": "done", "response": f"Error: {result['error']['message']}"}
+            return
         
         assistant_message = result["choices"][0]["message"]
         
@@ -229,59 +573,168 @@ YOU NOW HAVE:
             # Append the assistant's request to history
             messages.append(assistant_message)
             
-            for tool_call in assistant_message["tool_calls"]:
-                function_name = tool_call["function"]["name"]
-                arguments = json.loads(tool_call["function"]["arguments"])
-                
-                console.print(f"[dim]🔧 Nova is using: {function_name}[/dim]")
-                tools_used.append(function_name)
-                
-                # Execute the tool
-                tool_result = runner.run(function_name, **arguments)
-                
-                if tool_result["ok"]:
-                    result_content = json.dumps(tool_result["result"])
-                    console.print(f"[dim]✓ Tool completed[/dim]\n")
-                else:
-                    result_content = f"Error: {tool_result.get('error', 'Unknown error')}"
-                    console.print(f"[dim]✗ Tool failed[/dim]\n")
+            calls = _tool_calls(assistant_message)
+            cacheable = cacheable and not any(runner.has_side_effects(call) for call in calls)
+            for call in calls:
+                console.print(f"[dim]🔧 Nova is using: {call['name']}[/dim]")
+                tools_used.append(call["name"])
+                yield {"type": "tool_start", "tool": call["name"], "arguments": call["arguments"]}
+            
+            # Execute the tools (independent calls run concurrently;
+            # results come back in call order)
+            for tool_result in _run_tools(calls, session_id, tool_deadline):
+                yield _tool_end(tool_result)
                 
                 # Append tool result to history
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": tool_call["id"],
-                    "content": result_content
-                })
+                messages.append(_tool_message(tool_result))
             
             # Loop continues to send tool outputs back to model
             continue
             
         else:
             # No tool calls, this is the final response
-            final_response = assistant_message.get("content", "")
+            final_response = assistant_message.get("content") or ""
             break
     
-    if not final_response:
-        final_response = "I'm sorry, I got stuck in a loop and couldn't finish the task."
+    final_response = _finish(
+        user_message, final_response, tools_used, memory, epistemic, cache_scope, cacheable
+    )
+    yield {"type": "done", "response": final_response, "prompt": prompt_reports}
 
-    # Save to memory
-    memory.save_conversation(user_message, final_response, tools_used=tools_used)
+
+async def _aagent_events(
+    user_message: str,
+    memory: NovaMemory,
+    epistemic,
+    stream: bool = False,
+    profile: bool = False,
+    session_id=None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Async _agent_events: same loop, events and trace, awaiting the model and tools."""
+    with telemetry.trace("chat", profile=profile, stream=stream) as trace:
+        async for event in _aagent_loop(user_message, memory, epistemic, stream, session_id):
+            if event["type"] == "done":
+                event["trace_id"] = trace.trace_id
+            yield event
+
+
+async def _aagent_loop(
+    user_message: str,
+    memory: NovaMemory,
+    epistemic,
+    stream: bool,
+    session_id=None
+) -> AsyncIterator[Dict[str, Any]]:
+    # Memory work is SQLite I/O; keep it off the event loop
+    cache_scope, cached = await asyncio.to_thread(_cache_lookup, user_message, memory)
+    if cached is not None:
+        yield await asyncio.to_thread(_cache_hit, user_message, cached, memory)
+        return
     
-    # Epistemic engine learns
-    epistemic.process_conversation(user_message, final_response, tools_used)
+    messages, memory_context, tools = await asyncio.to_thread(
+        _initial_messages, user_message, memory, epistemic
+    )
+    prompt_reports = []
     
-    return final_response
+    tools_used = []
+    final_response = ""
+    max_turns = 5  # Prevent infinite loops
+    # Every tool call of this message shares one deadline
+    tool_deadline = time.monotonic() + TOOL_TURN_BUDGET
+    
+    # Replies that depend on attachments or changed something are not cached
+    attachments = _attachment_calls(user_message)
+    cacheable = not attachments
+    if attachments:
+        messages.extend(_tool_message(result) for result in await _arun_tools(attachments, session_id, tool_deadline))
+
+    for turn in range(max_turns):
+        tool_choice = "auto" if time.monotonic() < tool_deadline else "none"
+        try:
+            async for event in _acomplete(
+                messages, stream, memory_context, tools, prompt_reports, tool_choice
+            ):
+                if event["type"] == "completion":
+                    result = event["result"]
+                else:
+                    yield event
+        except LLMError as e:
+            yield {"type": "done", "response": f"Error: {e}"}
+            return
+        
+        if "error" in result:
+            yield {"type": "done", "response": f"Error: {result['error']['message']}"}
+            return
+        
+        assistant_message = result["choices"][0]["message"]
+        
+        if assistant_message.get("tool_calls"):
+            messages.append(assistant_message)
+            
+            calls = _tool_calls(assistant_message)
+            cacheable = cacheable and not any(runner.has_side_effects(call) for call in calls)
+            for call in calls:
+                console.print(f"[dim]🔧 Nova is using: {call['name']}[/dim]")
+                tools_used.append(call["name"])
+                yield {"type": "tool_start", "tool": call["name"], "arguments": call["arguments"]}
+            
+            for tool_result in await _arun_tools(calls, session_id, tool_deadline):
+                yield _tool_end(tool_result)
+                messages.append(_tool_message(tool_result))
+            continue
+        
+        final_response = assistant_message.get("content") or ""
+        break
+    
+    final_response = await asyncio.to_thread(
+        _finish, user_message, final_response, tools_used, memory, epistemic, cache_scope, cacheable
+    )
+    yield {"type": "done", "response": final_response, "prompt": prompt_reports}
+
+
+def runtime_stats() -> Dict[str, Any]:
+    """Counters for the LLM client, prompt budget, tools, response cache and spans."""
+    return {
+        "spans": telemetry.histograms(),
+        "llm": llm.stats(),
+        "prompt": prompt.stats(),
+        "tools": runner.stats(),
+        "response_cache": response_cache.stats() if response_cache is not None else {"enabled": False},
+    }
 
 
 def display_status():
     """Display Nova's memory stats."""
     stats = memory.get_stats()
     knowledge = epistemic.get_knowledge_summary()
+    storage = memory.get_storage_stats()
+    today = list(memory.get_daily_counts(days=1).values())[0]
     
-    status = f"""[cyan]Memory:[/cyan] {stats['conversations']} conversations | {stats['facts_learned']} facts learned
+    status = f"""[cyan]Memory:[/cyan] {stats['conversations']} conversations ({today} today) | {stats['facts_learned']} facts learned
 [cyan]Knowledge:[/cyan] {knowledge.get('knowledge_graph_nodes', 0)} entities tracked
+[cyan]Storage:[/cyan] {storage['db_bytes'] // 1024} KB db | {storage['wal_bytes'] // 1024} KB wal | {storage['archive_files']} archives
 [cyan]Proactive:[/cyan] {'Active' if proactive_engine and proactive_engine.running else 'Inactive'}"""
     
+    llm_stats = llm.stats()
+    if llm_stats["calls"]:
+        status += f"\n[cyan]LLM:[/cyan] {llm_stats['calls']} calls | p50 {llm_stats['p50_ms']} ms | p95 {llm_stats['p95_ms']} ms | {llm_stats['retries']} retries"
+    
+    if response_cache is not None:
+        cache_stats = response_cache.stats()
+        status += f"\n[cyan]Cache:[/cyan] {cache_stats['hits_exact']} exact + {cache_stats['hits_near']} near hits | {cache_stats['misses']} misses | {cache_stats['entries']} entries"
+    
+    prompt_stats = prompt.stats()
+    if prompt_stats["requests"]:
+        status += f"\n[cyan]Prompt:[/cyan] avg {prompt_stats['avg_prompt_tokens']} tokens | {prompt_stats['tool_outputs_truncated']} tool outputs truncated | {prompt_stats['over_budget']} over budget"
+    
+    tool_stats = runner.stats()
+    if tool_stats["timeouts"] or tool_stats["running"]:
+        status += f"\n[cyan]Tools:[/cyan] {tool_stats['timeouts']} timed out | {tool_stats['running']} running | {tool_stats['truncated']} outputs capped"
+    
+    if ASYNC_LEARNING:
+        worker = epistemic.get_worker_metrics()
+        status += f"\n[cyan]Learning:[/cyan] {worker['queue_depth']} queued | {worker['lag_seconds']}s lag | {worker['processed']} processed"
+    
     return Panel(status, title="[bold magenta]Nova Status[/bold magenta]", border_style="magenta")
 
 
@@ -325,6 +778,10 @@ def main():
             if user_input.lower() in ['exit', 'quit']:
                 console.print("\n[dim]Later, babe! I'll remember everything. 💜[/dim]")
                 proactive_engine.stop()
+                tenants.close_all()
+                epistemic.stop_worker()
+                runner.shutdown()
+                memory.close()
                 break
             
             elif user_input.lower() == 'stats':
@@ -336,10 +793,11 @@ def main():
                 results = memory.search_memory(query, limit=5)
                 console.print(f"\n[cyan]Found {len(results)} results:[/cyan]")
                 for r in results:
+                    snippet = escape(r.get('snippet') or '')
                     if r['type'] == 'conversation':
-                        console.print(f"  [dim]{r['timestamp'][:10]}[/dim] You: {r['user'][:60]}...")
+                        console.print(f"  [dim]{r['timestamp'][:10]}[/dim] You: {snippet}")
                     else:
-                        console.print(f"  [dim]{r['timestamp'][:10]}[/dim] Fact: {r['content'][:60]}...")
+                        console.print(f"  [dim]{r['timestamp'][:10]}[/dim] Fact: {snippet}")
                 continue
             
             elif user_input.lower() == 'profile':
@@ -360,13 +818,17 @@ def main():
             
             # Normal conversation
             console.print("[dim]Thinking...[/dim]")
-            response = chat_with_tools(user_input)
+            response = chat_with_tools(user_input, conversation_id="cli")
             console.print(f"\n[bold magenta]Nova:[/bold magenta] {response}")
             
         except KeyboardInterrupt:
             console.print("\n\n[dim]Later, babe! 💜[/dim]")
             if proactive_engine:
                 proactive_engine.stop()
+            tenants.close_all()
+            epistemic.stop_worker()
+            runner.shutdown()
+            memory.close()
             break
         except Exception as e:
             console.print(f"\n[red]Error: {e}[/red]")
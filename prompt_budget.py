@@ -0,0 +1,267 @@
+"""
+Token-budgeted prompt assembly for the agent loop.
+
+Every model call sends the system prompt (persona + memory context), the
+conversation so far (including tool results) and the tool schemas.  The
+PromptAssembler keeps that under a token budget:
+
+1. tool outputs are compacted when they enter the history -- long strings
+   inside the JSON result are shortened and long lists cut, so the model
+   still sees well-formed JSON;
+2. if the prompt is still over budget, the memory context is trimmed,
+   oldest entries first;
+3. then the outputs of earlier tool calls are replaced by a short note,
+   oldest first (the latest round is kept).
+
+Tokens are counted with tiktoken when it is installed, and estimated from
+the character count otherwise.
+"""
+
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # fall back to the character estimate
+    tiktoken = None
+
+
+MESSAGE_OVERHEAD = 4  # role and separators, per message
+OMITTED_TOOL_OUTPUT = "[output omitted to fit the context budget]"
+
+_UNAVAILABLE = object()
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding
+    if tiktoken is None:
+        return None
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:  # encoding files unavailable (offline)
+                _encoding = _UNAVAILABLE
+    return None if _encoding is _UNAVAILABLE else _encoding
+
+
+def tokenizer_name() -> str:
+    return "tiktoken" if _get_encoding() is not None else "heuristic"
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in ``text`` (about four characters per token without tiktoken)."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    tokens = MESSAGE_OVERHEAD + count_tokens(message.get("content") or "")
+    if message.get("tool_calls"):
+        tokens += count_tokens(json.dumps(message["tool_calls"]))
+    return tokens
+
+
+def _shorten(value: Any, max_chars: int, max_items: int) -> Any:
+    """Copy of a JSON value with strings and lists cut down."""
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        return value[:max_chars] + f"... [{len(value) - max_chars} chars truncated]"
+    if isinstance(value, list):
+        items = [_shorten(v, max_chars, max_items) for v in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"... [{len(value) - max_items} more items]")
+        return items
+    if isinstance(value, dict):
+        return {k: _shorten(v, max_chars, max_items) for k, v in value.items()}
+    return value
+
+
+def compact_json(value: Any, max_tokens: int) -> Tuple[str, bool]:
+    """
+    ``json.dumps(value)`` in at most about ``max_tokens`` tokens.
+
+    Halves the per-string and per-list limits until the dump fits, and
+    as a last resort cuts the text itself.  Returns (text, truncated).
+    """
+    text = json.dumps(value)
+    if count_tokens(text) <= max_tokens:
+        return text, False
+    max_chars, max_items = max_tokens * 4, 50
+    while max_chars >= 64:
+        text = json.dumps(_shorten(value, max_chars, max_items))
+        if count_tokens(text) <= max_tokens:
+            return text, True
+        max_chars //= 2
+        max_items = max(5, max_items // 2)
+    return text[:max_tokens * 4] + " ... [truncated]", True
+
+
+def _context_units(context: str) -> List[List[str]]:
+    """
+    Split a memory context into sections of droppable units.
+
+    Sections are separated by blank lines and start with a ``===`` header;
+    a ``Nova:`` line belongs with the ``You:`` line before it, so an
+    exchange is dropped as a whole.
+    """
+    sections = []
+    for block in context.split("\n\n"):
+        units: List[List[str]] = []
+        for line in block.split("\n"):
+            if line.startswith("Nova:") and units:
+                units[-1].append(line)
+            else:
+                units.append([line])
+        sections.append(units)
+    return sections
+
+
+def trim_context(context: str, max_tokens: int) -> Tuple[str, int]:
+    """
+    Drop memory-context entries, oldest first, until it fits ``max_tokens``.
+
+    Entries within a section are oldest first, so the first entry of the
+    first non-empty section goes first; a section whose entries are all
+    gone loses its header too.  Returns (context, entries dropped).
+    """
+    sections = _context_units(context)
+    sizes = [[count_tokens("\n".join(unit)) + 1 for unit in units] for units in sections]
+    total = sum(map(sum, sizes))
+    dropped = 0
+    for units, unit_sizes in zip(sections, sizes):
+        has_header = bool(units) and units[0][0].startswith("===")
+        start = 1 if has_header else 0
+        if total <= max_tokens:
+            break
+        while total > max_tokens and len(units) > start:
+            units.pop(start)
+            total -= unit_sizes.pop(start)
+            dropped += 1
+        if has_header and len(units) == 1:
+            units.clear()
+            total -= unit_sizes.pop(0)
+    text = "\n\n".join("\n".join(line for unit in units for line in unit) for units in sections if units)
+    return text, dropped
+
+
+class PromptAssembler:
+    """
+    Fits each model request into a token budget and accounts for it.
+
+    ``tool_content`` compacts a tool result for the history; ``fit``
+    returns the messages to send plus a per-request token report.
+    Thread-safe: one instance serves every conversation.
+    """
+
+    def __init__(self, max_prompt_tokens: int = 8000, max_tool_tokens: int = 1500):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_tool_tokens = max_tool_tokens
+        self._schema_tokens: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0, "prompt_tokens": 0, "over_budget": 0,
+            "tool_outputs_truncated": 0, "context_entries_dropped": 0,
+            "tool_outputs_omitted": 0,
+        }
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def tool_content(self, result: Any) -> str:
+        """A tool result as JSON text of at most ``max_tool_tokens`` tokens."""
+        text, truncated = compact_json(result, self.max_tool_tokens)
+        if truncated:
+            with self._lock:
+                self._stats["tool_outputs_truncated"] += 1
+        return text
+
+    def fit(
+        self,
+        messages: List[Dict[str, Any]],
+        tools: Optional[list] = None,
+        context: str = ""
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Messages to send for one request, and its token report.
+
+        ``context`` is the memory-context text embedded in the system
+        message (messages[0]); it is the first thing trimmed.  ``messages``
+        itself is not modified.
+        """
+        schema_tokens = self._tool_schema_tokens(tools)
+        budget = self.max_prompt_tokens - schema_tokens
+        sizes = [message_tokens(m) for m in messages]
+        total = sum(sizes)
+        sent = list(messages)
+        dropped = omitted = 0
+
+        # 1. Memory context, oldest entries first
+        if total > budget and context and sent and sent[0].get("role") == "system":
+            context_tokens = count_tokens(context)
+            keep = max(0, context_tokens - (total - budget))
+            trimmed, dropped = trim_context(context, keep)
+            if dropped:
+                system = dict(sent[0], content=sent[0]["content"].replace(context, trimmed, 1))
+                sent[0] = system
+                total -= sizes[0] - message_tokens(system)
+                sizes[0] = message_tokens(system)
+
+        # 2. Earlier tool outputs, oldest first; the latest round stays
+        if total > budget:
+            last_call = max(
+                (i for i, m in enumerate(sent) if m.get("tool_calls")), default=len(sent)
+            )
+            for i in range(last_call):
+                if total <= budget:
+                    break
+                if sent[i].get("role") == "tool" and sent[i].get("content") != OMITTED_TOOL_OUTPUT:
+                    sent[i] = dict(sent[i], content=OMITTED_TOOL_OUTPUT)
+                    new_size = message_tokens(sent[i])
+                    total -= sizes[i] - new_size
+                    sizes[i] = new_size
+                    omitted += 1
+
+        report = {
+            "tokenizer": tokenizer_name(),
+            "budget": self.max_prompt_tokens,
+            "total": total + schema_tokens,
+            "system": sizes[0] if sent and sent[0].get("role") == "system" else 0,
+            "messages": sum(s for m, s in zip(sent, sizes) if m.get("role") != "tool"),
+            "tool_results": sum(s for m, s in zip(sent, sizes) if m.get("role") == "tool"),
+            "tool_schemas": schema_tokens,
+            "context_entries_dropped": dropped,
+            "tool_outputs_omitted": omitted,
+            "over_budget": total > budget,
+        }
+        report["messages"] -= report["system"]
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["prompt_tokens"] += report["total"]
+            self._stats["over_budget"] += report["over_budget"]
+            self._stats["context_entries_dropped"] += dropped
+            self._stats["tool_outputs_omitted"] += omitted
+            self.last_report = report
+        return sent, report
+
+    def _tool_schema_tokens(self, tools: Optional[list]) -> int:
+        if not tools:
+            return 0
+        key = tuple(tool.get("function", {}).get("name") for tool in tools)
+        tokens = self._schema_tokens.get(key)
+        if tokens is None:
+            tokens = self._schema_tokens[key] = count_tokens(json.dumps(tools))
+        return tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        if stats["requests"]:
+            stats["avg_prompt_tokens"] = stats["prompt_tokens"] // stats["requests"]
+        return stats
@@ -0,0 +1,206 @@
+"""
+Response cache for repeated queries.
+
+Lots of SMS and web messages repeat ("what's the weather like", "stats").
+The cache answers them without another trip through the model and tools.
+Entries are scoped by who is asking and what the prompt would look like:
+the caller passes a scope such as (tenant, persona mode, profile
+fingerprint).  Within a scope a message hits on two tiers:
+
+- exact: the normalized text (case, punctuation and spacing folded) matches;
+- near: an entry found through the MinHash/LSH buckets of similarity.py
+  whose content words have a Jaccard similarity of at least
+  ``near_threshold`` with the message's.  This tier only applies to
+  messages with at least MIN_NEAR_TOKENS content words, since short
+  messages differ in one word.
+
+Follow-ups only make sense after the exchange before them, so they are
+never looked up or stored: messages with fewer than MIN_CACHE_TOKENS
+content words ("yes", "do it"), and messages that refer back to the
+conversation ("and then?", "what about her").
+
+Entries expire after ``ttl_seconds`` and the least recently used entry is
+evicted past ``max_entries``.  The caller decides what may be stored
+(e.g. nothing produced by a tool with side effects).
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, FrozenSet, Hashable, Optional, Set, Tuple
+
+import similarity
+from vector_index import STOPWORDS
+
+
+MIN_CACHE_TOKENS = 2
+MIN_NEAR_TOKENS = 3
+
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+# Stopwords that flip a question's meaning stay content words
+_IGNORED = STOPWORDS - {"no", "not"}
+# Words that point back at earlier turns, and openers that continue one
+_REFERRING = frozenset("""
+he him his she her hers they them their theirs these those that this there
+else again same more previous above
+""".split())
+_CONTINUING = ("and ", "but ", "so ", "then ", "also ", "what about ", "how about ")
+
+
+def normalize(message: str) -> str:
+    """Lowercase, drop punctuation, collapse whitespace."""
+    return " ".join(_PUNCTUATION.sub(" ", message.lower()).split())
+
+
+def content_words(normalized: str) -> FrozenSet[str]:
+    return frozenset(word for word in normalized.split() if word not in _IGNORED)
+
+
+def is_follow_up(normalized: str) -> bool:
+    """Whether the message needs the conversation before it to be understood."""
+    if len(content_words(normalized)) < MIN_CACHE_TOKENS:
+        return True
+    if normalized.startswith(_CONTINUING):
+        return True
+    return not _REFERRING.isdisjoint(normalized.split())
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU + TTL cache of final responses.
+
+    ``get`` returns a cached response or None; ``put`` stores one;
+    ``skip`` counts a response the caller chose not to store.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 120.0,
+        near_threshold: float = 0.8
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.near_threshold = near_threshold
+        # (scope, normalized message) -> {"response", "expires", "words", "buckets"}
+        self._entries: "OrderedDict[Tuple[Hashable, str], Dict[str, Any]]" = OrderedDict()
+        # (scope, LSH bucket) -> keys of entries in that bucket
+        self._buckets: Dict[Tuple[Hashable, int], Set[Tuple[Hashable, str]]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits_exact": 0, "hits_near": 0, "misses": 0, "stores": 0,
+            "skipped": 0, "follow_ups": 0, "evictions": 0, "expirations": 0,
+        }
+
+    def get(self, message: str, scope: Hashable = None) -> Optional[str]:
+        normalized = normalize(message)
+        if is_follow_up(normalized):
+            with self._lock:
+                self._stats["follow_ups"] += 1
+            return None
+        key = (scope, normalized)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(key, entry, now):
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits_exact"] += 1
+                return entry["response"]
+
+            near = self._near_match(scope, normalized, now)
+            if near is not None:
+                self._entries.move_to_end(near)
+                self._stats["hits_near"] += 1
+                return self._entries[near]["response"]
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, message: str, response: str, scope: Hashable = None):
+        normalized = normalize(message)
+        if is_follow_up(normalized):
+            self.skip()
+            return
+        key = (scope, normalized)
+        words = content_words(normalized)
+        buckets = None
+        if len(words) >= MIN_NEAR_TOKENS:
+            buckets = similarity.band_buckets(similarity.signature(normalized))
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                "response": response,
+                "expires": time.monotonic() + self.ttl_seconds,
+                "words": words,
+                "buckets": buckets,
+            }
+            for bucket in buckets or ():
+                self._buckets[(scope, bucket)].add(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def skip(self):
+        """Count a response that was deliberately not cached."""
+        with self._lock:
+            self._stats["skipped"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries))
+        lookups = stats["hits_exact"] + stats["hits_near"] + stats["misses"]
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _near_match(self, scope: Hashable, normalized: str, now: float):
+        """
+        Key of the most similar live entry in ``scope`` (caller holds the
+        lock).  LSH buckets find the candidates; their content words are
+        then compared exactly, so a MinHash estimate that happens to run
+        high cannot let a changed entity through.
+        """
+        words = content_words(normalized)
+        if len(words) < MIN_NEAR_TOKENS:
+            return None
+        candidates = set()
+        for bucket in similarity.band_buckets(similarity.signature(normalized)):
+            candidates.update(self._buckets.get((scope, bucket), ()))
+        best, best_similarity = None, self.near_threshold
+        for key in candidates:
+            entry = self._entries[key]
+            if self._expired(key, entry, now):
+                continue
+            score = _jaccard(words, entry["words"])
+            if score >= best_similarity:
+                best, best_similarity = key, score
+        return best
+
+    def _expired(self, key, entry: Dict[str, Any], now: float) -> bool:
+        if entry["expires"] > now:
+            return False
+        self._remove(key)
+        self._stats["expirations"] += 1
+        return True
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for bucket in entry["buckets"] or ():
+            keys = self._buckets.get((key[0], bucket))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._buckets[(key[0], bucket)]
@@ -1,15 +1,20 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, abort, make_response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 import os
+import gzip
 import json
-from nova_ultimate import chat_with_tools
+from nova_ultimate import chat_with_tools, chat_with_tools_stream, runtime_stats
+import telemetry
 from pathlib import Path
 
 app = Flask(__name__, static_folder="static", static_url_path="/")
 CORS(app)
 
-# Chat history storage
+# Chat history storage. Only the newest HISTORY_MAX_ENTRIES stay in the
+# JSON file; older entries are appended to a gzipped JSON-lines archive.
 HISTORY_FILE = Path("chat_history.json")
+HISTORY_ARCHIVE = Path("chat_history.archive.jsonl.gz")
+HISTORY_MAX_ENTRIES = int(os.environ.get("HISTORY_MAX_ENTRIES", 1000))
 
 def load_history():
     if HISTORY_FILE.exists():
@@ -20,6 +25,11 @@ def load_history():
     return []
 
 def save_history(history):
+    if len(history) > HISTORY_MAX_ENTRIES:
+        overflow, history = history[:-HISTORY_MAX_ENTRIES], history[-HISTORY_MAX_ENTRIES:]
+        with gzip.open(HISTORY_ARCHIVE, "at", encoding="utf-8") as f:
+            for entry in overflow:
+                f.write(json.dumps(entry) + "\n")
     HISTORY_FILE.write_text(json.dumps(history, indent=2))
 
 # Twilio support (optional)
@@ -32,6 +42,34 @@ try:
 except:
     TWILIO_CLIENT = None
 
+def web_tenant(data):
+    """
+    Tenant for web chat: explicit 'tenant' field or X-Nova-Tenant header (None = owner).
+    
+    Web tenants live under "web:" so a client cannot name a phone caller's
+    memory; ids that try to are rejected.
+    """
+    tenant = data.get("tenant") or request.headers.get("X-Nova-Tenant")
+    if not tenant:
+        return None
+    if tenant.startswith(("phone:", "web:")):
+        abort(make_response(jsonify({"error": "invalid tenant"}), 400))
+    return f"web:{tenant}"
+
+def conversation_id(data):
+    """Client's conversation: 'conversation_id' field or X-Nova-Conversation header (None = none)."""
+    return data.get("conversation_id") or request.headers.get("X-Nova-Conversation") or None
+
+def wants_profile(data):
+    """Profile this request: 'profile' field or X-Nova-Profile header."""
+    return bool(data.get("profile")) or request.headers.get("X-Nova-Profile", "") in ("1", "true", "yes")
+
+def phone_tenant(number):
+    """SMS and voice callers share one memory per phone number (a caller is required)."""
+    if not number:
+        abort(make_response(jsonify({"error": "missing From number"}), 400))
+    return f"phone:{number}"
+
 @app.route("/")
 def index():
     return send_from_directory("static", "index.html")
@@ -42,8 +80,12 @@ def api_chat():
     message = data.get("message", "").strip()
     if not message:
         return jsonify({"error": "empty message"}), 400
+    tenant_id = web_tenant(data)
     try:
-        response = chat_with_tools(message)
+        response = chat_with_tools(
+            message, tenant_id=tenant_id, profile=wants_profile(data),
+            conversation_id=conversation_id(data)
+        )
         
         # Save to history
         history = load_history()
@@ -55,6 +97,63 @@ def api_chat():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def sse(event, data):
+    """One Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/api/chat/stream", methods=["POST"])
+def api_chat_stream():
+    """Like /api/chat, but streams tokens and tool progress as Server-Sent Events."""
+    data = request.get_json() or {}
+    message = data.get("message", "").strip()
+    if not message:
+        return jsonify({"error": "empty message"}), 400
+    tenant_id = web_tenant(data)
+    profile = wants_profile(data)
+    conversation = conversation_id(data)
+    
+    def generate():
+        try:
+            for event in chat_with_tools_stream(
+                message, tenant_id=tenant_id, profile=profile, conversation_id=conversation
+            ):
+                yield sse(event.pop("type"), event)
+                if "response" in event:
+                    history = load_history()
+                    history.append({"role": "user", "message": message})
+                    history.append({"role": "nova", "message": event["response"]})
+                    save_history(history)
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/api/stats", methods=["GET"])
+def get_stats():
+    """LLM, prompt-budget, tool, response-cache and span counters"""
+    return jsonify(runtime_stats())
+
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    """Span histograms and runtime counters in the Prometheus text format"""
+    stats = runtime_stats()
+    stats.pop("spans", None)  # exported as histograms
+    return Response(telemetry.prometheus_text(stats), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/traces", methods=["GET"])
+def get_traces():
+    """Recent request traces (span trees), newest first; ?id= for one"""
+    trace_id = request.args.get("id")
+    if trace_id:
+        trace = telemetry.get_trace(trace_id)
+        return (jsonify(trace), 200) if trace else (jsonify({"error": "unknown trace"}), 404)
+    limit = request.args.get("limit", 20, type=int)
+    return jsonify(telemetry.recent_traces(max(1, min(limit, telemetry.tracer.max_traces))))
+
 @app.route("/api/history", methods=["GET"])
 def get_history():
     """Get chat history"""
@@ -81,12 +180,14 @@ def handle_sms():
     
     from_number = request.form.get("From")
     message_body = request.form.get("Body", "").strip()
+    tenant_id = phone_tenant(from_number)
     
     if not message_body:
         return jsonify({"error": "empty message"}), 400
     
     try:
-        response = chat_with_tools(message_body)
+        # One SMS thread per number
+        response = chat_with_tools(message_body, tenant_id=tenant_id, conversation_id="sms")
         
         # Send SMS reply
         TWILIO_CLIENT.messages.create(
@@ -130,13 +231,16 @@ def process_voice():
     
     recording_url = request.form.get("RecordingUrl")
     from_number = request.form.get("From")
+    tenant_id = phone_tenant(from_number)
     
     # In production, would transcribe the recording using Groq/Whisper
     # For now, we'll use a placeholder
     user_message = "[Voice message received - transcription would go here]"
     
     try:
-        response = chat_with_tools(user_message)
+        response = chat_with_tools(
+            user_message, tenant_id=tenant_id, conversation_id=request.form.get("CallSid")
+        )
         
         # Create voice response with text-to-speech
         twiml = VoiceResponse()
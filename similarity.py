@@ -0,0 +1,71 @@
+"""
+MinHash signatures and LSH banding for near-duplicate query lookup.
+
+Each conversation's user message is reduced to a token set and hashed
+into a fixed-size MinHash signature; the fraction of equal positions in
+two signatures estimates the Jaccard similarity of their token sets.
+Signatures are split into bands, and every band hashes to one LSH bucket,
+so similar queries share at least one bucket with high probability and
+a lookup only has to look at a handful of bucket posting lists.
+"""
+
+import random
+import re
+import struct
+import zlib
+from typing import List, Set
+
+from vector_index import STOPWORDS
+
+
+NUM_PERM = 32
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+_PRIME = (1 << 31) - 1
+_rng = random.Random(0x6E6F7661)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)
+]
+_TOKEN = re.compile(r"[a-z0-9']+")
+_PACK = struct.Struct(f"<{NUM_PERM}I")
+
+
+def token_set(text: str) -> Set[str]:
+    """Content words of ``text``; character trigrams when there are none."""
+    text = text.lower()
+    tokens = {t for t in _TOKEN.findall(text) if t not in STOPWORDS}
+    if not tokens:
+        compact = " ".join(text.split())
+        tokens = {compact[i:i + 3] for i in range(max(1, len(compact) - 2))} - {""}
+    return tokens
+
+
+def signature(text: str) -> List[int]:
+    """MinHash signature of ``text`` (NUM_PERM unsigned 31-bit ints)."""
+    hashes = [zlib.crc32(t.encode("utf-8")) for t in token_set(text)]
+    if not hashes:
+        return [_PRIME] * NUM_PERM
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def pack(sig: List[int]) -> bytes:
+    return _PACK.pack(*sig)
+
+
+def unpack(blob: bytes) -> List[int]:
+    return list(_PACK.unpack(blob))
+
+
+def band_buckets(sig: List[int]) -> List[int]:
+    """One signed 64-bit bucket key per band (band index folded in)."""
+    buckets = []
+    for band in range(BANDS):
+        chunk = sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        key = zlib.crc32(struct.pack(f"<{len(chunk)}I", *chunk))
+        buckets.append((band << 32) | key)
+    return buckets
+
+
+def estimate_jaccard(a: List[int], b: List[int]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
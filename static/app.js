@@ -14,6 +14,10 @@ const historyList = document.getElementById("historyList");
 
 let ttsEnabled = true;
 let deferredPrompt = null;
+// One conversation per page load: the server keeps browsing state per conversation
+const conversationId = window.crypto && crypto.randomUUID
+  ? crypto.randomUUID()
+  : Date.now().toString(36) + Math.random().toString(36).slice(2);
 
 // Theme Management
 function initTheme() {
@@ -156,7 +160,7 @@ async function sendMsg() {
   const placeholder = log.lastChild;
 
   try {
-    let payload = { message };
+    let payload = { message, conversation_id: conversationId };
     if (file) {
       const up = await uploadFile(file);
       if (up.error) {
@@ -167,12 +171,16 @@ async function sendMsg() {
       payload.file_path = up.file_path;
     }
 
-    const res = await fetch("/api/chat", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(payload),
-    });
-    const j = await res.json();
+    let j = await streamChat(payload, placeholder);
+    if (j === null) {
+      // Streaming unavailable: fall back to the one-shot endpoint
+      const res = await fetch("/api/chat", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(payload),
+      });
+      j = await res.json();
+    }
     if (j.error) {
       placeholder.textContent = "Error: " + j.error;
       haptic("heavy");
@@ -187,6 +195,84 @@ async function sendMsg() {
   }
 }
 
+function parseSSE(frame) {
+  let event = "message";
+  const data = [];
+  for (const line of frame.split("\n")) {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) data.push(line.slice(5).trimStart());
+  }
+  if (!data.length) return null;
+  try {
+    return { event, data: JSON.parse(data.join("\n")) };
+  } catch (e) {
+    return null;
+  }
+}
+
+function addToolStatus(tool, before) {
+  const d = document.createElement("div");
+  d.className = "msg tool";
+  d.textContent = `🔧 ${tool}…`;
+  log.insertBefore(d, before);
+  log.scrollTop = log.scrollHeight;
+  return d;
+}
+
+// Stream tokens and tool progress from /api/chat/stream into placeholder.
+// Resolves to {response} or {error}, or null if streaming is unavailable.
+async function streamChat(payload, placeholder) {
+  let res;
+  try {
+    res = await fetch("/api/chat/stream", {
+      method: "POST",
+      headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+      body: JSON.stringify(payload),
+    });
+  } catch (e) {
+    return null;
+  }
+  if (!res.ok || !res.body || !res.body.getReader) return null;
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  const running = {};
+  let buffer = "";
+  let text = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const ev = parseSSE(buffer.slice(0, sep));
+      buffer = buffer.slice(sep + 2);
+      if (!ev) continue;
+      const data = ev.data;
+      if (ev.event === "token") {
+        text += data.text;
+        placeholder.textContent = text;
+        log.scrollTop = log.scrollHeight;
+      } else if (ev.event === "tool_start") {
+        // Whatever streamed before a tool call was not the answer
+        text = "";
+        placeholder.textContent = "…thinking…";
+        (running[data.tool] = running[data.tool] || []).push(addToolStatus(data.tool, placeholder));
+        haptic("light");
+      } else if (ev.event === "tool_end") {
+        const status = (running[data.tool] || []).shift();
+        if (status) status.textContent = `${data.ok ? "✓" : "✗"} ${data.tool}`;
+      } else if (ev.event === "done") {
+        return { response: data.response };
+      } else if (ev.event === "error") {
+        return { error: data.error };
+      }
+    }
+  }
+  return text ? { response: text } : { error: "stream ended early" };
+}
+
 function speak(text) {
   if (!("speechSynthesis" in window)) return;
   const u = new SpeechSynthesisUtterance(text);
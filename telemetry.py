@@ -0,0 +1,351 @@
+"""
+Request tracing and latency metrics.
+
+Each chat request is one trace (``trace("chat")``).  Work inside it opens
+spans (``span("llm.chat")``, ``@timed("memory.save_conversation")``) that
+nest through a context variable, so a span knows its parent without it
+being passed around; ``asyncio`` tasks and ``asyncio.to_thread`` carry the
+context along.  Spans opened outside a trace (e.g. the background learning
+worker) only feed the metrics.
+
+Every finished span is also counted in a per-name histogram: fixed buckets
+for Prometheus (``prometheus_text``) and a reservoir of recent durations
+for p50/p95/p99.  The most recent traces are kept as trees for
+``recent_traces``.
+
+``trace(..., profile=True)`` additionally profiles the request with
+pyinstrument when it is installed, cProfile otherwise; the report is
+stored with the trace.  Only one request is profiled at a time.
+"""
+
+import cProfile
+import functools
+import io
+import pstats
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import pyinstrument
+except ImportError:  # cProfile is used instead
+    pyinstrument = None
+
+
+# Histogram bucket bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current: ContextVar[Optional["Span"]] = ContextVar("nova_span", default=None)
+_METRIC_NAME = re.compile(r"[^a-zA-Z0-9_]+")
+
+
+class Span:
+    """One timed operation; ``children`` are the spans opened inside it."""
+
+    __slots__ = ("name", "attrs", "trace_id", "start", "wall_start", "duration_ms", "error", "children")
+
+    def __init__(self, name: str, attrs: Dict[str, Any], parent: Optional["Span"] = None):
+        self.name = name
+        self.attrs = attrs
+        self.trace_id = parent.trace_id if parent is not None else None
+        self.start = time.perf_counter()
+        self.wall_start = time.time()
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.children: List["Span"] = []
+        if parent is not None:
+            parent.children.append(self)
+
+    def set(self, **attrs):
+        """Add attributes (e.g. token counts known only at the end)."""
+        self.attrs.update(attrs)
+
+    def finish(self):
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self.start) * 1000
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        origin = self.start if origin is None else origin
+        entry: Dict[str, Any] = {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 1),
+            "ms": round(self.duration_ms, 1) if self.duration_ms is not None else None,
+        }
+        if self.attrs:
+            entry["attrs"] = self.attrs
+        if self.error:
+            entry["error"] = self.error
+        if self.children:
+            entry["children"] = [child.to_dict(origin) for child in list(self.children)]
+        return entry
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "total", "errors", "samples")
+
+    def __init__(self, max_samples: int):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0  # seconds
+        self.errors = 0
+        self.samples: deque = deque(maxlen=max_samples)  # ms
+
+    def observe(self, seconds: float, error: bool):
+        self.count += 1
+        self.total += seconds
+        self.errors += error
+        self.samples.append(seconds * 1000)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+
+class Tracer:
+    """
+    Collects spans into traces and per-name histograms.  Thread-safe;
+    the module-level functions use one shared instance.
+    """
+
+    def __init__(self, max_traces: int = 50, max_samples: int = 1024):
+        self.max_traces = max_traces
+        self.max_samples = max_samples
+        self._histograms: Dict[str, _Histogram] = {}
+        self._traces: deque = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+        self._profile_lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        """Time the enclosed block as a child of the current span."""
+        parent = _current.get()
+        span = Span(name, attrs, parent)
+        token = _current.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.finish()
+            _restore(token, parent)
+            self._observe(span)
+
+    @contextmanager
+    def trace(self, name: str, profile: bool = False, **attrs) -> Iterator[Span]:
+        """
+        Like ``span``, but starts a new trace that is kept for
+        ``recent_traces``.  Inside another trace it is an ordinary span.
+        """
+        if _current.get() is not None:
+            with self.span(name, **attrs) as span:
+                yield span
+            return
+
+        root = Span(name, attrs)
+        root.trace_id = uuid.uuid4().hex[:16]
+        token = _current.set(root)
+        profiler = self._start_profiler() if profile else None
+        if profile and profiler is None:
+            root.set(profile="skipped: another request is being profiled")
+        report = None
+        try:
+            yield root
+        except Exception as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            if profiler is not None:
+                report = self._stop_profiler(profiler)
+            root.finish()
+            _restore(token, None)
+            self._observe(root)
+            self._keep(root, report)
+
+    def record(self, name: str, duration_ms: float, error: Optional[str] = None, **attrs) -> Span:
+        """Add a span that was timed elsewhere (e.g. by ToolRunner)."""
+        span = Span(name, attrs, _current.get())
+        span.start -= duration_ms / 1000
+        span.wall_start -= duration_ms / 1000
+        span.duration_ms = duration_ms
+        span.error = error
+        self._observe(span)
+        return span
+
+    def timed(self, name: str):
+        """Decorator: run the function inside ``span(name)``."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def current_trace_id(self) -> Optional[str]:
+        span = _current.get()
+        return span.trace_id if span is not None else None
+
+    def histograms(self) -> Dict[str, Dict[str, Any]]:
+        """Per span name: count, errors and latency percentiles in ms."""
+        with self._lock:
+            snapshot = {
+                name: (hist.count, hist.total, hist.errors, sorted(hist.samples))
+                for name, hist in self._histograms.items()
+            }
+        result = {}
+        for name, (count, total, errors, samples) in sorted(snapshot.items()):
+            entry = {"count": count, "errors": errors, "avg_ms": round(total * 1000 / count, 1)}
+            if samples:
+                entry.update({f"p{int(q * 100)}_ms": _percentile(samples, q) for q in QUANTILES})
+                entry["max_ms"] = round(samples[-1], 1)
+            result[name] = entry
+        return result
+
+    def recent_traces(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """The latest finished traces, newest first (at most ``max_traces``)."""
+        limit = min(limit, self.max_traces)
+        if limit <= 0:
+            return []
+        with self._lock:
+            return list(self._traces)[-limit:][::-1]
+
+    def get_trace(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next((t for t in self._traces if t["trace_id"] == trace_id), None)
+
+    def prometheus_text(self, extra: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Span histograms, error counts and quantiles in the Prometheus text
+        format.  Numbers in ``extra`` (e.g. runtime_stats()) are added as
+        gauges named after their path, ``nova_<section>_<key>``.
+        """
+        with self._lock:
+            snapshot = {
+                name: (list(hist.buckets), hist.count, hist.total, hist.errors, sorted(hist.samples))
+                for name, hist in self._histograms.items()
+            }
+        lines = [
+            "# HELP nova_span_seconds Duration of traced operations.",
+            "# TYPE nova_span_seconds histogram",
+        ]
+        for name, (buckets, count, total, _, _) in sorted(snapshot.items()):
+            label = _label(name)
+            for bound, value in zip(BUCKETS, buckets):
+                lines.append(f'nova_span_seconds_bucket{{name="{label}",le="{bound}"}} {value}')
+            lines.append(f'nova_span_seconds_bucket{{name="{label}",le="+Inf"}} {count}')
+            lines.append(f'nova_span_seconds_sum{{name="{label}"}} {total:.6f}')
+            lines.append(f'nova_span_seconds_count{{name="{label}"}} {count}')
+        lines += [
+            "# HELP nova_span_errors_total Traced operations that raised or failed.",
+            "# TYPE nova_span_errors_total counter",
+        ]
+        for name, (_, _, _, errors, _) in sorted(snapshot.items()):
+            lines.append(f'nova_span_errors_total{{name="{_label(name)}"}} {errors}')
+        lines += [
+            "# HELP nova_span_quantile_seconds Latency percentiles over recent operations.",
+            "# TYPE nova_span_quantile_seconds gauge",
+        ]
+        for name, (_, _, _, _, samples) in sorted(snapshot.items()):
+            for q in QUANTILES:
+                if samples:
+                    value = _percentile(samples, q) / 1000
+                    lines.append(f'nova_span_quantile_seconds{{name="{_label(name)}",quantile="{q}"}} {value}')
+        for metric, value in _flatten("nova", extra or {}):
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._traces.clear()
+
+    def _observe(self, span: Span):
+        with self._lock:
+            hist = self._histograms.get(span.name)
+            if hist is None:
+                hist = self._histograms[span.name] = _Histogram(self.max_samples)
+            hist.observe(span.duration_ms / 1000, span.error is not None)
+
+    def _keep(self, root: Span, report: Optional[str]):
+        entry = root.to_dict()
+        entry["trace_id"] = root.trace_id
+        entry["started"] = datetime.fromtimestamp(root.wall_start).isoformat(timespec="milliseconds")
+        if report is not None:
+            entry["profile"] = report
+        with self._lock:
+            self._traces.append(entry)
+
+    def _start_profiler(self):
+        # cProfile (3.12+) and pyinstrument hook the whole interpreter
+        if not self._profile_lock.acquire(blocking=False):
+            return None
+        try:
+            if pyinstrument is not None:
+                profiler = pyinstrument.Profiler()
+                profiler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+        except Exception:  # another profiler or debugger is active
+            self._profile_lock.release()
+            return None
+        return profiler
+
+    def _stop_profiler(self, profiler) -> str:
+        try:
+            if pyinstrument is not None:
+                profiler.stop()
+                return profiler.output_text(unicode=False, color=False)
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(40)
+            return out.getvalue()
+        finally:
+            self._profile_lock.release()
+
+
+def _restore(token, parent: Optional[Span]):
+    try:
+        _current.reset(token)
+    except ValueError:  # a generator finished in another context
+        _current.set(parent)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _flatten(prefix: str, value: Any):
+    """(metric name, number) pairs for every number in a nested dict."""
+    if isinstance(value, bool):
+        yield prefix, int(value)
+    elif isinstance(value, (int, float)):
+        yield prefix, value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(f"{prefix}_{_METRIC_NAME.sub('_', str(key)).strip('_')}", item)
+
+
+tracer = Tracer()
+
+span = tracer.span
+trace = tracer.trace
+record = tracer.record
+timed = tracer.timed
+current_trace_id = tracer.current_trace_id
+histograms = tracer.histograms
+recent_traces = tracer.recent_traces
+get_trace = tracer.get_trace
+prometheus_text = tracer.prometheus_text
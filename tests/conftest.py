@@ -0,0 +1,34 @@
+import importlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(scope="session")
+def nova(tmp_path_factory):
+    """nova_ultimate against the local LLM stub, with a throwaway home and the response cache on."""
+    from llm_stub import start_stub_server
+
+    home = tmp_path_factory.mktemp("home")
+    server, url = start_stub_server()
+    saved = {key: os.environ.get(key) for key in ("HOME", "GROQ_API_URL", "GROQ_API_KEY", "NOVA_RESPONSE_CACHE")}
+    os.environ.update(HOME=str(home), GROQ_API_URL=url, GROQ_API_KEY="stub", NOVA_RESPONSE_CACHE="1")
+    cwd = os.getcwd()
+    os.chdir(home)  # tools log next to the working directory
+    try:
+        module = importlib.import_module("nova_ultimate")
+        yield module
+        module.runner.shutdown()
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
@@ -0,0 +1,35 @@
+import threading
+
+from epistemic_engine import EpistemicEngine
+from memory_system import NovaMemory
+
+
+def test_metrics_can_be_read_while_the_worker_runs(tmp_path):
+    memory = NovaMemory(str(tmp_path / "memory.db"), semantic_index=False)
+    engine = EpistemicEngine(memory)
+    engine.start_worker(max_batch=8, max_pending=16)
+    snapshots = []
+    stop = threading.Event()
+
+    def poll():
+        while not stop.is_set():
+            snapshots.append(engine.get_worker_metrics())
+
+    reader = threading.Thread(target=poll)
+    reader.start()
+    try:
+        for i in range(200):
+            engine.submit(f"I prefer python for task {i}", "noted")
+        assert engine.drain(timeout=30)
+    finally:
+        stop.set()
+        reader.join(timeout=10)
+        engine.stop_worker()
+        memory.close()
+
+    metrics = engine.get_worker_metrics()
+    assert metrics["processed"] == 200 and metrics["failed"] == 0
+    assert not metrics["running"] and metrics["queue_depth"] == 0
+    # Counters only move forward between snapshots
+    processed = [snapshot["processed"] for snapshot in snapshots]
+    assert processed == sorted(processed)
@@ -0,0 +1,21 @@
+from memory_system import NovaMemory
+
+
+def test_queued_exchanges_survive_a_snapshot_reload(tmp_path):
+    memory = NovaMemory(
+        str(tmp_path / "memory.db"),
+        write_behind=True,
+        write_behind_options={"flush_interval": 30, "max_batch": 1000},
+        semantic_index=False
+    )
+    try:
+        memory.save_conversation("remember the blue door", "noted")
+        memory.log_activity("coding", "writing tests")
+        assert memory.get_write_stats()["pending"] >= 1
+
+        memory.invalidate_context()
+        context = memory.get_context_for_prompt()
+        assert context.count("remember the blue door") == 1
+        assert "writing tests" in context
+    finally:
+        memory.close()
@@ -0,0 +1,56 @@
+from response_cache import ResponseCache, is_follow_up, normalize
+
+
+def test_exact_and_near_hits():
+    cache = ResponseCache()
+    cache.put("Weather forecast for Paris tomorrow morning?", "Sunny", "s")
+    assert cache.get("weather forecast for paris tomorrow morning", "s") == "Sunny"
+    # Reworded with one extra word: 5 of 6 content words shared
+    assert cache.get("please, the Paris weather forecast for tomorrow morning", "s") == "Sunny"
+    stats = cache.stats()
+    assert (stats["hits_exact"], stats["hits_near"]) == (1, 1)
+
+
+def test_changed_entity_misses():
+    cache = ResponseCache()
+    cache.put("weather in Paris tomorrow", "Sunny", "s")
+    assert cache.get("weather in Rome tomorrow", "s") is None
+    cache.put("is the museum open on sunday", "Yes", "s")
+    assert cache.get("is the museum not open on sunday", "s") is None
+
+
+def test_scopes_are_separate():
+    cache = ResponseCache()
+    cache.put("capital city of france", "Paris", "alice")
+    assert cache.get("capital city of france", "bob") is None
+
+
+def test_follow_ups_are_never_cached():
+    for message in ("yes", "do it", "and then?", "what about her", "tell me more about those"):
+        assert is_follow_up(normalize(message)), message
+    assert not is_follow_up(normalize("what is the capital of france"))
+
+    cache = ResponseCache()
+    cache.put("tell me more", "More", "s")
+    assert cache.get("tell me more", "s") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entries_miss():
+    cache = ResponseCache(ttl_seconds=0)
+    cache.put("capital city of france", "Paris", "s")
+    assert cache.get("capital city of france", "s") is None
+
+
+def test_repeated_question_hits_after_a_turn(nova):
+    """The reply is stored under the scope the next identical question looks up."""
+    nova.response_cache.clear()
+    before = nova.response_cache.stats()
+    first = nova.chat_with_tools("what is the capital of france")
+    second = nova.chat_with_tools("what is the capital of france")
+    after = nova.response_cache.stats()
+    assert first == second
+    assert after["hits_exact"] == before["hits_exact"] + 1
+    # and again after the cache hit was itself saved as a conversation
+    nova.chat_with_tools("What is the capital of France?")
+    assert nova.response_cache.stats()["hits_exact"] == before["hits_exact"] + 2
@@ -0,0 +1,73 @@
+import threading
+
+import memory_system
+from memory_system import TenantMemoryManager
+
+
+class _SlowMemory(memory_system.NovaMemory):
+    """Opens only once both racing threads are inside the constructor."""
+
+    barrier = None
+    closed = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.barrier.wait(timeout=10)
+
+    def close(self):
+        type(self).closed += 1
+        super().close()
+
+
+def _manager(tmp_path, evicted, **kwargs):
+    return TenantMemoryManager(
+        base_dir=str(tmp_path),
+        memory_options={"semantic_index": False},
+        on_evict=lambda key, memory: evicted.append(key),
+        **kwargs
+    )
+
+
+def test_racing_opens_share_one_handle_without_evicting(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_system, "NovaMemory", _SlowMemory)
+    _SlowMemory.barrier = threading.Barrier(2)
+    _SlowMemory.closed = 0
+    evicted = []
+    tenants = _manager(tmp_path, evicted)
+
+    handles = []
+    threads = [
+        threading.Thread(target=lambda: handles.append(tenants.get("web:alice")))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert len(handles) == 2 and handles[0] is handles[1]
+    assert evicted == []  # the losing handle is closed quietly
+    assert _SlowMemory.closed == 1
+    assert tenants.open_tenants() == [tenants.tenant_key("web:alice")]
+    handles[0].save_conversation("still open", "yes", durable=True)
+    tenants.close_all()
+
+
+def test_least_recently_used_tenant_is_evicted(tmp_path):
+    evicted = []
+    tenants = _manager(tmp_path, evicted, max_open=2)
+    for tenant in ("web:a", "web:b", "web:c"):
+        tenants.get(tenant)
+    assert evicted == [tenants.tenant_key("web:a")]
+    tenants.close_all()
+
+
+def test_leased_tenant_is_closed_after_its_last_lease(tmp_path):
+    evicted = []
+    tenants = _manager(tmp_path, evicted, max_open=1)
+    with tenants.lease("web:a") as memory:
+        tenants.get("web:b")
+        assert evicted == []
+        memory.save_conversation("in use", "fine", durable=True)
+    assert evicted == [tenants.tenant_key("web:a")]
+    tenants.close_all()
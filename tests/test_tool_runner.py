@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from tools.base import BaseTool
+from tools.registry import TOOL_REGISTRY
+from tools.runner import ToolRunner
+
+
+class _HangingTool(BaseTool):
+    name = "test_hanging"
+    description = "Blocks until released"
+    scope = "call"
+    max_concurrency = 2
+    timeout = 0.2
+    gate = threading.Event()
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def run(self, **kwargs):
+        cls = type(self)
+        with cls.lock:
+            cls.running += 1
+            cls.peak = max(cls.peak, cls.running)
+        try:
+            cls.gate.wait(10)
+            return {"done": True}
+        finally:
+            with cls.lock:
+                cls.running -= 1
+
+
+@pytest.fixture
+def runner():
+    TOOL_REGISTRY[_HangingTool.name] = _HangingTool
+    _HangingTool.gate.clear()
+    _HangingTool.running = _HangingTool.peak = 0
+    tool_runner = ToolRunner()
+    yield tool_runner
+    _HangingTool.gate.set()
+    tool_runner.shutdown()
+    TOOL_REGISTRY.pop(_HangingTool.name, None)
+
+
+def test_timed_out_calls_keep_their_slot(runner):
+    for _ in range(5):
+        result = runner.run(_HangingTool.name)
+        assert result["timed_out"]
+    # Only max_concurrency threads were ever started; the rest never ran
+    assert _HangingTool.peak == 2
+    assert runner.stats()["running"] == 2
+
+    _HangingTool.gate.set()
+    deadline = time.monotonic() + 5
+    while runner.stats()["running"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert runner.stats()["running"] == 0
+    assert runner.run(_HangingTool.name)["ok"]
+
+
+def test_run_many_respects_the_limit(runner):
+    calls = [{"id": str(i), "name": _HangingTool.name, "arguments": {}} for i in range(6)]
+    results = runner.run_many(calls)
+    assert all(result["timed_out"] for result in results)
+    assert _HangingTool.peak == 2
+
+
+def test_async_calls_share_the_slots(runner):
+    import asyncio
+
+    async def main():
+        return await asyncio.gather(*(runner.arun(_HangingTool.name) for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert all(result["timed_out"] for result in results)
+    assert _HangingTool.peak == 2
@@ -0,0 +1,105 @@
+import sqlite3
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from memory_system import NovaMemory
+from vector_index import KIND_CONVERSATION, VectorIndex
+
+
+@pytest.fixture
+def memory(tmp_path):
+    mem = NovaMemory(str(tmp_path / "memory.db"))
+    yield mem
+    mem.close()
+
+
+def test_rolled_back_insert_is_not_indexed(memory):
+    memory.save_conversation("the quick brown fox", "jumps")
+    with pytest.raises(RuntimeError):
+        with memory.connection():
+            memory._insert_conversation("2026-01-01", "zebra crossing", "x", "[]", "{}")
+            raise RuntimeError("roll back")
+    assert memory._vectors.count == 1
+    assert memory._vectors.high_water["conversation"] == 1
+
+    # SQLite hands the rolled-back id out again; the real row gets indexed
+    memory.save_conversation("purple elephants dancing", "yes")
+    assert memory._vectors.high_water["conversation"] == 2
+    assert [hit["user"] for hit in memory.semantic_search("purple elephants")] == [
+        "purple elephants dancing"
+    ]
+
+
+def test_failed_write_behind_savepoint_is_not_indexed(tmp_path):
+    mem = NovaMemory(str(tmp_path / "memory.db"), write_behind=True)
+    try:
+        def broken():
+            with mem.connection() as conn:
+                conn.execute(
+                    "INSERT INTO conversations (timestamp, user_message, nova_response) VALUES ('t', 'ghost words', '')"
+                )
+                mem._pool.after_commit(mem._index_new_rows)
+                raise sqlite3.IntegrityError("boom")
+        mem._writer.submit(broken)
+        mem.save_conversation("real words here", "ok", durable=True)
+        assert mem._vectors.count == 1
+        assert [hit["user"] for hit in mem.semantic_search("ghost words real")] == ["real words here"]
+    finally:
+        mem.close()
+
+
+def test_prune_tombstones_instead_of_resetting(memory):
+    memory.save_conversation("kept conversation", "fine")
+    memory.learn_fact("fact", "alpha beta gamma", confidence=0.01)
+    memory.learn_fact("fact", "delta epsilon zeta", confidence=1.0)
+    before = memory._vectors.count
+
+    assert memory.prune_knowledge(0.5) == 1
+    stats = memory._vectors.stats()
+    assert stats["vectors"] == before  # nothing re-embedded
+    assert stats["deleted"] == 1
+    assert memory.semantic_search("alpha beta gamma", kind="knowledge") == []
+    assert memory.semantic_search("delta epsilon zeta", kind="knowledge")
+
+
+def test_index_for_another_database_starts_over(tmp_path):
+    index = VectorIndex(tmp_path / "memory", source=1)
+    index.append(KIND_CONVERSATION, [(1, "hello world")])
+    assert VectorIndex(tmp_path / "memory", source=1).count == 1
+    assert VectorIndex(tmp_path / "memory", source=2).count == 0
+
+
+def test_restored_database_lowers_high_water(memory):
+    for i in range(3):
+        memory.save_conversation(f"message number {i}", "ok")
+    memory._vectors.forget_after(KIND_CONVERSATION, 1)
+    assert memory._vectors.high_water["conversation"] == 1
+    assert memory._vectors.stats()["deleted"] == 2
+
+
+def test_search_sees_another_writer(tmp_path):
+    # A second instance on the same files stands in for another process
+    reader = VectorIndex(tmp_path / "memory", source=1)
+    writer = VectorIndex(tmp_path / "memory", source=1)
+    assert reader.search(["orange juice"]) == [[]]
+    writer.append(KIND_CONVERSATION, [(1, "orange juice"), (2, "green tea")])
+    assert [row_id for _, row_id, _ in reader.search(["orange juice"])[0]] == [1]
+
+
+def test_training_runs_in_the_background(tmp_path):
+    index = VectorIndex(tmp_path / "memory", ivf_min_rows=256, nprobe=64)
+    rng = np.random.default_rng(1)
+    words = [f"word{i}" for i in range(400)]
+    rows = [(i, " ".join(rng.choice(words, size=6))) for i in range(1, 301)]
+    index.append(KIND_CONVERSATION, rows)
+    assert index._trainer is not None
+    index._trainer.join(timeout=30)
+    assert index.trained_at == 300
+    assert index.stats()["lists"] > 0
+
+    # Rows added later go to the existing centroids and stay searchable
+    index.append(KIND_CONVERSATION, [(301, "unmistakable sentinel phrase")])
+    assert index.trained_at == 300
+    assert index.search(["unmistakable sentinel phrase"])[0][0][1] == 301
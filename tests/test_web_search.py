@@ -0,0 +1,64 @@
+import asyncio
+import http.server
+import threading
+
+import pytest
+
+pytest.importorskip("httpx")
+
+from tools.web_search import WebSearchTool
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so the pool holds the socket
+
+    def do_GET(self):
+        body = b"<html><title>hi</title></html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def _sockets(client):
+    sockets = []
+    for connection in client._transport._pool.connections:
+        sock = connection._connection._network_stream.get_extra_info("socket")
+        sockets.append(getattr(sock, "_sock", sock))
+    return sockets
+
+
+def _fetch(tool, url):
+    async def main():
+        await tool.arun(operation="fetch", url=url)
+        return tool._client()
+    return asyncio.run(main())
+
+
+def test_clients_of_closed_loops_are_closed(url):
+    tool = WebSearchTool()
+    first = _fetch(tool, url)
+    first_sockets = _sockets(first)
+    assert first_sockets and all(sock.fileno() != -1 for sock in first_sockets)
+
+    # The next loop's first call drops and closes the previous loop's client
+    second = _fetch(tool, url)
+    assert list(tool._clients.values()) == [second]
+    assert all(sock.fileno() == -1 for sock in first_sockets)
+
+    second_sockets = _sockets(second)
+    tool.close()
+    assert tool._clients == {}
+    assert second_sockets and all(sock.fileno() == -1 for sock in second_sockets)
@@ -1,9 +1,21 @@
 """Base definitions for tools."""
 
+import asyncio
+
+# Tool instance lifetimes (see ToolRunner / tools.pool.ToolPool)
+SCOPE_SINGLETON = "singleton"        # shared by every call
+SCOPE_CONVERSATION = "conversation"  # one per conversation (session id)
+SCOPE_CALL = "call"                  # a fresh instance per call
+
+
 class ToolExecutionError(Exception):
     """Raised when a tool fails to execute properly."""
 
 
+class ToolTimeoutError(ToolExecutionError):
+    """Raised when a tool call misses its deadline."""
+
+
 class BaseTool:
     """
     Base interface for tools.
@@ -11,10 +23,44 @@ class BaseTool:
     Attributes:
         name: Human-readable tool name.
         description: Short description of tool behavior.
+        parameters: JSON schema of the ``run`` arguments, sent to the model
+            as the function-calling schema.  Must be a literal: the
+            manifest reads it from the source without importing the tool.
+        keywords: Words that suggest a message needs this tool; used to
+            send only the relevant schemas with each request.
+        side_effects: True if the tool changes local state (files, apps,
+            processes). ToolRunner.run_many runs such calls one at a time,
+            in the order the model asked for them.
+        read_only_operations: Values of the ``operation`` argument that
+            are safe to run concurrently even when side_effects is True.
+        max_concurrency: How many calls of this tool may run at once.
+        scope: How long an instance lives: SCOPE_SINGLETON, SCOPE_CONVERSATION
+            or SCOPE_CALL (the default: a new instance for every call).
+        thread_safe: True if one instance may serve concurrent calls.
+            Otherwise concurrent calls use separate instances (singleton)
+            or take turns (conversation).
+        timeout: Wall-clock seconds a call may take before ToolRunner gives
+            up on it and returns a timeout result.
+        max_output_chars: Results larger than this (as JSON) have their
+            long strings and lists cut down by ToolRunner.
     """
 
     name: str
     description: str
+    parameters: dict = {"type": "object", "properties": {}}
+    keywords: tuple = ()
+    side_effects: bool = False
+    read_only_operations: frozenset = frozenset()
+    max_concurrency: int = 4
+    scope: str = SCOPE_CALL
+    thread_safe: bool = False
+    timeout: float = 30.0
+    max_output_chars: int = 100_000
+
+    @classmethod
+    def has_side_effects(cls, **kwargs) -> bool:
+        """Whether a call with these arguments may change local state."""
+        return cls.side_effects and kwargs.get("operation") not in cls.read_only_operations
 
     def run(self, **kwargs) -> dict:
         """
@@ -32,3 +78,15 @@ class BaseTool:
         """
         raise NotImplementedError("Tool must implement run()")
 
+    def close(self) -> None:
+        """Release resources (sessions, connections) when the instance is retired."""
+
+    async def arun(self, **kwargs) -> dict:
+        """
+        Execute the tool from asyncio code.
+
+        Tools doing network I/O can override this with a native coroutine;
+        the default runs ``run`` on a worker thread so the event loop is
+        never blocked.
+        """
+        return await asyncio.to_thread(self.run, **kwargs)
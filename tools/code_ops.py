@@ -2,7 +2,7 @@
 
 import os
 import re
-from .base import BaseTool, ToolExecutionError
+from .base import SCOPE_SINGLETON, BaseTool, ToolExecutionError
 from .registry import register_tool
 
 
@@ -12,6 +12,25 @@ class CodeOperationsTool(BaseTool):
     
     name = "code_ops"
     description = "Edit, analyze, or refactor code files"
+    side_effects = True
+    read_only_operations = frozenset({"analyze"})
+    scope = SCOPE_SINGLETON  # stateless
+    thread_safe = True
+    timeout = 10.0
+    keywords = ("code", "edit", "refactor", "function", "class", "script", "append",
+                "replace", "insert", "line", "analyze", "py", "js")
+    parameters = {
+        "type": "object",
+        "properties": {
+            "operation": {"type": "string", "enum": ["append", "replace", "insert", "analyze"]},
+            "path": {"type": "string"},
+            "content": {"type": "string", "description": "Text to append or insert"},
+            "old_text": {"type": "string", "description": "Text to find (replace)"},
+            "new_text": {"type": "string", "description": "Replacement text (replace)"},
+            "line_number": {"type": "integer", "description": "Line to insert before (insert)"}
+        },
+        "required": ["operation", "path"]
+    }
     
     def run(self, operation: str, path: str, **kwargs) -> dict:
         """
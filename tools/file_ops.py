@@ -3,7 +3,7 @@
 import os
 import shutil
 from pathlib import Path
-from .base import BaseTool, ToolExecutionError
+from .base import SCOPE_SINGLETON, BaseTool, ToolExecutionError
 from .registry import register_tool
 
 
@@ -13,6 +13,23 @@ class FileOperationsTool(BaseTool):
     
     name = "file_ops"
     description = "Read, write, move, copy, or delete files and folders"
+    side_effects = True
+    read_only_operations = frozenset({"read", "list"})
+    scope = SCOPE_SINGLETON  # stateless
+    thread_safe = True
+    timeout = 10.0
+    keywords = ("file", "files", "folder", "folders", "directory", "read", "write", "save",
+                "move", "copy", "delete", "list", "path", "txt", "document")
+    parameters = {
+        "type": "object",
+        "properties": {
+            "operation": {"type": "string", "enum": ["read", "write", "move", "copy", "delete", "list"]},
+            "path": {"type": "string"},
+            "content": {"type": "string", "description": "Text to write (write)"},
+            "destination": {"type": "string", "description": "Target path (move, copy)"}
+        },
+        "required": ["operation", "path"]
+    }
     
     def run(self, operation: str, path: str, content: str = None, destination: str = None) -> dict:
         """
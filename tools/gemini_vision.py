@@ -6,9 +6,12 @@ import os
 import requests
 import base64
 from typing import Dict, Any, Optional
-from .base import BaseTool, ToolExecutionError
+from .base import SCOPE_SINGLETON, BaseTool, ToolExecutionError
 from .registry import register_tool
 
+# Largest image sent inline (the API's request size limit is 20 MB)
+MAX_IMAGE_BYTES = 15 * 1024 * 1024
+
 
 @register_tool
 class GeminiVisionTool(BaseTool):
@@ -16,6 +19,24 @@ class GeminiVisionTool(BaseTool):
     
     name = "gemini_vision"
     description = "Analyze images, videos, or ask Gemini Pro questions"
+    max_concurrency = 2  # API rate limits
+    scope = SCOPE_SINGLETON  # stateless
+    thread_safe = True
+    timeout = 90.0  # image download plus a slow generateContent call
+    keywords = ("image", "images", "photo", "picture", "screenshot", "video", "vision",
+                "look", "see", "gemini", "jpg", "png", "mp4", "attached")
+    parameters = {
+        "type": "object",
+        "properties": {
+            "operation": {"type": "string", "enum": ["analyze_image", "analyze_video", "ask"]},
+            "image_path": {"type": "string"},
+            "image_url": {"type": "string"},
+            "video_url": {"type": "string"},
+            "question": {"type": "string"},
+            "prompt": {"type": "string"}
+        },
+        "required": ["operation"]
+    }
     
     def __init__(self):
         self.api_key = os.environ.get("GEMINI_API_KEY")
@@ -68,12 +89,14 @@ class GeminiVisionTool(BaseTool):
         
         # Prepare image data
         if image_path:
-            with open(os.path.expanduser(image_path), 'rb') as f:
+            image_path = os.path.expanduser(image_path)
+            if os.path.getsize(image_path) > MAX_IMAGE_BYTES:
+                raise ToolExecutionError(f"Image is larger than {MAX_IMAGE_BYTES // (1024 * 1024)} MB")
+            with open(image_path, 'rb') as f:
                 image_data = base64.b64encode(f.read()).decode()
             image_source = "file"
         elif image_url:
-            response = requests.get(image_url)
-            image_data = base64.b64encode(response.content).decode()
+            image_data = base64.b64encode(self._download(image_url)).decode()
             image_source = "url"
         else:
             raise ToolExecutionError("Provide either image_path or image_url")
@@ -109,6 +132,17 @@ class GeminiVisionTool(BaseTool):
             "model": "gemini-1.5-flash"
         }
     
+    def _download(self, url: str) -> bytes:
+        """Fetch an image, refusing anything over MAX_IMAGE_BYTES."""
+        with requests.get(url, timeout=(5, 30), stream=True) as response:
+            response.raise_for_status()
+            data = bytearray()
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                data.extend(chunk)
+                if len(data) > MAX_IMAGE_BYTES:
+                    raise ToolExecutionError(f"Image is larger than {MAX_IMAGE_BYTES // (1024 * 1024)} MB")
+        return bytes(data)
+    
     def _analyze_video(self, video_url: str, prompt: str) -> Dict[str, Any]:
         """Analyze video content."""
         
@@ -12,11 +12,14 @@ def discover_tools() -> None:
     """
     Import all tool modules and register their BaseTool subclasses.
 
+    ToolRunner no longer needs this (tools are imported on first use via
+    the manifest); it is kept for callers that want everything loaded.
+
     Attempts to import the package to obtain a usable __path__, falls back
     to the local 'tools' package name if necessary.
     """
     package_name = __package__ or "tools"
-    exclude = {"base", "registry", "loader"}
+    exclude = {"base", "registry", "loader", "manifest", "pool", "runner"}
 
     pkg = None
     pkg_path: Optional[list] = None
@@ -0,0 +1,122 @@
+"""Static manifest of the tools package, built without importing tools."""
+
+import ast
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+PACKAGE_DIR = Path(__file__).resolve().parent
+CACHE_PATH = PACKAGE_DIR / "__pycache__" / "tool_manifest.json"
+MANIFEST_VERSION = 1
+
+# Modules that are infrastructure, not tools
+EXCLUDE = {"__init__", "base", "registry", "loader", "manifest", "pool", "runner"}
+
+# Class attributes copied into the manifest (all must be literals)
+FIELDS = (
+    "name", "description", "parameters", "keywords",
+    "side_effects", "read_only_operations", "max_concurrency",
+)
+
+_manifest: Optional[Dict[str, Any]] = None
+
+
+def _tool_files() -> Dict[str, list]:
+    """Tool module files with their (mtime_ns, size), for cache validation."""
+    sources = {}
+    for path in sorted(PACKAGE_DIR.glob("*.py")):
+        if path.stem in EXCLUDE or not path.stem.isidentifier():
+            continue
+        stat = path.stat()
+        sources[path.name] = [stat.st_mtime_ns, stat.st_size]
+    return sources
+
+
+def _literal(node: ast.AST) -> Any:
+    """Value of a literal node; frozenset({...}) and set() are allowed too."""
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id in ("frozenset", "set")
+        and not node.keywords
+        and len(node.args) <= 1
+    ):
+        return sorted(ast.literal_eval(node.args[0])) if node.args else []
+    return ast.literal_eval(node)
+
+
+def _scan_module(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Tool classes declared in one module (classes deriving from BaseTool)."""
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    tools = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        bases = {getattr(base, "id", getattr(base, "attr", None)) for base in node.bases}
+        if "BaseTool" not in bases:
+            continue
+        entry: Dict[str, Any] = {"module": f"{__package__ or 'tools'}.{path.stem}", "class": node.name}
+        for stmt in node.body:
+            if isinstance(stmt, ast.Assign):
+                targets, value = stmt.targets, stmt.value
+            elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+                targets, value = [stmt.target], stmt.value
+            else:
+                continue
+            for target in targets:
+                if isinstance(target, ast.Name) and target.id in FIELDS:
+                    try:
+                        entry[target.id] = _literal(value)
+                    except (ValueError, TypeError, SyntaxError):
+                        pass
+        if isinstance(entry.get("name"), str) and entry["name"]:
+            tools[entry["name"]] = entry
+    return tools
+
+
+def build_manifest() -> Dict[str, Any]:
+    """Scan every tool module's source and describe its tools."""
+    sources = _tool_files()
+    tools: Dict[str, Dict[str, Any]] = {}
+    for filename in sources:
+        try:
+            tools.update(_scan_module(PACKAGE_DIR / filename))
+        except (OSError, SyntaxError, UnicodeDecodeError):
+            continue  # the import will report it, as before
+    return {"version": MANIFEST_VERSION, "sources": sources, "tools": tools}
+
+
+def load_manifest(refresh: bool = False) -> Dict[str, Any]:
+    """
+    The tools manifest, from the on-disk cache when it is still current.
+
+    The cache is rebuilt whenever a tool module is added, removed or
+    modified; failing to write it is not an error.
+    """
+    global _manifest
+    if _manifest is not None and not refresh:
+        return _manifest
+
+    sources = _tool_files()
+    manifest = None
+    if not refresh:
+        try:
+            cached = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+            if cached.get("version") == MANIFEST_VERSION and cached.get("sources") == sources:
+                manifest = cached
+        except (OSError, ValueError):
+            pass
+
+    if manifest is None:
+        manifest = build_manifest()
+        try:
+            CACHE_PATH.parent.mkdir(exist_ok=True)
+            tmp = CACHE_PATH.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+            os.replace(tmp, CACHE_PATH)
+        except OSError:
+            pass
+
+    _manifest = manifest
+    return manifest
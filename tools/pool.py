@@ -0,0 +1,238 @@
+"""Tool instance lifetimes for ToolRunner."""
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from .base import SCOPE_CALL, SCOPE_CONVERSATION, SCOPE_SINGLETON, BaseTool, ToolTimeoutError
+
+
+class _Instance:
+    __slots__ = ("tool", "lock", "users", "last_used")
+
+    def __init__(self, tool: BaseTool):
+        self.tool = tool
+        self.lock = None if tool.thread_safe else threading.Lock()
+        self.users = 0
+        self.last_used = time.monotonic()
+
+
+class ToolPool:
+    """
+    Creates, shares and closes tool instances according to their ``scope``.
+
+    - ``singleton``: thread-safe tools share one instance; other tools
+      borrow one from a pool of idle instances (created on demand, at
+      most ``max_concurrency`` kept).
+    - ``conversation``: one instance per (tool, session id), so state
+      such as an HTTP session or the current page survives between calls;
+      calls on an instance that is not thread-safe take turns.  Without a
+      session id these behave like ``call``.
+    - ``call``: a fresh instance per call, closed afterwards.
+
+    Conversation instances and idle pooled instances are closed after
+    ``idle_timeout`` seconds without use; conversation instances are also
+    evicted least recently used first beyond ``max_sessions``.  Eviction
+    runs whenever an instance is released and, once a conversation
+    instance exists, on a background thread every ``idle_timeout / 4``
+    seconds, so sessions nobody returns to are closed too.
+    """
+
+    def __init__(self, idle_timeout: float = 600.0, max_sessions: int = 64):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._shared: Dict[str, BaseTool] = {}
+        self._idle: Dict[str, List[Tuple[BaseTool, float]]] = {}
+        self._sessions: "OrderedDict[Tuple[str, Hashable], _Instance]" = OrderedDict()
+        self._stats = {"created": 0, "reused": 0, "closed": 0, "evicted": 0}
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_stop = threading.Event()
+
+    def acquire(
+        self,
+        name: str,
+        tool_cls,
+        session_id: Optional[Hashable] = None,
+        timeout: Optional[float] = None
+    ) -> Tuple[BaseTool, Callable[[], None]]:
+        """
+        An instance of ``tool_cls`` for one call, and the function that
+        returns it to the pool.  May block (up to ``timeout`` seconds, then
+        ToolTimeoutError) while another call is using a conversation
+        instance that is not thread-safe.
+        """
+        scope = getattr(tool_cls, "scope", SCOPE_CALL)
+        if scope == SCOPE_CONVERSATION and session_id is not None:
+            return self._acquire_session(name, tool_cls, session_id, timeout)
+        if scope == SCOPE_SINGLETON and tool_cls.thread_safe:
+            return self._acquire_shared(name, tool_cls), _noop
+        if scope == SCOPE_SINGLETON:
+            return self._acquire_pooled(name, tool_cls)
+
+        tool = self._create(tool_cls)
+        return tool, lambda: self._close([tool])
+
+    def _acquire_shared(self, name: str, tool_cls) -> BaseTool:
+        with self._lock:
+            tool = self._shared.get(name)
+            if tool is None:
+                tool = self._shared[name] = tool_cls()
+                self._stats["created"] += 1
+            else:
+                self._stats["reused"] += 1
+            return tool
+
+    def _acquire_pooled(self, name: str, tool_cls):
+        with self._lock:
+            idle = self._idle.get(name)
+            tool = idle.pop()[0] if idle else None
+            if tool is not None:
+                self._stats["reused"] += 1
+        if tool is None:
+            tool = self._create(tool_cls)
+
+        def release():
+            with self._lock:
+                idle = self._idle.setdefault(name, [])
+                spare = len(idle) >= max(1, tool_cls.max_concurrency)
+                if not spare:
+                    idle.append((tool, time.monotonic()))
+            if spare:
+                self._close([tool])
+            self.evict_idle()
+        return tool, release
+
+    def _acquire_session(self, name: str, tool_cls, session_id: Hashable, timeout: Optional[float]):
+        key = (name, session_id)
+        with self._lock:
+            instance = self._sessions.get(key)
+            if instance is not None:
+                self._stats["reused"] += 1
+                self._sessions.move_to_end(key)
+                instance.users += 1
+        if instance is None:
+            created = _Instance(self._create(tool_cls))
+            with self._lock:
+                # Another call may have created it meanwhile; keep the first
+                instance = self._sessions.setdefault(key, created)
+                instance.users += 1
+                self._start_reaper()
+            if instance is not created:
+                self._close([created.tool])
+        if instance.lock is not None:
+            if not instance.lock.acquire(timeout=-1 if timeout is None else max(0.0, timeout)):
+                with self._lock:
+                    instance.users -= 1
+                raise ToolTimeoutError(f"{name} is still busy with an earlier call")
+
+        def release():
+            if instance.lock is not None:
+                instance.lock.release()
+            with self._lock:
+                instance.users -= 1
+                instance.last_used = time.monotonic()
+            self.evict_idle()
+        return instance.tool, release
+
+    def evict_idle(self, now: Optional[float] = None):
+        """Close instances idle for longer than ``idle_timeout``."""
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self._lock:
+            for key, instance in list(self._sessions.items()):
+                if instance.users:
+                    continue
+                if (
+                    now - instance.last_used > self.idle_timeout
+                    or len(self._sessions) > self.max_sessions
+                ):
+                    del self._sessions[key]
+                    expired.append(instance.tool)
+            for name, idle in self._idle.items():
+                keep = [(tool, since) for tool, since in idle if now - since <= self.idle_timeout]
+                expired.extend(tool for tool, since in idle if now - since > self.idle_timeout)
+                idle[:] = keep
+            self._stats["evicted"] += len(expired)
+        self._close(expired)
+
+    def end_session(self, session_id: Hashable):
+        """Close every instance bound to ``session_id`` that is not in use."""
+        self.end_sessions(lambda candidate: candidate == session_id)
+
+    def end_sessions(self, match: Callable[[Hashable], bool]):
+        """Close the unused instances of every session id ``match`` accepts."""
+        with self._lock:
+            keys = [
+                key for key, instance in self._sessions.items()
+                if match(key[1]) and not instance.users
+            ]
+            tools = [self._sessions.pop(key).tool for key in keys]
+        self._close(tools)
+
+    def close(self):
+        """Close every pooled instance."""
+        with self._lock:
+            self._reaper_stop.set()
+            self._reaper, self._reaper_stop = None, threading.Event()
+            tools = list(self._shared.values())
+            tools += [tool for idle in self._idle.values() for tool, _ in idle]
+            tools += [instance.tool for instance in self._sessions.values()]
+            self._shared.clear()
+            self._idle.clear()
+            self._sessions.clear()
+        self._close(tools)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(
+                self._stats,
+                shared=len(self._shared),
+                idle=sum(map(len, self._idle.values())),
+                sessions=len(self._sessions),
+            )
+
+    def _start_reaper(self):
+        """Start the idle eviction thread (caller holds the lock)."""
+        if self._reaper is not None:
+            return
+        self._reaper = threading.Thread(
+            target=_reap,
+            args=(weakref.ref(self), self._reaper_stop, max(1.0, self.idle_timeout / 4)),
+            name="nova-tool-reaper",
+            daemon=True,
+        )
+        self._reaper.start()
+
+    def _create(self, tool_cls) -> BaseTool:
+        """New instance (caller does not hold the lock)."""
+        tool = tool_cls()
+        with self._lock:
+            self._stats["created"] += 1
+        return tool
+
+    def _close(self, tools: List[BaseTool]):
+        for tool in tools:
+            try:
+                tool.close()
+            except Exception:
+                pass  # a failing close hook must not break the caller
+        if tools:
+            with self._lock:
+                self._stats["closed"] += len(tools)
+
+
+def _reap(pool_ref, stop: threading.Event, interval: float):
+    # Holds the pool weakly so an abandoned pool can still be collected
+    while not stop.wait(interval):
+        pool = pool_ref()
+        if pool is None:
+            return
+        pool.evict_idle()
+        del pool
+
+
+def _noop():
+    pass
@@ -1,6 +1,17 @@
 """Registry helpers for tools."""
 
+import importlib
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from .manifest import load_manifest
+
 TOOL_REGISTRY = {}
+LOAD_ERRORS: Dict[str, str] = {}
+
+_import_lock = threading.Lock()
+_WORD = re.compile(r"[a-z0-9]+")
 
 
 def register_tool(tool_cls):
@@ -8,12 +19,29 @@ def register_tool(tool_cls):
     Register a tool class by its name attribute.
     """
     TOOL_REGISTRY[tool_cls.name] = tool_cls
+    return tool_cls
 
 
 def get_tool(name: str):
     """
     Retrieve a tool class by name.
+
+    Tools listed in the manifest are imported on first use.
     """
+    tool_cls = TOOL_REGISTRY.get(name)
+    if tool_cls is not None:
+        return tool_cls
+    entry = load_manifest()["tools"].get(name)
+    if entry is None:
+        return None
+    with _import_lock:
+        if name not in TOOL_REGISTRY and name not in LOAD_ERRORS:
+            try:
+                module = importlib.import_module(entry["module"])
+                tool_cls = getattr(module, entry["class"])
+                TOOL_REGISTRY.setdefault(name, tool_cls)
+            except Exception as e:
+                LOAD_ERRORS[name] = f"{type(e).__name__}: {e}"
     return TOOL_REGISTRY.get(name)
 
 
@@ -21,5 +49,57 @@ def list_tools():
     """
     List registered tool names.
     """
-    return list(TOOL_REGISTRY.keys())
+    names = list(TOOL_REGISTRY.keys())
+    names += [name for name in load_manifest()["tools"] if name not in TOOL_REGISTRY]
+    return names
+
+
+def tool_schemas(names: Optional[Iterable[str]] = None) -> List[dict]:
+    """
+    Function-calling schemas, built from the manifest (no imports).
 
+    Only tools that declare ``parameters`` are exposed.  ``names``
+    restricts and orders the result; by default every tool is included.
+    """
+    tools = load_manifest()["tools"]
+    schemas = []
+    for name in (tools if names is None else names):
+        entry = tools.get(name)
+        if entry is None or "parameters" not in entry:
+            continue
+        schemas.append({
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": entry.get("description", ""),
+                "parameters": entry["parameters"],
+            },
+        })
+    return schemas
+
+
+def select_tools(message: str, extra: Iterable[str] = ()) -> List[str]:
+    """
+    Names of the tools relevant to ``message``.
+
+    A tool is relevant when one of its ``keywords`` (or its name) occurs
+    in the message; ``extra`` names (e.g. predicted tools) are always
+    added.  Returns every exposed tool when nothing matches, so the
+    model is never left without the tool it needs.
+    """
+    tools = load_manifest()["tools"]
+    words = set(_WORD.findall(message.lower()))
+    text = " ".join(_WORD.findall(message.lower()))
+    selected = []
+    for name, entry in tools.items():
+        if "parameters" not in entry:
+            continue
+        for keyword in [name.replace("_", " ")] + list(entry.get("keywords", ())):
+            keyword = keyword.lower()
+            if keyword in words or (" " in keyword and f" {keyword} " in f" {text} "):
+                selected.append(name)
+                break
+    if not selected:
+        return [name for name, entry in tools.items() if "parameters" in entry]
+    selected += [name for name in extra if name in tools and name not in selected]
+    return selected
@@ -1,55 +1,412 @@
-"""Tool runner that discovers and executes registered tools."""
+"""Tool runner that executes registered tools, loading them on first use."""
 
+import asyncio
+import json
+import threading
 import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
-from .loader import discover_tools
-from .registry import get_tool
-from .base import ToolExecutionError
+from .manifest import load_manifest
+from .pool import ToolPool
+from .registry import LOAD_ERRORS, get_tool
+from .base import SCOPE_SINGLETON, BaseTool, ToolExecutionError, ToolTimeoutError
 
 
 class ToolRunner:
     """
-    Discovers tools and provides a simple interface to execute them.
+    Provides a simple interface to execute tools.
+
+    Tool modules are imported the first time one of their tools runs; the
+    manifest (see tools/manifest.py) says where each tool lives.
+
+    ``run_many`` dispatches the independent tool calls of one model turn
+    concurrently on a bounded thread pool; ``arun`` / ``arun_many`` are the
+    asyncio equivalents.
+
+    Tool instances are kept according to each tool's ``scope`` (see
+    tools.pool.ToolPool); pass ``session_id`` to let conversation-scoped
+    tools keep their state between calls.
+
+    Every call runs against a deadline: the tool's ``timeout``, shortened
+    to the ``deadline`` passed in (e.g. the turn's tool budget).  A call
+    that misses it returns ``{"ok": False, "timed_out": True, ...}``
+    without holding up the other calls, and results larger than the
+    tool's ``max_output_chars`` are cut down (``output_truncated``).
     """
 
-    def __init__(self) -> None:
-        discover_tools()
+    def __init__(
+        self,
+        max_workers: int = 8,
+        idle_timeout: float = 600.0,
+        max_sessions: int = 64
+    ) -> None:
+        load_manifest()
+        self.max_workers = max_workers
+        self.pool = ToolPool(idle_timeout=idle_timeout, max_sessions=max_sessions)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._async_limits = weakref.WeakKeyDictionary()  # event loop -> {name: Semaphore}
+        self._lock = threading.Lock()
+        # running: calls still executing, including abandoned ones
+        self._stats = {"timeouts": 0, "truncated": 0, "running": 0}
 
-    def run(self, tool_name: str, **kwargs) -> dict:
+    def run(self, tool_name: str, session_id=None, deadline: Optional[float] = None, **kwargs) -> dict:
         """
         Execute a tool by name with provided parameters.
 
         Args:
             tool_name: The registered tool name.
+            session_id: Conversation the call belongs to, if any.
+            deadline: ``time.monotonic()`` value by which the call must
+                finish, e.g. the end of the turn's tool budget.  The tool's
+                own ``timeout`` applies either way.
             **kwargs: Parameters forwarded to the tool's run method.
 
         Returns:
             A result dictionary containing success status, tool name,
             duration, and tool-specific result or error information.
+            A call that misses its deadline returns an error result with
+            ``timed_out`` set; the tool keeps running in the background
+            and its instance is released when it finishes.
 
         Raises:
             ToolExecutionError: If the tool is not registered.
         """
-        tool_cls = get_tool(tool_name)
-        if not tool_cls:
-            raise ToolExecutionError(f"Unknown tool: {tool_name}")
+        tool_cls = self._tool_class(tool_name)
+        start = time.time()
+        limit = self._time_limit(tool_cls, deadline)
+        try:
+            if limit <= 0:
+                raise ToolTimeoutError(f"{tool_name} was not started: no time left")
+            tool, release = self.pool.acquire(tool_name, tool_cls, session_id, limit)
+            result = self._run_in_thread(tool_name, tool, release, kwargs, limit - (time.time() - start))
+        except ToolTimeoutError as e:
+            return self._timeout_result(tool_name, start, e)
+        except Exception as e:
+            return self._error_result(tool_name, e, start)
+        return self._ok_result(tool_name, start, result, tool_cls.max_output_chars)
+
+    async def arun(self, tool_name: str, session_id=None, deadline: Optional[float] = None, **kwargs) -> dict:
+        """
+        Async version of ``run``.
 
-        tool = tool_cls()
+        Awaits the tool's ``arun``: a native coroutine for tools that have
+        one (cancelled when it runs out of time), otherwise ``run`` in a
+        worker thread, as in ``run``.
+        """
+        tool_cls = self._tool_class(tool_name)
         start = time.time()
+        limit = self._time_limit(tool_cls, deadline)
         try:
-            result = tool.run(**kwargs)
+            if limit <= 0:
+                raise ToolTimeoutError(f"{tool_name} was not started: no time left")
+            # Acquiring may wait for a conversation instance in use
+            tool, release = await asyncio.to_thread(
+                self.pool.acquire, tool_name, tool_cls, session_id, limit
+            )
+            remaining = limit - (time.time() - start)
+            if type(tool).arun is BaseTool.arun:
+                result = await asyncio.to_thread(
+                    self._run_in_thread, tool_name, tool, release, kwargs, remaining
+                )
+            else:
+                try:
+                    result = await asyncio.wait_for(tool.arun(**kwargs), max(0.0, remaining))
+                except asyncio.TimeoutError:
+                    raise ToolTimeoutError(f"{tool_name} timed out after {limit:.1f}s") from None
+                finally:
+                    release()
+        except ToolTimeoutError as e:
+            return self._timeout_result(tool_name, start, e)
         except Exception as e:
-            return {
-                "ok": False,
-                "tool": tool_name,
-                "error": str(e),
-                "trace": type(e).__name__,
-            }
-        end = time.time()
-        return {
+            return self._error_result(tool_name, e, start)
+        return self._ok_result(tool_name, start, result, tool_cls.max_output_chars)
+
+    def run_many(self, calls: List[dict], session_id=None, deadline: Optional[float] = None) -> List[dict]:
+        """
+        Execute several tool calls concurrently.
+
+        Args:
+            calls: Dicts with ``id`` (the tool_call_id), ``name`` and
+                ``arguments`` (a dict).
+            session_id: Conversation the calls belong to, if any.
+            deadline: ``time.monotonic()`` value by which every call must
+                finish (see ``run``).
+
+        Returns:
+            One result per call, in the same order, each tagged with its
+            ``tool_call_id``.  Unknown tools yield an error result instead
+            of raising.
+
+        Calls to tools marked ``side_effects`` run one after another in
+        the order given, alongside the side-effect-free ones; each tool's
+        ``max_concurrency`` caps how many of its calls run at once.
+        """
+        if len(calls) <= 1:
+            return [self._run_call(call, session_id, deadline) for call in calls]
+
+        executor = self._get_executor()
+        serial = [i for i, call in enumerate(calls) if self.has_side_effects(call)]
+        futures = {
+            i: executor.submit(self._run_call, call, session_id, deadline)
+            for i, call in enumerate(calls) if i not in serial
+        }
+        results: List[Optional[dict]] = [None] * len(calls)
+        if serial:
+            chain = executor.submit(lambda: [self._run_call(calls[i], session_id, deadline) for i in serial])
+            for i, result in zip(serial, chain.result()):
+                results[i] = result
+        for i, future in futures.items():
+            results[i] = future.result()
+        return results
+
+    async def arun_many(self, calls: List[dict], session_id=None, deadline: Optional[float] = None) -> List[dict]:
+        """
+        Async version of ``run_many``, with the same ordering and
+        side-effect rules.
+        """
+        serial = [i for i, call in enumerate(calls) if self.has_side_effects(call)]
+
+        async def run_serial():
+            return [await self._arun_call(calls[i], session_id, deadline) for i in serial]
+
+        concurrent = [i for i in range(len(calls)) if i not in serial]
+        outcomes = await asyncio.gather(
+            run_serial(), *(self._arun_call(calls[i], session_id, deadline) for i in concurrent)
+        )
+        results: List[Optional[dict]] = [None] * len(calls)
+        for i, result in zip(serial + concurrent, outcomes[0] + list(outcomes[1:])):
+            results[i] = result
+        return results
+
+    def _tool_class(self, tool_name: str):
+        tool_cls = get_tool(tool_name)
+        if not tool_cls:
+            if tool_name in LOAD_ERRORS:
+                raise ToolExecutionError(f"Tool {tool_name} failed to load: {LOAD_ERRORS[tool_name]}")
+            raise ToolExecutionError(f"Unknown tool: {tool_name}")
+        return tool_cls
+
+    @staticmethod
+    def _time_limit(tool_cls, deadline: Optional[float]) -> float:
+        """Seconds a call may take: the tool's timeout, cut to the deadline."""
+        limit = float(tool_cls.timeout)
+        if deadline is not None:
+            limit = min(limit, deadline - time.monotonic())
+        return max(0.0, limit)
+
+    def _run_in_thread(self, tool_name: str, tool, release, kwargs: dict, timeout: float):
+        """
+        ``tool.run(**kwargs)`` in a daemon thread, waiting at most ``timeout``
+        seconds.  A thread cannot be killed, so a call that times out is
+        abandoned; it releases its instance whenever it returns.
+
+        The thread holds one of the tool's ``max_concurrency`` slots until
+        it exits, abandoned or not, so a tool that keeps hanging cannot
+        pile up threads: once its slots are taken, new calls time out
+        waiting for one.
+        """
+        started = time.monotonic()
+        slot = self._limit(tool_name)
+        if not slot.acquire(timeout=max(0.0, timeout)):
+            release()
+            raise ToolTimeoutError(
+                f"{tool_name} did not start: earlier calls are still running"
+            )
+        outcome = {}
+        done = threading.Event()
+
+        def target():
+            try:
+                outcome["result"] = tool.run(**kwargs)
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                release()
+                slot.release()
+                done.set()
+                with self._lock:
+                    self._stats["running"] -= 1
+
+        with self._lock:
+            self._stats["running"] += 1
+        threading.Thread(target=target, name=f"nova-tool-{tool_name}", daemon=True).start()
+        if not done.wait(max(0.0, timeout - (time.monotonic() - started))):
+            raise ToolTimeoutError(f"{tool_name} timed out after {timeout:.1f}s")
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def _ok_result(self, tool_name: str, start: float, result, max_output_chars: int) -> dict:
+        capped, truncated = _cap_output(result, max_output_chars)
+        response = {
             "ok": True,
             "tool": tool_name,
-            "duration_ms": int((end - start) * 1000),
-            "result": result,
+            "duration_ms": int((time.time() - start) * 1000),
+            "result": capped,
         }
+        if truncated:
+            response["output_truncated"] = True
+            with self._lock:
+                self._stats["truncated"] += 1
+        return response
 
+    @staticmethod
+    def _error_result(tool_name: str, error: Exception, start: Optional[float] = None) -> dict:
+        result = {
+            "ok": False,
+            "tool": tool_name,
+            "error": str(error),
+            "trace": type(error).__name__,
+        }
+        if start is not None:
+            result["duration_ms"] = int((time.time() - start) * 1000)
+        return result
+
+    def _timeout_result(self, tool_name: str, start: float, error: ToolTimeoutError) -> dict:
+        with self._lock:
+            self._stats["timeouts"] += 1
+        return dict(self._error_result(tool_name, error, start), timed_out=True)
+
+    def _run_call(self, call: dict, session_id=None, deadline: Optional[float] = None) -> dict:
+        name = call["name"]
+        arguments = call.get("arguments") or {}
+        start = time.time()
+        try:
+            if not isinstance(arguments, dict):
+                raise ToolExecutionError(f"Invalid arguments for {name}: {arguments!r}")
+            # run() waits for one of the tool's concurrency slots
+            result = self.run(name, session_id, deadline, **arguments)
+        except ToolTimeoutError as e:
+            result = self._timeout_result(name, start, e)
+        except Exception as e:
+            result = self._error_result(name, e, start)
+        result["tool_call_id"] = call.get("id")
+        return result
+
+    async def _arun_call(self, call: dict, session_id=None, deadline: Optional[float] = None) -> dict:
+        name = call["name"]
+        arguments = call.get("arguments") or {}
+        start = time.time()
+        try:
+            if not isinstance(arguments, dict):
+                raise ToolExecutionError(f"Invalid arguments for {name}: {arguments!r}")
+            semaphore = self._async_limit(name)
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                await asyncio.wait_for(semaphore.acquire(), wait)
+            except asyncio.TimeoutError:
+                raise ToolTimeoutError(f"{name} did not start before the deadline") from None
+            try:
+                result = await self.arun(name, session_id, deadline, **arguments)
+            finally:
+                semaphore.release()
+        except ToolTimeoutError as e:
+            result = self._timeout_result(name, start, e)
+        except Exception as e:
+            result = self._error_result(name, e, start)
+        result["tool_call_id"] = call.get("id")
+        return result
+
+    def has_side_effects(self, call: dict) -> bool:
+        """Whether a run_many-style call may change local state."""
+        tool_cls = get_tool(call["name"])
+        arguments = call.get("arguments")
+        return bool(tool_cls) and tool_cls.has_side_effects(
+            **(arguments if isinstance(arguments, dict) else {})
+        )
+
+    def _limit(self, name: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            semaphore = self._limits.get(name)
+            if semaphore is None:
+                tool_cls = get_tool(name)
+                limit = getattr(tool_cls, "max_concurrency", 1) if tool_cls else 1
+                semaphore = self._limits[name] = threading.BoundedSemaphore(max(1, limit))
+            return semaphore
+
+    def _async_limit(self, name: str) -> asyncio.Semaphore:
+        """Like ``_limit``, for the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            limits = self._async_limits.setdefault(loop, {})
+            semaphore = limits.get(name)
+            if semaphore is None:
+                tool_cls = get_tool(name)
+                limit = getattr(tool_cls, "max_concurrency", 1) if tool_cls else 1
+                semaphore = limits[name] = asyncio.Semaphore(max(1, limit))
+            return semaphore
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="nova-tool"
+                )
+            return self._executor
+
+    def prewarm(self, names) -> None:
+        """Import tools and create their singleton instances ahead of use."""
+        for name in names:
+            tool_cls = get_tool(name)
+            if tool_cls is not None and tool_cls.scope == SCOPE_SINGLETON:
+                _, release = self.pool.acquire(name, tool_cls)
+                release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, pool=self.pool.stats())
+
+    def end_session(self, session_id) -> None:
+        """Close the conversation-scoped tool instances of a session."""
+        self.pool.end_session(session_id)
+
+    def end_sessions(self, match) -> None:
+        """Close the conversation-scoped tool instances of every session ``match`` accepts."""
+        self.pool.end_sessions(match)
+
+    def shutdown(self) -> None:
+        """Stop the worker threads (waits for running calls) and close tools."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        self.pool.close()
+
+
+def _shorten(value, max_chars: int, max_items: int):
+    """Copy of a JSON-like value with strings and lists cut down."""
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        return value[:max_chars] + f"... [{len(value) - max_chars} chars truncated]"
+    if isinstance(value, (list, tuple)):
+        items = [_shorten(v, max_chars, max_items) for v in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"... [{len(value) - max_items} more items]")
+        return items
+    if isinstance(value, dict):
+        return {k: _shorten(v, max_chars, max_items) for k, v in value.items()}
+    return value
+
+
+def _cap_output(result, max_chars: int):
+    """
+    ``result`` cut down until its JSON is at most about ``max_chars`` long,
+    halving the per-string and per-list limits.  Returns (result, truncated).
+    """
+    try:
+        size = len(json.dumps(result, default=str))
+    except (TypeError, ValueError):
+        return result, False
+    if size <= max_chars:
+        return result, False
+    limit, items = max_chars, 1000
+    while True:
+        capped = _shorten(result, limit, items)
+        if limit <= 64 or len(json.dumps(capped, default=str)) <= max_chars:
+            return capped, True
+        limit //= 2
+        items = max(10, items // 2)
@@ -3,9 +3,11 @@
 import os
 import re
 import shlex
+import signal
 import subprocess
+import tempfile
 from datetime import datetime
-from .base import BaseTool, ToolExecutionError
+from .base import SCOPE_SINGLETON, BaseTool, ToolExecutionError
 from .registry import register_tool
 
 # Simple whitelist of safe read-only/info commands (first token)
@@ -29,6 +31,13 @@ DANGEROUS_PATTERNS = [
 
 LOG_PATH = os.path.join(os.path.dirname(__file__), "..", "shell_exec.log")
 
+# Resource caps for executed commands
+MAX_TIMEOUT = 30  # seconds; stays under the tool's own timeout
+MAX_OUTPUT_BYTES = 20_000  # per stream, returned to the caller
+# Virtual memory, POSIX only.  Interpreters reserve far more address space
+# than they use (node, the JVM, numpy's BLAS threads), so keep this generous
+MAX_MEMORY_MB = int(os.environ.get("NOVA_SHELL_MAX_MEMORY_MB", 4096))
+
 def is_dangerous(command: str) -> bool:
     cmd = command.lower()
     for p in DANGEROUS_PATTERNS:
@@ -36,6 +45,32 @@ def is_dangerous(command: str) -> bool:
             return True
     return False
 
+def _limited(command: str) -> str:
+    """The command with the memory cap applied by the shell (POSIX sh)."""
+    if os.name != "posix" or MAX_MEMORY_MB <= 0:
+        return command
+    return f"ulimit -v {MAX_MEMORY_MB * 1024} 2>/dev/null; {command}"
+
+def _read_output(f) -> str:
+    size = f.seek(0, os.SEEK_END)
+    f.seek(0)
+    data = f.read(MAX_OUTPUT_BYTES)
+    text = data.decode(errors="replace")
+    if size > len(data):
+        text += f"\n... [output truncated, {size} bytes total]"
+    return text
+
+def _kill(process: subprocess.Popen):
+    """Kill the command and anything it started."""
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        pass
+    process.wait()
+
 def log_attempt(command: str, allowed: bool, note: str = ""):
     try:
         with open(LOG_PATH, "a") as f:
@@ -47,6 +82,19 @@ def log_attempt(command: str, allowed: bool, note: str = ""):
 class ShellCommandTool(BaseTool):
     name = "shell"
     description = "Execute a small set of safe shell commands (whitelist). Set SHELL_ALLOW=1 to allow arbitrary commands."
+    side_effects = True
+    scope = SCOPE_SINGLETON  # stateless
+    thread_safe = True
+    timeout = 35.0  # a little over the command timeout, which is capped below it
+    keywords = ("shell", "command", "terminal", "bash", "run", "execute", "process", "ps",
+                "disk", "uptime", "ls")
+    parameters = {
+        "type": "object",
+        "properties": {
+            "command": {"type": "string"}
+        },
+        "required": ["command"]
+    }
 
     def run(self, command: str, timeout: int = 30) -> dict:
         if not command or not command.strip():
@@ -68,22 +116,31 @@ class ShellCommandTool(BaseTool):
             log_attempt(command, allowed=False, note="blocked: not whitelisted and env not set")
             return {"ok": False, "error": "Command not permitted: only a small whitelist is allowed. Set SHELL_ALLOW=1 to opt-in (risky)."}
 
-        # Allowed: execute
+        # Allowed: execute.  Output goes to temporary files so a chatty
+        # command cannot fill memory, and the command gets its own process
+        # group so a timeout kills everything it started.
+        timeout = max(1, min(timeout, MAX_TIMEOUT))
         log_attempt(command, allowed=True, note="executing")
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=timeout
-            )
-            out = {
-                "stdout": result.stdout,
-                "stderr": result.stderr,
-                "returncode": result.returncode,
-                "success": result.returncode == 0
-            }
+            with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+                process = subprocess.Popen(
+                    _limited(command),
+                    shell=True,
+                    stdout=stdout,
+                    stderr=stderr,
+                    start_new_session=os.name == "posix"
+                )
+                try:
+                    returncode = process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    _kill(process)
+                    raise
+                out = {
+                    "stdout": _read_output(stdout),
+                    "stderr": _read_output(stderr),
+                    "returncode": returncode,
+                    "success": returncode == 0
+                }
             return {"ok": True, "result": out}
         except subprocess.TimeoutExpired:
             log_attempt(command, allowed=False, note="timeout")
@@ -3,7 +3,7 @@
 import psutil
 import subprocess
 import platform
-from .base import BaseTool
+from .base import SCOPE_SINGLETON, BaseTool
 from .registry import register_tool
 
 
@@ -13,6 +13,25 @@ class SystemOpsTool(BaseTool):
     
     name = "system_ops"
     description = "Check system stats (CPU/RAM/Battery) or open applications"
+    side_effects = True
+    read_only_operations = frozenset({"stats"})
+    scope = SCOPE_SINGLETON  # stateless
+    thread_safe = True
+    timeout = 10.0
+    keywords = ("system", "cpu", "ram", "memory usage", "battery", "stats", "open", "app",
+                "application", "launch", "spotify", "safari")
+    parameters = {
+        "type": "object",
+        "properties": {
+            "operation": {"type": "string", "enum": ["stats", "open_app"]},
+            "app_name": {"type": "string", "description": "Name of app to open (e.g. 'Spotify', 'Safari')"}
+        },
+        "required": ["operation"]
+    }
+    
+    def __init__(self):
+        # The first non-blocking cpu_percent() call only sets the baseline
+        psutil.cpu_percent(interval=None)
     
     def run(self, operation: str, app_name: str = None) -> dict:
         """
@@ -35,7 +54,8 @@ class SystemOpsTool(BaseTool):
         """Get system statistics."""
         stats = {
             "system": platform.system(),
-            "cpu_percent": psutil.cpu_percent(interval=1),
+            # Usage since the previous call, instead of sampling for a second
+            "cpu_percent": psutil.cpu_percent(interval=None),
             "memory_percent": psutil.virtual_memory().percent,
         }
         
@@ -6,7 +6,7 @@ import requests
 from bs4 import BeautifulSoup
 import json
 from typing import Dict, Any, List, Optional
-from .base import BaseTool, ToolExecutionError
+from .base import SCOPE_CONVERSATION, BaseTool, ToolExecutionError
 from .registry import register_tool
 
 
@@ -16,6 +16,24 @@ class WebBrowserTool(BaseTool):
     
     name = "web_browser"
     description = "Actually browse the web - navigate sites, read articles, extract data"
+    # Keeps its HTTP session and the current page between calls, so
+    # extract_* can follow navigate; calls on one page run in order
+    scope = SCOPE_CONVERSATION
+    side_effects = True
+    timeout = 35.0  # pages load with a 15s request timeout
+    keywords = ("browse", "website", "site", "url", "http", "https", "www", "page", "article",
+                "link", "links", "navigate", "scrape", "extract", "com")
+    parameters = {
+        "type": "object",
+        "properties": {
+            "action": {"type": "string", "enum": ["navigate", "extract_links", "extract_text", "extract_data", "search_page", "get_article"]},
+            "url": {"type": "string", "description": "Page to load (navigate, get_article)"},
+            "selector": {"type": "string", "description": "CSS selector (extract_text)"},
+            "data_type": {"type": "string", "enum": ["emails", "prices", "images"]},
+            "query": {"type": "string", "description": "Text to find (search_page)"}
+        },
+        "required": ["action"]
+    }
     
     def __init__(self):
         self.session = requests.Session()
@@ -25,6 +43,9 @@ class WebBrowserTool(BaseTool):
         self.current_url = None
         self.page_content = None
     
+    def close(self):
+        self.session.close()
+    
     def run(self, action: str, **kwargs) -> Dict[str, Any]:
         """
         Web browsing actions.
@@ -1,10 +1,42 @@
 """Web search and browsing tool."""
 
+import asyncio
 import os
+import threading
 import requests
-from .base import BaseTool, ToolExecutionError
+from .base import SCOPE_SINGLETON, BaseTool, ToolExecutionError
 from .registry import register_tool
 
+try:
+    import httpx
+except ImportError:  # arun falls back to a worker thread
+    httpx = None
+
+
+SEARCH_URL = "https://api.duckduckgo.com/"
+FETCH_HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; GodmanAI/1.0)"}
+
+
+def _close_orphaned(client: "httpx.AsyncClient"):
+    """
+    Close a client whose event loop has already closed.  ``aclose()``
+    needs that loop, so shut the pooled connections' sockets directly and
+    leave the dead loop's transport objects to the garbage collector.
+    """
+    pool = getattr(client._transport, "_pool", None)
+    for connection in getattr(pool, "connections", ()):
+        stream = getattr(getattr(connection, "_connection", None), "_network_stream", None)
+        if stream is None:
+            continue
+        try:
+            sock = stream.get_extra_info("socket")
+            # asyncio hands out a TransportSocket wrapper around the real one
+            sock = getattr(sock, "_sock", sock)
+            if sock is not None:
+                sock.close()
+        except Exception:
+            pass
+
 
 @register_tool
 class WebSearchTool(BaseTool):
@@ -12,6 +44,40 @@ class WebSearchTool(BaseTool):
     
     name = "web_search"
     description = "Search the web using DuckDuckGo or fetch webpage content"
+    scope = SCOPE_SINGLETON  # stateless
+    thread_safe = True
+    timeout = 15.0  # one request with a 10s timeout
+    keywords = ("search", "google", "look up", "lookup", "find", "web", "internet", "online",
+                "news", "weather", "who", "latest", "fetch")
+    parameters = {
+        "type": "object",
+        "properties": {
+            "operation": {"type": "string", "enum": ["search", "fetch"]},
+            "query": {"type": "string", "description": "Search query (search)"},
+            "url": {"type": "string", "description": "URL to fetch (fetch)"}
+        },
+        "required": ["operation"]
+    }
+    
+    def __init__(self):
+        # One pooled AsyncClient per event loop: httpx clients can't be
+        # shared across loops, and a client per call loses keep-alive.
+        # Keys are strong references so a loop that closes (asyncio.run
+        # returning) leaves its client here to be closed, not leaked.
+        self._clients: dict = {}
+        self._clients_lock = threading.Lock()
+    
+    def close(self):
+        with self._clients_lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+        for loop, client in clients:
+            if loop.is_closed():
+                _close_orphaned(client)
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            else:
+                loop.run_until_complete(client.aclose())
     
     def run(self, operation: str, query: str = None, url: str = None) -> dict:
         """
@@ -27,50 +93,86 @@ class WebSearchTool(BaseTool):
         """
         try:
             if operation == "search":
-                if query is None:
-                    raise ToolExecutionError("Query required for search")
-                
                 # Use DuckDuckGo instant answers API
-                response = requests.get(
-                    "https://api.duckduckgo.com/",
-                    params={
-                        "q": query,
-                        "format": "json",
-                        "no_html": 1,
-                        "skip_disambig": 1
-                    },
-                    timeout=10
-                )
-                
-                data = response.json()
-                
-                # Get results
-                results = {
-                    "abstract": data.get("Abstract", ""),
-                    "abstract_url": data.get("AbstractURL", ""),
-                    "answer": data.get("Answer", ""),
-                    "related": [{"text": r.get("Text"), "url": r.get("FirstURL")} 
-                               for r in data.get("RelatedTopics", [])[:5]]
-                }
-                
-                return results
+                response = requests.get(SEARCH_URL, params=self._search_params(query), timeout=10)
+                return self._search_results(response.json())
             
             elif operation == "fetch":
                 if url is None:
                     raise ToolExecutionError("URL required for fetch")
                 
-                response = requests.get(url, timeout=10, headers={
-                    "User-Agent": "Mozilla/5.0 (compatible; GodmanAI/1.0)"
-                })
+                response = requests.get(url, timeout=10, headers=FETCH_HEADERS)
+                return self._fetch_result(url, response.status_code, response.text)
+            
+            else:
+                raise ToolExecutionError(f"Unknown operation: {operation}")
+        
+        except Exception as e:
+            raise ToolExecutionError(f"Web operation failed: {str(e)}")
+    
+    async def arun(self, operation: str, query: str = None, url: str = None) -> dict:
+        """Non-blocking ``run`` over httpx (a worker thread without it)."""
+        if httpx is None:
+            return await super().arun(operation=operation, query=query, url=url)
+        
+        try:
+            client = self._client()
+            if operation == "search":
+                response = await client.get(SEARCH_URL, params=self._search_params(query))
+                return self._search_results(response.json())
+            
+            elif operation == "fetch":
+                if url is None:
+                    raise ToolExecutionError("URL required for fetch")
                 
-                return {
-                    "status_code": response.status_code,
-                    "content": response.text[:10000],  # First 10k chars
-                    "url": url
-                }
+                response = await client.get(url, headers=FETCH_HEADERS)
+                return self._fetch_result(url, response.status_code, response.text)
             
             else:
                 raise ToolExecutionError(f"Unknown operation: {operation}")
         
         except Exception as e:
             raise ToolExecutionError(f"Web operation failed: {str(e)}")
+    
+    def _client(self) -> "httpx.AsyncClient":
+        """The running loop's client, created on first use."""
+        loop = asyncio.get_running_loop()
+        with self._clients_lock:
+            orphaned = [key for key in self._clients if key.is_closed()]
+            orphaned = [self._clients.pop(key) for key in orphaned]
+            client = self._clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(timeout=10, follow_redirects=True)
+                self._clients[loop] = client
+        for stale in orphaned:
+            _close_orphaned(stale)
+        return client
+    
+    @staticmethod
+    def _search_params(query: str) -> dict:
+        if query is None:
+            raise ToolExecutionError("Query required for search")
+        return {
+            "q": query,
+            "format": "json",
+            "no_html": 1,
+            "skip_disambig": 1
+        }
+    
+    @staticmethod
+    def _search_results(data: dict) -> dict:
+        return {
+            "abstract": data.get("Abstract", ""),
+            "abstract_url": data.get("AbstractURL", ""),
+            "answer": data.get("Answer", ""),
+            "related": [{"text": r.get("Text"), "url": r.get("FirstURL")} 
+                       for r in data.get("RelatedTopics", [])[:5]]
+        }
+    
+    @staticmethod
+    def _fetch_result(url: str, status_code: int, text: str) -> dict:
+        return {
+            "status_code": status_code,
+            "content": text[:10000],  # First 10k chars
+            "url": url
+        }
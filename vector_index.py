@@ -0,0 +1,475 @@
+"""
+Local semantic vector index for Nova's memory.
+
+Embeddings are kept in NumPy arrays that are memory-mapped from files next
+to memory.db, so recall never needs the network and the index survives
+restarts without being reloaded into RAM.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # semantic recall is optional
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: only one process may write an index
+    fcntl = None
+
+
+# Row kinds stored alongside each vector; deleted rows keep a tombstone kind
+KIND_CONVERSATION = 0
+KIND_KNOWLEDGE = 1
+KIND_DELETED = -1
+KIND_NAMES = {KIND_CONVERSATION: "conversation", KIND_KNOWLEDGE: "knowledge"}
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = frozenset("""
+a an the and or but if of to in on at by for with from as is are was were be been
+it its this that these those i me my you your we our he she they them his her
+do does did so not no yes just can could would should will what how why when
+""".split())
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder using the hashing trick.
+
+    Unigrams and bigrams are hashed into ``dim`` signed buckets with
+    sublinear term frequency, then L2-normalized so a dot product is the
+    cosine similarity.  Any object with ``dim``, ``name`` and
+    ``embed(texts) -> ndarray`` can be used instead.
+    """
+
+    name = "hashing-v1"
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _features(self, text: str) -> Dict[int, float]:
+        tokens = [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+        counts: Dict[int, float] = {}
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for gram in grams:
+            h = zlib.crc32(gram.encode("utf-8"))
+            bucket = h % self.dim
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            counts[bucket] = counts.get(bucket, 0.0) + sign
+        return counts
+
+    def embed(self, texts: List[str]) -> "np.ndarray":
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for bucket, value in self._features(text).items():
+                if value:
+                    # sublinear tf keeps repeated words from dominating
+                    out[row, bucket] = math.copysign(1.0 + math.log(abs(value)), value)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+
+class VectorIndex:
+    """
+    Append-only, memory-mapped matrix of unit vectors.
+
+    Small indexes are searched exactly.  Once ``ivf_min_rows`` vectors are
+    stored, a coarse quantizer (spherical k-means centroids) is trained and
+    every row is tagged with its nearest centroid; a query then scores only
+    the rows in its ``nprobe`` closest lists, which keeps search time
+    roughly flat as history grows.  The quantizer is retrained on a
+    background thread whenever the index has doubled since the last
+    training; until it finishes, new rows go to the existing centroids.
+
+    Rows are never moved: ``remove`` leaves a tombstone, and
+    ``forget_after`` also lowers the high-water mark so ids the database
+    hands out again get indexed.
+
+    Files (``base`` is e.g. ``~/.nova/memory``):
+        base.vectors.npy    float32 (capacity, dim)
+        base.ids.npy        int64 row ids
+        base.kinds.npy      int8 row kinds
+        base.lists.npy      int16 inverted-list assignment per row
+        base.centroids.npy  float32 (nlist, dim)
+        base.index.json     row count, embedder, source and per-kind
+                            high-water marks
+        base.index.lock     held while writing
+
+    ``source`` identifies the database the rows came from; an index built
+    for another source is started over.
+
+    Several processes (the CLI and server.py) may share one index: writes
+    take an exclusive ``flock`` on the lock file and first pick up rows
+    other processes appended, so nobody overwrites them.  Searches notice
+    a changed index.json and reload under a shared lock.  Without fcntl
+    (Windows) only one process may write.
+    """
+
+    def __init__(
+        self,
+        base: Path,
+        embedder=None,
+        initial_capacity: int = 1024,
+        ivf_min_rows: int = 8192,
+        nprobe: int = 16,
+        source: Optional[int] = None
+    ):
+        if np is None:
+            raise RuntimeError("numpy is required for the semantic index")
+        self.base = Path(base)
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self.source = source
+        self._lock = threading.Lock()
+        self._trainer: Optional[threading.Thread] = None
+        self._meta_stamp = None
+        self._meta_path = self.base.with_suffix(".index.json")
+        self._lock_path = self.base.with_suffix(".index.lock")
+        self._centroids_path = self.base.with_suffix(".centroids.npy")
+        self._paths = {
+            "vectors": self.base.with_suffix(".vectors.npy"),
+            "ids": self.base.with_suffix(".ids.npy"),
+            "kinds": self.base.with_suffix(".kinds.npy"),
+            "lists": self.base.with_suffix(".lists.npy"),
+        }
+        self.count = 0
+        self.trained_at = 0
+        self.high_water: Dict[str, int] = {name: 0 for name in KIND_NAMES.values()}
+        self._centroids: Optional["np.ndarray"] = None
+        self._open(initial_capacity)
+
+    # --- storage -----------------------------------------------------
+
+    @contextmanager
+    def _file_lock(self, shared: bool = False):
+        """Lock against other processes writing this index (shared: reading)."""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_meta(self) -> Dict[str, Any]:
+        self._meta_stamp = self._stat_meta()
+        try:
+            return json.loads(self._meta_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _stat_meta(self):
+        try:
+            st = self._meta_path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _open(self, initial_capacity: int):
+        with self._file_lock():
+            meta = self._read_meta()
+            compatible = (
+                meta.get("dim") == self.dim
+                and meta.get("embedder") == self.embedder.name
+                # Indexes written before sources were recorded are adopted
+                and meta.get("source") in (None, self.source)
+                and all(p.exists() for p in self._paths.values())
+            )
+            if compatible:
+                self._load(meta)
+                if meta.get("source") != self.source:
+                    self._write_meta()
+            else:
+                # New index, or one built by a different embedder or for
+                # another database: start over
+                self._arrays = {}
+                self._allocate(initial_capacity)
+                self._write_meta()
+
+    def _load(self, meta: Dict[str, Any]):
+        """Map the files described by ``meta`` (file lock held)."""
+        self.count = int(meta.get("count", 0))
+        self.trained_at = int(meta.get("trained_at", 0))
+        self.high_water = {name: 0 for name in KIND_NAMES.values()}
+        self.high_water.update(meta.get("high_water", {}))
+        self._arrays = {
+            key: np.load(path, mmap_mode="r+") for key, path in self._paths.items()
+        }
+        self._centroids = None
+        if self.trained_at and self._centroids_path.exists():
+            self._centroids = np.load(self._centroids_path)
+        else:
+            self.trained_at = 0
+
+    def _sync(self):
+        """Pick up what other processes wrote since we last looked (both locks held)."""
+        meta = self._read_meta()
+        if (
+            meta.get("count") != self.count
+            or meta.get("trained_at") != self.trained_at
+            or meta.get("high_water") != self.high_water
+        ) and meta.get("dim") == self.dim and meta.get("embedder") == self.embedder.name:
+            self._load(meta)
+
+    def _allocate(self, capacity: int):
+        """(Re)create the backing files with ``capacity`` rows, keeping data."""
+        shapes = {
+            "vectors": ((capacity, self.dim), np.float32),
+            "ids": ((capacity,), np.int64),
+            "kinds": ((capacity,), np.int8),
+            "lists": ((capacity,), np.int16),
+        }
+        arrays = {}
+        for key, (shape, dtype) in shapes.items():
+            path = self._paths[key]
+            tmp = path.with_name(path.name + ".tmp")
+            arr = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=shape)
+            if key in self._arrays:
+                arr[:self.count] = self._arrays[key][:self.count]
+            arr.flush()
+            del arr
+            os.replace(tmp, path)
+            arrays[key] = np.load(path, mmap_mode="r+")
+        self._arrays = arrays
+
+    def _refresh(self):
+        """Reload if another process changed the index (``_lock`` held)."""
+        if self._stat_meta() == self._meta_stamp:
+            return
+        with self._file_lock(shared=True):
+            self._sync()
+
+    def _write_meta(self):
+        tmp = self._meta_path.with_name(f"{self._meta_path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({
+            "count": self.count,
+            "dim": self.dim,
+            "embedder": self.embedder.name,
+            "source": self.source,
+            "trained_at": self.trained_at,
+            "high_water": self.high_water,
+        }))
+        os.replace(tmp, self._meta_path)
+        self._meta_stamp = self._stat_meta()
+
+    def reset(self):
+        """Drop every vector (used when the database no longer matches)."""
+        with self._lock, self._file_lock():
+            self.count = 0
+            self.trained_at = 0
+            self._centroids = None
+            self.high_water = {name: 0 for name in KIND_NAMES.values()}
+            self._write_meta()
+
+    # --- coarse quantizer --------------------------------------------
+
+    def train(self, iterations: int = 8, sample_size: int = 20000):
+        """
+        Spherical k-means over a sample, then tag every row.
+
+        Only the sampling and the final swap hold the locks; clustering and
+        tagging the existing rows (which never change) run without them.
+        """
+        with self._lock:
+            n = self.count
+            if n < self.ivf_min_rows:
+                return
+            vectors = self._arrays["vectors"]
+            rng = np.random.default_rng(0)
+            sample_idx = rng.choice(n, size=min(n, sample_size), replace=False)
+            sample = np.asarray(vectors[np.sort(sample_idx)])
+        nlist = int(min(1024, max(16, 2 * math.sqrt(n))))
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Re-seed empty lists from random sample rows
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+        labels = _nearest(vectors, centroids, 0, n)
+
+        with self._lock, self._file_lock():
+            self._sync()
+            if self.count < n or self.trained_at >= n:
+                return  # reset meanwhile, or someone trained on as much
+            tmp = self._centroids_path.with_name(f"{self._centroids_path.name}.{os.getpid()}.tmp.npy")
+            np.save(tmp, centroids)
+            os.replace(tmp, self._centroids_path)
+            self._centroids = centroids
+            self._arrays["lists"][:n] = labels
+            self._assign(n, self.count)
+            self.trained_at = n
+            self._write_meta()
+
+    def _schedule_training(self):
+        """Retrain on a background thread unless one is running (lock held)."""
+        if self._trainer is not None and self._trainer.is_alive():
+            return
+        self._trainer = threading.Thread(target=self.train, name="nova-index-train", daemon=True)
+        self._trainer.start()
+
+    def _assign(self, start: int, end: int):
+        lists = self._arrays["lists"]
+        lists[start:end] = _nearest(self._arrays["vectors"], self._centroids, start, end)
+        lists.flush()
+
+    # --- writes ------------------------------------------------------
+
+    def append(self, kind: int, rows: Iterable[Tuple[int, str]]):
+        """Embed and append ``(row_id, text)`` pairs of one kind."""
+        rows = list(rows)
+        if not rows:
+            return
+        with self._lock, self._file_lock():
+            self._sync()
+            # Another process may have indexed some of these already
+            name = KIND_NAMES[kind]
+            rows = [row for row in rows if row[0] > self.high_water[name]]
+            if not rows:
+                return
+            vectors = self.embedder.embed([text for _, text in rows])
+            needed = self.count + len(rows)
+            capacity = len(self._arrays["ids"])
+            if needed > capacity:
+                while capacity < needed:
+                    capacity *= 2
+                self._allocate(capacity)
+            start, end = self.count, needed
+            self._arrays["vectors"][start:end] = vectors
+            self._arrays["ids"][start:end] = [row_id for row_id, _ in rows]
+            self._arrays["kinds"][start:end] = kind
+            for key in ("vectors", "ids", "kinds"):
+                self._arrays[key].flush()
+            self.count = end
+            if self._centroids is not None:
+                self._assign(start, end)
+            if end >= self.ivf_min_rows and end >= 2 * self.trained_at:
+                self._schedule_training()
+            self.high_water[name] = max(self.high_water[name], max(r for r, _ in rows))
+            self._write_meta()
+
+    def remove(self, kind: int, row_ids: Iterable[int]):
+        """Tombstone the vectors of deleted rows so searches skip them."""
+        row_ids = np.fromiter(row_ids, dtype=np.int64)
+        if not len(row_ids):
+            return
+        with self._lock, self._file_lock():
+            self._sync()
+            self._tombstone((self._arrays["kinds"][:self.count] == kind)
+                            & np.isin(self._arrays["ids"][:self.count], row_ids))
+
+    def forget_after(self, kind: int, last_id: int):
+        """
+        Tombstone rows of ``kind`` with ids above ``last_id`` and lower the
+        high-water mark to it, for a database that will hand those ids out
+        again (e.g. one restored from an older copy).
+        """
+        with self._lock, self._file_lock():
+            self._sync()
+            self._tombstone((self._arrays["kinds"][:self.count] == kind)
+                            & (self._arrays["ids"][:self.count] > last_id))
+            self.high_water[KIND_NAMES[kind]] = min(self.high_water[KIND_NAMES[kind]], last_id)
+            self._write_meta()
+
+    def _tombstone(self, mask):
+        kinds = self._arrays["kinds"]
+        kinds[:self.count][mask] = KIND_DELETED
+        kinds.flush()
+
+    # --- reads -------------------------------------------------------
+
+    def search(
+        self,
+        queries: List[str],
+        k: int = 5,
+        kind: Optional[int] = None
+    ) -> List[List[Tuple[int, int, float]]]:
+        """
+        Batched top-k cosine search.
+
+        Returns one list per query of ``(kind, row_id, score)``, best first.
+        """
+        if not queries:
+            return []
+        q = self.embedder.embed(queries)
+        with self._lock:
+            self._refresh()
+            n = self.count
+            if n == 0:
+                return [[] for _ in queries]
+            if self._centroids is None:
+                scores = self._arrays["vectors"][:n] @ q.T      # (n, queries)
+                return [self._top_k(np.arange(n), scores[:, col], k, kind)
+                        for col in range(len(queries))]
+
+            lists = self._arrays["lists"][:n]
+            probes = np.argsort(-(q @ self._centroids.T), axis=1)[:, :self.nprobe]
+            results = []
+            for col, probe in enumerate(probes):
+                wanted = np.zeros(len(self._centroids), dtype=bool)
+                wanted[probe] = True
+                rows = np.flatnonzero(wanted[lists])
+                scores = self._arrays["vectors"][rows] @ q[col]
+                results.append(self._top_k(rows, scores, k, kind))
+            return results
+
+    def _top_k(self, rows, scores, k: int, kind: Optional[int]) -> List[Tuple[int, int, float]]:
+        kinds = self._arrays["kinds"][rows]
+        if kind is not None:
+            scores = np.where(kinds == kind, scores, -np.inf)
+        else:
+            scores = np.where(kinds != KIND_DELETED, scores, -np.inf)
+        if len(rows) == 0:
+            return []
+        top = min(k, len(rows))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        ids = self._arrays["ids"]
+        return [
+            (int(kinds[i]), int(ids[rows[i]]), float(scores[i]))
+            for i in best if np.isfinite(scores[i]) and scores[i] > 0
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            deleted = int(np.count_nonzero(self._arrays["kinds"][:self.count] == KIND_DELETED))
+        return {
+            "vectors": self.count,
+            "deleted": deleted,
+            "capacity": int(len(self._arrays["ids"])),
+            "dim": self.dim,
+            "embedder": self.embedder.name,
+            "lists": 0 if self._centroids is None else len(self._centroids),
+        }
+
+
+def _nearest(vectors, centroids, start: int, end: int, chunk: int = 16384):
+    """Index of the closest centroid for rows ``start:end``."""
+    labels = np.empty(end - start, dtype=np.int16)
+    for lo in range(start, end, chunk):
+        hi = min(end, lo + chunk)
+        labels[lo - start:hi - start] = np.argmax(vectors[lo:hi] @ centroids.T, axis=1)
+    return labels